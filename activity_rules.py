@@ -0,0 +1,239 @@
+import operator
+
+import numpy as np
+
+# --- THRESHOLDS ---
+# Every number the activity rules compare against. Sites can override any of
+# these with a "thresholds" object in the site manifest.
+THRESHOLDS = {
+    'concrete_soil_wet_pct': 65,
+    'concrete_evap_kg_m2_h': 1.0,
+    'concrete_cold_f': 40,
+    'concrete_hot_f': 90,
+    'forecast_rain_prob': 60,
+    'concrete_forecast_rain_in': 0.25,
+    'grading_forecast_rain_in': 0.5,
+    'grading_saturated_pct': 85,
+    'grading_wet_pct': 65,
+    'asphalt_rain_in': 0.1,
+    'asphalt_cold_f': 50,
+    'painting_humidity': 85,
+    'painting_cold_f': 50,
+    'painting_hot_f': 90,
+    'painting_rain_in': 0,
+    'crane_stop_mph': 20,
+    'crane_caution_mph': 15,
+    'crane_gust_stop_mph': 30,
+    'crane_gust_caution_mph': 25,
+    'heat_advisory_f': 90,
+    'high_wind_mph': 25,
+    'window_concrete_max_pop': 30,
+    'window_concrete_min_f': 45,
+    'window_concrete_max_f': 85,
+    'window_grading_max_pop': 20,
+    'window_painting_max_pop': 20,
+    'window_painting_min_f': 50,
+    'window_painting_max_f': 85,
+    'hourly_asphalt_max_pop': 20,
+    'hourly_crane_max_mph': 15,
+    'window_concrete_min_hours': 4,
+    'window_grading_min_hours': 4,
+    'window_asphalt_min_hours': 4,
+    'window_painting_min_hours': 4,
+    'window_crane_min_hours': 2,
+}
+
+# --- RULE TABLE ---
+# Condition fields: rain_24h, evap_rate, temp_f, humidity, wind_mph, upcoming_rain_prob,
+# forecast_rain_24h (gridpoint QPF, inches over the next 24h), gust_mph (peak forecast gust, next 24h),
+# soil_moisture (modelled storage, percent of field capacity - see soil_moisture.py).
+# Each activity's rules are checked in order and the first match sets its
+# status and note; `when` clauses are ANDed. If no rule fires but a field the
+# activity depends on is missing (None/NaN), the status is MISSING_DATA_STATUS
+# rather than GO. Otherwise no match means GO with `default_note`.
+ACTIVITY_RULES = {
+    'concrete_pouring': {
+        'rules': [
+            {'status': 'STOP', 'when': [('soil_moisture', '>', 'concrete_soil_wet_pct')], 'note': 'Subgrade too wet ({soil_moisture}% soil moisture)'},
+            {'status': 'CAUTION', 'when': [('forecast_rain_24h', '>', 'concrete_forecast_rain_in')], 'note': '{forecast_rain_24h} in of rain forecast in the next 24h - protect fresh concrete'},
+            {'status': 'CAUTION', 'when': [('evap_rate', '>', 'concrete_evap_kg_m2_h')], 'note': 'High evaporation ({evap_rate} kg/m²/h) - increase curing'},
+            {'status': 'CAUTION', 'when': [('temp_f', '<', 'concrete_cold_f')], 'note': 'Cold weather - use heated concrete/protection'},
+            {'status': 'CAUTION', 'when': [('temp_f', '>', 'concrete_hot_f')], 'note': 'Hot weather - plan for early morning pours'},
+        ],
+        'default_note': 'Optimal conditions for concrete work',
+    },
+    'grading_excavation': {
+        'rules': [
+            {'status': 'STOP', 'when': [('soil_moisture', '>', 'grading_saturated_pct')], 'note': 'Soil saturated ({soil_moisture}%) - equipment damage risk'},
+            {'status': 'CAUTION', 'when': [('soil_moisture', '>', 'grading_wet_pct')], 'note': 'Soil wet ({soil_moisture}%) - limited operations only'},
+            {'status': 'CAUTION', 'when': [('forecast_rain_24h', '>', 'grading_forecast_rain_in')], 'note': '{forecast_rain_24h} in of rain forecast - stabilize exposed slopes, check silt fence'},
+        ],
+        'default_note': 'Ground conditions suitable',
+    },
+    'asphalt_paving': {
+        'rules': [
+            {'status': 'STOP', 'when': [('rain_24h', '>', 'asphalt_rain_in')], 'note': 'Surface must be dry'},
+            {'status': 'STOP', 'when': [('temp_f', '<', 'asphalt_cold_f')], 'note': 'Temperature too low for asphalt'},
+            {'status': 'CAUTION', 'when': [('upcoming_rain_prob', '>', 'forecast_rain_prob')], 'note': 'Rain forecasted - complete quickly'},
+        ],
+        'default_note': None,
+    },
+    'painting_coating': {
+        'rules': [
+            {'status': 'STOP', 'when': [('humidity', '>', 'painting_humidity')], 'note': 'Humidity too high'},
+            {'status': 'CAUTION', 'when': [('temp_f', '<', 'painting_cold_f')], 'note': 'Temperature outside optimal range'},
+            {'status': 'CAUTION', 'when': [('temp_f', '>', 'painting_hot_f')], 'note': 'Temperature outside optimal range'},
+            {'status': 'CAUTION', 'when': [('rain_24h', '>', 'painting_rain_in')], 'note': 'Recent moisture - verify surface dry'},
+        ],
+        'default_note': None,
+    },
+    'crane_ops': {
+        'rules': [
+            {'status': 'STOP', 'when': [('wind_mph', '>', 'crane_stop_mph')], 'note': 'Wind speed {wind_mph} mph exceeds safe limits'},
+            {'status': 'STOP', 'when': [('gust_mph', '>', 'crane_gust_stop_mph')], 'note': 'Gusts to {gust_mph} mph forecast - no lifts'},
+            {'status': 'CAUTION', 'when': [('wind_mph', '>', 'crane_caution_mph')], 'note': 'Monitor wind speeds closely'},
+            {'status': 'CAUTION', 'when': [('gust_mph', '>', 'crane_gust_caution_mph')], 'note': 'Gusts to {gust_mph} mph forecast - plan lifts for calm periods'},
+        ],
+        'default_note': None,
+    },
+}
+
+MISSING_DATA_STATUS = 'CAUTION'
+MISSING_DATA_NOTE = 'No current {fields} reading - verify conditions on site'
+FIELD_LABELS = {
+    'rain_24h': 'rainfall', 'evap_rate': 'evaporation', 'temp_f': 'temperature',
+    'humidity': 'humidity', 'wind_mph': 'wind', 'upcoming_rain_prob': 'forecast',
+    'forecast_rain_24h': 'forecast rainfall', 'gust_mph': 'gust forecast', 'soil_moisture': 'soil moisture',
+}
+
+# Safety rules are independent: every matching rule adds its message
+SAFETY_RULES = [
+    {'when': [('temp_f', '>', 'heat_advisory_f')], 'note': '🌡️ Heat Advisory: Ensure hydration stations, frequent breaks'},
+    {'when': [('wind_mph', '>', 'high_wind_mph')], 'note': '💨 High Wind: Secure loose materials, caution with tall equipment'},
+]
+
+# Daily work-window criteria over forecast fields (precipitation_prob, high)
+WINDOW_RULES = {
+    'concrete_pouring': [('precipitation_prob', '<', 'window_concrete_max_pop'),
+                         ('high', '>=', 'window_concrete_min_f'), ('high', '<=', 'window_concrete_max_f')],
+    'grading': [('precipitation_prob', '<', 'window_grading_max_pop')],
+    'painting': [('precipitation_prob', '<', 'window_painting_max_pop'),
+                 ('high', '>=', 'window_painting_min_f'), ('high', '<=', 'window_painting_max_f')],
+}
+
+# Hourly work-window criteria over forecast/hourly fields (pop, temp_f, humidity, wind_mph),
+# with the minimum contiguous block crews can use
+HOURLY_WINDOW_RULES = {
+    'concrete_pouring': {
+        'when': [('pop', '<', 'window_concrete_max_pop'),
+                 ('temp_f', '>=', 'window_concrete_min_f'), ('temp_f', '<=', 'window_concrete_max_f')],
+        'min_hours': 'window_concrete_min_hours',
+    },
+    'grading': {
+        'when': [('pop', '<', 'window_grading_max_pop')],
+        'min_hours': 'window_grading_min_hours',
+    },
+    'asphalt_paving': {
+        'when': [('pop', '<', 'hourly_asphalt_max_pop'), ('temp_f', '>=', 'asphalt_cold_f')],
+        'min_hours': 'window_asphalt_min_hours',
+    },
+    'painting': {
+        'when': [('pop', '<', 'window_painting_max_pop'), ('humidity', '<=', 'painting_humidity'),
+                 ('temp_f', '>=', 'window_painting_min_f'), ('temp_f', '<=', 'window_painting_max_f')],
+        'min_hours': 'window_painting_min_hours',
+    },
+    'crane_ops': {
+        'when': [('wind_mph', '<=', 'hourly_crane_max_mph')],
+        'min_hours': 'window_crane_min_hours',
+    },
+}
+
+STATUSES = np.array(['GO', 'CAUTION', 'STOP'])
+_STATUS_CODES = {'GO': 0, 'CAUTION': 1, 'STOP': 2}
+_OPS = {'>': operator.gt, '<': operator.lt, '>=': operator.ge, '<=': operator.le}
+
+def resolve_thresholds(overrides=None):
+    """Default thresholds with per-site overrides applied"""
+    thresholds = dict(THRESHOLDS)
+    if overrides:
+        unknown = set(overrides) - set(THRESHOLDS)
+        if unknown:
+            raise ValueError(f"Unknown activity thresholds: {', '.join(sorted(unknown))}")
+        thresholds.update(overrides)
+    return thresholds
+
+def match(when, conditions, thresholds):
+    """Boolean mask for an ANDed list of (field, op, threshold) clauses"""
+    mask = True
+    for field, op, threshold in when:
+        mask = mask & _OPS[op](np.asarray(conditions[field], dtype=np.float64), thresholds[threshold])
+    return np.asarray(mask, dtype=bool)
+
+def evaluate(conditions, thresholds=None):
+    """Evaluate every activity rule over arrays of conditions in one pass.
+
+    `conditions` maps field name to an array (any broadcastable shape, e.g.
+    hours x sites). Returns {activity: matched rule index array}, -1 where no
+    rule fired, -2 where none fired but an input was missing, plus
+    {'general_safety': bool array per safety rule}.
+    """
+    thresholds = thresholds or THRESHOLDS
+    shape = np.broadcast(*[np.asarray(value, dtype=np.float64) for value in conditions.values()]).shape
+    results = {}
+    for activity, spec in ACTIVITY_RULES.items():
+        masks = [np.broadcast_to(match(rule['when'], conditions, thresholds), shape) for rule in spec['rules']]
+        missing = False
+        for absent in missing_fields(spec, conditions).values():
+            missing = missing | absent
+        masks.append(np.broadcast_to(missing, shape))
+        results[activity] = np.select(masks, list(range(len(spec['rules']))) + [-2], default=-1)
+    results['general_safety'] = [np.broadcast_to(match(rule['when'], conditions, thresholds), shape)
+                                 for rule in SAFETY_RULES]
+    return results
+
+def missing_fields(spec, conditions):
+    """{field: NaN mask} for every condition field an activity's rules read"""
+    fields = dict.fromkeys(field for rule in spec['rules'] for field, _, _ in rule['when'])
+    return {field: np.isnan(np.asarray(conditions[field], dtype=np.float64)) for field in fields}
+
+def status_codes(conditions, thresholds=None):
+    """Activity statuses as int arrays (0 GO, 1 CAUTION, 2 STOP); STATUSES[codes] gives names"""
+    return matched_status_codes(evaluate(conditions, thresholds))
+
+def matched_status_codes(matched):
+    """Status codes for evaluate() results, when the matched rule indices are needed too"""
+    codes = {}
+    for activity, spec in ACTIVITY_RULES.items():
+        lookup = np.array([_STATUS_CODES[rule['status']] for rule in spec['rules']]
+                          + [_STATUS_CODES[MISSING_DATA_STATUS], 0], dtype=np.int8)
+        codes[activity] = lookup[matched[activity]]  # -2 picks the missing-data status, -1 the trailing GO
+    return codes
+
+def recommend(conditions, thresholds=None):
+    """Recommendations for a single snapshot of scalar conditions, in the report's shape"""
+    thresholds = thresholds or THRESHOLDS
+    matched = evaluate(conditions, thresholds)
+    values = {field: value for field, value in conditions.items()}
+
+    recommendations = {}
+    for activity, spec in ACTIVITY_RULES.items():
+        index = int(matched[activity])
+        if index >= 0:
+            rule = spec['rules'][index]
+            recommendations[activity] = {'status': rule['status'], 'notes': [rule['note'].format(**values)]}
+        elif index == -2:
+            missing = [FIELD_LABELS.get(field, field) for field, absent in missing_fields(spec, conditions).items()
+                       if absent.any()]
+            recommendations[activity] = {'status': MISSING_DATA_STATUS,
+                                         'notes': [MISSING_DATA_NOTE.format(fields=', '.join(missing))]}
+        else:
+            notes = [spec['default_note']] if spec['default_note'] else []
+            recommendations[activity] = {'status': 'GO', 'notes': notes}
+
+    recommendations['general_safety'] = [rule['note'] for rule, fired in zip(SAFETY_RULES, matched['general_safety'])
+                                         if bool(fired)]
+    return recommendations
+
+def window_mask(forecast_fields, activity, thresholds=None):
+    """Days (or hours) meeting an activity's work-window criteria, vectorized over the forecast arrays"""
+    return match(WINDOW_RULES[activity], forecast_fields, thresholds or THRESHOLDS)
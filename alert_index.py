@@ -0,0 +1,259 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+import update_report
+from http_client import get_json
+
+# --- CONFIGURATION ---
+ZONES_PATH = "catalog/alert_zones.sqlite"
+ZONES_TTL_S = 90 * 86400  # Zone/county outlines only move with NWS boundary updates, a few times a year
+ZONE_TIMEOUT = 10
+ZONE_WORKERS = 8          # Concurrent geometry fetches for zones not yet cached
+AREA_TIMEOUT = 15         # A state's alert set runs to a few MB during an outbreak
+PIP_CELLS = 1 << 20       # Sites x polygon edges tested per block, to bound memory
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS zones (
+    id TEXT PRIMARY KEY,
+    polygons TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS alert_matches (
+    fingerprint TEXT NOT NULL,
+    alert_id TEXT NOT NULL,
+    alert TEXT NOT NULL,
+    positions TEXT NOT NULL,
+    PRIMARY KEY (fingerprint, alert_id)
+) WITHOUT ROWID;
+"""
+
+_indexes = {}
+
+def connect(path=ZONES_PATH):
+    """Open (and create if needed) the zone geometry cache and the last matched alert set"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    db = sqlite3.connect(path, timeout=30)
+    db.executescript(_SCHEMA)
+    return db
+
+def site_area(site):
+    """Two-letter state whose alert feed covers a site, if the manifest says (state, or its forecast zone's prefix)"""
+    return site.get('state') or (site.get('forecast_zone') or '')[:2] or None
+
+# ===== GEOMETRY =====
+def geometry_polygons(geometry):
+    """[[ring, ...] per polygon] of a GeoJSON Polygon/MultiPolygon; rings are lists of [lon, lat]"""
+    if not geometry:
+        return []
+    if geometry['type'] == 'Polygon':
+        return [geometry['coordinates']]
+    if geometry['type'] == 'MultiPolygon':
+        return list(geometry['coordinates'])
+    return []
+
+def compile_outline(polygons):
+    """Edge arrays for an alert's outline, grouped per polygon, plus its bounding box; None if it has no area.
+
+    Rings of one polygon share a parity count (so holes work); separate
+    polygons are tested independently, so overlapping zones still union.
+    """
+    edges, starts = [], []
+    count = 0
+    for polygon in polygons:
+        rings = [np.asarray(ring, dtype=np.float64)[:, :2] for ring in polygon if len(ring) >= 3]
+        if not rings:
+            continue
+        starts.append(count)
+        for ring in rings:
+            edges.append(np.hstack([ring, np.roll(ring, -1, axis=0)]))
+            count += len(ring)
+    if not edges:
+        return None
+    edges = np.vstack(edges)
+    return {
+        'edges': edges.T.copy(),  # x1, y1, x2, y2 rows
+        'starts': np.array(starts),
+        'bbox': (edges[:, 0].min(), edges[:, 1].min(), edges[:, 0].max(), edges[:, 1].max()),
+    }
+
+def contains(outline, lon, lat):
+    """Boolean per point: inside any of the outline's polygons (even-odd ray casting, vectorized)"""
+    x1, y1, x2, y2 = outline['edges']
+    inside = np.zeros(len(lon), dtype=bool)
+    step = max(1, PIP_CELLS // len(x1))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for start in range(0, len(lon), step):
+            px, py = lon[start:start + step, None], lat[start:start + step, None]
+            straddles = (y1 > py) != (y2 > py)
+            crosses = straddles & (px < x1 + (py - y1) * (x2 - x1) / (y2 - y1))
+            parity = np.add.reduceat(crosses.astype(np.int32), outline['starts'], axis=1) % 2
+            inside[start:start + step] = parity.any(axis=1)
+    return inside
+
+# ===== ZONE GEOMETRY =====
+def _fetch_zone(zone_id, timeout=ZONE_TIMEOUT):
+    kind = 'county' if zone_id[2] == 'C' else 'forecast'
+    try:
+        geometry = get_json(f"{update_report.NWS_API}/zones/{kind}/{zone_id}", timeout).get('geometry')
+    except requests.RequestException:
+        return None  # Not cached; alerts on this zone still match sites by zone code
+    return geometry_polygons(geometry)
+
+def zone_polygons(zone_ids, path=ZONES_PATH, workers=ZONE_WORKERS):
+    """{zone id: polygons} for UGC zone/county codes; only zones missing from the persistent cache are fetched"""
+    db = connect(path)
+    try:
+        found = {}
+        for zone_id in zone_ids:
+            row = db.execute("SELECT polygons, fetched_at FROM zones WHERE id = ?", (zone_id,)).fetchone()
+            if row and time.time() - row[1] < ZONES_TTL_S:
+                found[zone_id] = json.loads(row[0])
+    finally:
+        db.close()
+
+    missing = sorted(set(zone_ids) - set(found))
+    if missing:
+        with ThreadPoolExecutor(max_workers=min(workers, len(missing)), thread_name_prefix='zones') as executor:
+            fetched = {zone_id: polygons for zone_id, polygons in zip(missing, executor.map(_fetch_zone, missing))
+                       if polygons is not None}
+        db = connect(path)
+        try:
+            with db:
+                db.executemany("INSERT OR REPLACE INTO zones VALUES (?, ?, ?)",
+                               [(zone_id, json.dumps(polygons), time.time()) for zone_id, polygons in fetched.items()])
+        finally:
+            db.close()
+        found.update(fetched)
+    return found
+
+# ===== FETCH =====
+def get_area_alerts(areas, timeout=AREA_TIMEOUT, zones_path=ZONES_PATH):
+    """Every active NWS alert for a set of states in one request, each with the outline it covers.
+
+    Storm-based warnings carry their own polygon; zone-based products
+    (watches, advisories) are outlined by their UGC zones, whose geometry
+    is fetched once and cached in `zones_path`.
+    """
+    data = get_json(f"{update_report.NWS_API}/alerts/active?area={','.join(areas)}", timeout)
+    features = data.get('features', [])
+    needed = sorted({zone for feature in features if not feature.get('geometry')
+                     for zone in feature['properties'].get('geocode', {}).get('UGC', [])})
+    zones = zone_polygons(needed, zones_path) if needed else {}
+
+    alerts = []
+    for feature in features:
+        props = feature['properties']
+        ugc = props.get('geocode', {}).get('UGC', [])
+        own = geometry_polygons(feature.get('geometry'))
+        alerts.append({
+            'id': props.get('id') or feature.get('id'),
+            'alert': update_report.parse_alert(props),
+            # A storm-based warning covers its polygon only, not every site in the zones it lists
+            'zones': [] if own else ugc,
+            'outline': compile_outline(own or [polygon for zone in ugc for polygon in zones.get(zone, [])]),
+        })
+
+    if alerts:
+        print(f"⚠️ {len(alerts)} active weather alerts across {', '.join(areas)}")
+    else:
+        print(f"✅ No active weather alerts across {', '.join(areas)}")
+    return alerts
+
+# ===== ASSIGNMENT =====
+class AlertIndex:
+    """A fleet's sites indexed for alert assignment.
+
+    Sites are sorted by longitude, so an alert's bounding box selects its
+    candidates with two binary searches before the point-in-polygon test.
+    The last alert set and its matches are kept (and, with `path`, persisted
+    per site set, so the next run starts from them): a refresh only tests
+    alerts it has not seen, and drops the expired ones.
+    """
+
+    def __init__(self, sites, path=None):
+        self.path = path
+        self.fingerprint = hashlib.sha256(json.dumps(
+            [(site['id'], site['lat'], site['lon'], site.get('forecast_zone')) for site in sites]).encode()).hexdigest()[:16]
+        self.site_ids = [site['id'] for site in sites]
+        lon = np.array([site['lon'] for site in sites], dtype=np.float64)
+        self.order = np.argsort(lon, kind='stable')
+        self.lon = lon[self.order]
+        self.lat = np.array([site['lat'] for site in sites], dtype=np.float64)[self.order]
+        self.site_zones = np.array([site.get('forecast_zone') or '' for site in sites])
+        self.alerts = {}
+        self.members = {}
+        if path:
+            db = connect(path)
+            try:
+                rows = db.execute("SELECT alert_id, alert, positions FROM alert_matches WHERE fingerprint = ?", (self.fingerprint,))
+                for alert_id, alert, positions in rows:
+                    self.alerts[alert_id] = json.loads(alert)
+                    self.members[alert_id] = np.array(json.loads(positions), dtype=np.int64)
+            finally:
+                db.close()
+
+    def _match(self, alert):
+        """Positions (into site_ids) of the sites an alert covers: zone-outlined alerts by zone code or
+        outline, storm-based warnings by their polygon alone"""
+        matched = np.flatnonzero(np.isin(self.site_zones, alert['zones'])) if alert['zones'] else np.array([], dtype=np.int64)
+        outline = alert['outline']
+        if outline is not None:
+            west, south, east, north = outline['bbox']
+            lo, hi = np.searchsorted(self.lon, west, 'left'), np.searchsorted(self.lon, east, 'right')
+            box = np.arange(lo, hi)[(self.lat[lo:hi] >= south) & (self.lat[lo:hi] <= north)]
+            inside = box[contains(outline, self.lon[box], self.lat[box])]
+            matched = np.union1d(matched, self.order[inside])
+        return matched
+
+    def update(self, alerts):
+        """Replace the active alert set; returns (new ids, expired ids, ids of the sites whose alerts changed)"""
+        current = {alert['id']: alert for alert in alerts}
+        expired = [alert_id for alert_id in self.alerts if alert_id not in current]
+        new = [alert_id for alert_id in current if alert_id not in self.alerts]
+        touched = [self.members.pop(alert_id) for alert_id in expired]
+        for alert_id in new:
+            self.members[alert_id] = self._match(current[alert_id])
+            touched.append(self.members[alert_id])
+        self.alerts = {alert_id: alert['alert'] for alert_id, alert in current.items()}
+        if self.path and (new or expired):
+            self._save(new, expired)
+        changed = np.unique(np.concatenate(touched)).tolist() if touched else []
+        return new, expired, [self.site_ids[position] for position in changed]
+
+    def _save(self, new, expired):
+        db = connect(self.path)
+        try:
+            with db:
+                db.executemany("DELETE FROM alert_matches WHERE fingerprint = ? AND alert_id = ?",
+                               [(self.fingerprint, alert_id) for alert_id in expired])
+                db.executemany("INSERT OR REPLACE INTO alert_matches VALUES (?, ?, ?, ?)",
+                               [(self.fingerprint, alert_id, json.dumps(self.alerts[alert_id]),
+                                 json.dumps(self.members[alert_id].tolist())) for alert_id in new])
+        finally:
+            db.close()
+
+    def site_alerts(self):
+        """{site_id: [report alert dicts]}, in feed order"""
+        assigned = {site_id: [] for site_id in self.site_ids}
+        for alert_id, alert in self.alerts.items():
+            for position in self.members[alert_id].tolist():
+                assigned[self.site_ids[position]].append(alert)
+        return assigned
+
+def for_sites(sites, path=ZONES_PATH):
+    """The AlertIndex for this set of sites, resumed from the last run's persisted matches"""
+    key = (path,) + tuple((site['id'], site['lat'], site['lon'], site.get('forecast_zone')) for site in sites)
+    if key not in _indexes:
+        if len(_indexes) >= 8:
+            _indexes.clear()
+        _indexes[key] = AlertIndex(sites, path)
+    return _indexes[key]
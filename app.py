@@ -1,25 +1,45 @@
 import streamlit as st
-import pandas as pd
-import pydeck as pdk
-import json
+import os
 from datetime import datetime
 
+import history_store
+from dashboard_data import load_map, load_view
+from report_schema import SchemaError
+
 # --- CONFIG ---
 MAPBOX_TOKEN = st.secrets["MAPBOX_TOKEN"]
+LIVE_REFRESH_S = 60  # Alerts and current conditions re-check the report this often
 st.set_page_config(
     layout="wide",
     page_title="Construction Operations Daily Briefing",
     page_icon="🏗️"
 )
 
-# Load data
+# Load data (parsed once per report update, shared across sessions)
 try:
-    with open('latest_report.json') as f:
-        data = json.load(f)
+    view = load_view()
+    data = view['data']
+except SchemaError as e:
+    st.error(f"❌ Report format mismatch - update the dashboard or rerun the GitHub Action. ({e})")
+    st.stop()
 except:
     st.error("❌ No data found. Please trigger the GitHub Action.")
     st.stop()
 
+def live_view():
+    """Latest report for a live fragment.
+
+    A tick costs one os.stat; the report is re-parsed only when the file
+    changed. Only the live fragments rerun: the other sections keep the
+    report the page was drawn from until the next full rerun (a reload or
+    widget change), when their cached frames and map are reused unless
+    their own inputs changed.
+    """
+    try:
+        return load_view()
+    except Exception:
+        return view  # Mid-write or unreadable: keep showing the last good report
+
 # --- CUSTOM CSS ---
 st.markdown("""
 <style>
@@ -35,64 +55,79 @@ st.markdown("""
 
 # --- HEADER ---
 st.title("🏗️ Construction Operations Daily Briefing")
-st.subheader(f"📍 {data['site_info']['name']}")
+st.subheader(f"📍 {data.site_info.name}")
 
-try:
-    last_update = datetime.fromisoformat(data['last_updated'])
-    st.caption(f"🕒 Generated: {last_update.strftime('%A, %B %d, %Y at %I:%M %p')}")
-except:
-    st.caption("🕒 Last Updated: Recently")
-
-st.divider()
+def reading(value, unit):
+    return "N/A" if value is None else f"{value}{unit}"
 
 # --- ACTIVE ALERTS SECTION ---
-if data.get('active_alerts') and len(data['active_alerts']) > 0:
-    st.markdown("## ⚠️ ACTIVE WEATHER ALERTS")
-    for alert in data['active_alerts']:
-        severity_class = "alert-severe" if alert['severity'] in ['Severe', 'Extreme'] else "alert-moderate"
-        st.markdown(f"""
-        <div class="alert-box {severity_class}">
-            <strong>{alert['event']}</strong> - {alert['severity']}<br/>
-            {alert['headline']}<br/>
-            <small>{alert.get('instruction', '')}</small>
-        </div>
-        """, unsafe_allow_html=True)
+@st.fragment(run_every=LIVE_REFRESH_S)
+def alerts_section():
+    """Generation time, stale-source warnings and active alerts"""
+    data = live_view()['data']
+    try:
+        last_update = datetime.fromisoformat(data.last_updated)
+        st.caption(f"🕒 Generated: {last_update.strftime('%A, %B %d, %Y at %I:%M %p')}")
+    except:
+        st.caption("🕒 Last Updated: Recently")
+
+    freshness = data.data_freshness
+    last_good = [f"{name} ({status.age_s // 60} min old)" for name, status in freshness.items()
+                 if status.stale and status.age_s is not None]
+    unavailable = [name for name, status in freshness.items() if status.stale and status.age_s is None]
+    if last_good:
+        st.warning(f"⏱️ Upstream unavailable - showing last known good data: {', '.join(last_good)}")
+    if unavailable:
+        st.warning(f"⏱️ No data (readings shown as N/A): {', '.join(unavailable)}")
+
     st.divider()
 
-# --- CURRENT CONDITIONS ---
-st.markdown("## 🌤️ Current Conditions")
+    if data.active_alerts:
+        st.markdown("## ⚠️ ACTIVE WEATHER ALERTS")
+        for alert in data.active_alerts:
+            severity_class = "alert-severe" if alert.severity in ['Severe', 'Extreme'] else "alert-moderate"
+            st.markdown(f"""
+            <div class="alert-box {severity_class}">
+                <strong>{alert.event}</strong> - {alert.severity}<br/>
+                {alert.headline or ''}<br/>
+                <small>{alert.instruction or ''}</small>
+            </div>
+            """, unsafe_allow_html=True)
+        st.divider()
 
-col1, col2, col3, col4, col5 = st.columns(5)
+# --- CURRENT CONDITIONS ---
+@st.fragment(run_every=LIVE_REFRESH_S)
+def conditions_section():
+    data = live_view()['data']
+    st.markdown("## 🌤️ Current Conditions")
 
-with col1:
-    st.metric("Temperature", f"{data['current_conditions']['temperature_f']}°F")
+    col1, col2, col3, col4, col5 = st.columns(5)
+    conditions = data.current_conditions
 
-with col2:
-    st.metric("Wind", f"{data['current_conditions']['wind_speed_mph']} mph", 
-              data['current_conditions']['wind_direction'])
+    with col1:
+        st.metric("Temperature", reading(conditions.temperature_f, "°F"))
 
-with col3:
-    st.metric("Humidity", f"{data['current_conditions']['humidity_percent']}%")
+    with col2:
+        st.metric("Wind", reading(conditions.wind_speed_mph, " mph"),
+                  conditions.wind_direction)
 
-with col4:
-    st.metric("24hr Rainfall", f"{data['current_conditions']['precipitation_24h']} in")
+    with col3:
+        st.metric("Humidity", reading(conditions.humidity_percent, "%"))
 
-with col5:
-    st.metric("Soil Status", data['soil_moisture']['status'])
+    with col4:
+        st.metric("24hr Rainfall", reading(conditions.precipitation_24h, " in"))
+        if data.rainfall_accumulation:
+            st.caption(" | ".join(f"{window}: {reading(inches, ' in')}" for window, inches in data.rainfall_accumulation.items()))
 
-st.divider()
+    with col5:
+        st.metric("Soil Status", data.soil_moisture.status)
+        st.caption(f"{data.soil_moisture.level} of field capacity (modelled)")
 
 # --- ACTIVITY RECOMMENDATIONS ---
-st.markdown("## 📋 Today's Activity Recommendations")
-
-recs = data['activity_recommendations']
-
-col1, col2, col3 = st.columns(3)
-
 def display_activity(col, title, icon, activity_data):
     with col:
-        status = activity_data['status']
-        
+        status = activity_data.status
+
         if status == 'GO':
             col.success(f"{icon} **{title}**")
             status_class = "status-go"
@@ -102,139 +137,194 @@ def display_activity(col, title, icon, activity_data):
         else:
             col.error(f"{icon} **{title}**")
             status_class = "status-stop"
-        
-        col.markdown(f"<div class='big-font {status_class}'>{status}</div>", unsafe_allow_html=True)
-        
-        for note in activity_data['notes']:
-            col.write(f"• {note}")
 
-display_activity(col1, "Concrete Pouring", "🧱", recs['concrete_pouring'])
-display_activity(col2, "Grading/Excavation", "🚜", recs['grading_excavation'])
-display_activity(col3, "Crane Operations", "🏗️", recs['crane_ops'])
+        col.markdown(f"<div class='big-font {status_class}'>{status}</div>", unsafe_allow_html=True)
 
-st.divider()
+        for note in activity_data.notes:
+            col.write(f"• {note}")
 
-col1, col2 = st.columns(2)
-display_activity(col1, "Asphalt Paving", "🛣️", recs['asphalt_paving'])
-display_activity(col2, "Painting/Coating", "🎨", recs['painting_coating'])
+def recommendations_section(view):
+    data = view['data']
+    st.markdown("## 📋 Today's Activity Recommendations")
 
-# General Safety
-if recs['general_safety']:
-    st.warning("**⚠️ Safety Alerts:**")
-    for alert in recs['general_safety']:
-        st.write(f"• {alert}")
+    recs = data.activity_recommendations
 
-st.divider()
+    col1, col2, col3 = st.columns(3)
+    display_activity(col1, "Concrete Pouring", "🧱", recs.concrete_pouring)
+    display_activity(col2, "Grading/Excavation", "🚜", recs.grading_excavation)
+    display_activity(col3, "Crane Operations", "🏗️", recs.crane_ops)
 
-# --- 7-DAY FORECAST ---
-st.markdown("## 📅 7-Day Forecast & Planning")
-
-if data.get('forecast_7day'):
-    forecast_df = pd.DataFrame(data['forecast_7day'])
-    
-    # Create forecast table
-    display_df = forecast_df[['day', 'high', 'low', 'precipitation_prob', 'wind_speed', 'short_forecast']].copy()
-    display_df.columns = ['Day', 'High °F', 'Low °F', 'Rain %', 'Wind', 'Conditions']
-    
-    st.dataframe(display_df, use_container_width=True, hide_index=True)
-    
-    # Detailed forecast expander
-    with st.expander("📖 Detailed Forecast"):
-        for day in data['forecast_7day']:
-            st.markdown(f"**{day['day']}** - {day['date']}")
-            st.write(day['detailed_forecast'])
-            st.divider()
+    st.divider()
 
-st.divider()
+    col1, col2 = st.columns(2)
+    display_activity(col1, "Asphalt Paving", "🛣️", recs.asphalt_paving)
+    display_activity(col2, "Painting/Coating", "🎨", recs.painting_coating)
+
+    # General Safety
+    if recs.general_safety:
+        st.warning("**⚠️ Safety Alerts:**")
+        for alert in recs.general_safety:
+            st.write(f"• {alert}")
+
+# --- EVAPORATION PROJECTION & 7-DAY FORECAST ---
+def forecast_section(view):
+    data = view['data']
+    if view['evaporation_curve'] is not None:
+        projection = data.concrete_ops.evap_projection
+        st.markdown("## 💧 Projected Evaporation (Pour Planning)")
+        st.caption(f"ACI 305R rate over the hourly forecast at {reading(data.concrete_ops.concrete_temp_f, '°F')} concrete | "
+                   f"{projection.hours_above_0_5} h above 0.5, {projection.hours_above_1_0} h above 1.0 kg/m²/h")
+        st.line_chart(view['evaporation_curve'])
+        st.divider()
+
+    st.markdown("## 📅 7-Day Forecast & Planning")
+
+    quantities = data.forecast_quantities
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Rain Next 24h", reading(quantities.rain_in.get('24h'), " in"))
+    with col2:
+        st.metric("Rain Next 48h", reading(quantities.rain_in.get('48h'), " in"))
+    with col3:
+        st.metric("Rain Next 72h", reading(quantities.rain_in.get('72h'), " in"))
+    with col4:
+        st.metric("Peak Gust (24h)", reading(quantities.peak_gust_mph, " mph"))
+    st.caption("NWS gridpoint QPF and wind gust forecast")
+
+    if view['forecast_table'] is not None:
+        st.dataframe(view['forecast_table'], use_container_width=True, hide_index=True)
+
+        # Detailed forecast expander
+        with st.expander("📖 Detailed Forecast"):
+            for day in data.forecast_7day:
+                st.markdown(f"**{day.day}** - {day.date}")
+                st.write(day.detailed_forecast)
+                st.divider()
 
 # --- OPTIMAL WORK WINDOWS ---
-st.markdown("## 🎯 Optimal Work Windows (Next 7 Days)")
+def format_block(window):
+    start = datetime.fromisoformat(window.best_start)
+    end = datetime.fromisoformat(window.best_end)
+    return f"{start.strftime('%a %I:%M %p')} – {end.strftime('%I:%M %p')}"
 
-windows = data.get('optimal_work_windows', {})
+def windows_section(view):
+    data = view['data']
+    st.markdown("## 🎯 Optimal Work Windows (Next 7 Days)")
 
-col1, col2, col3 = st.columns(3)
+    windows = data.optimal_work_windows
 
-with col1:
-    st.markdown("### 🧱 Concrete Pouring")
-    if windows.get('concrete_pouring'):
-        for day in windows['concrete_pouring']:
-            st.success(f"✅ {day}")
-    else:
-        st.warning("⚠️ No optimal days forecasted")
+    col1, col2, col3 = st.columns(3)
 
-with col2:
-    st.markdown("### 🚜 Grading Operations")
-    if windows.get('grading'):
-        for day in windows['grading']:
-            st.success(f"✅ {day}")
-    else:
-        st.warning("⚠️ No optimal days forecasted")
+    with col1:
+        st.markdown("### 🧱 Concrete Pouring")
+        if windows.get('concrete_pouring'):
+            for day in windows['concrete_pouring']:
+                st.success(f"✅ {day}")
+        else:
+            st.warning("⚠️ No optimal days forecasted")
 
-with col3:
-    st.markdown("### 🎨 Painting/Coating")
-    if windows.get('painting'):
-        for day in windows['painting']:
-            st.success(f"✅ {day}")
-    else:
-        st.warning("⚠️ No optimal days forecasted")
+    with col2:
+        st.markdown("### 🚜 Grading Operations")
+        if windows.get('grading'):
+            for day in windows['grading']:
+                st.success(f"✅ {day}")
+        else:
+            st.warning("⚠️ No optimal days forecasted")
 
-st.divider()
+    with col3:
+        st.markdown("### 🎨 Painting/Coating")
+        if windows.get('painting'):
+            for day in windows['painting']:
+                st.success(f"✅ {day}")
+        else:
+            st.warning("⚠️ No optimal days forecasted")
+
+    hourly_windows = data.hourly_work_windows
+    if any(hourly_windows.values()):
+        st.markdown("### ⏱️ Hourly Work Blocks")
+
+        blocks = [
+            {'Activity': activity.replace('_', ' ').title(), 'Best Block': format_block(window),
+             'Window Hours': window.hours, 'Score': window.score}
+            for activity, activity_windows in hourly_windows.items()
+            for window in activity_windows[:3]
+        ]
+        st.dataframe(blocks, use_container_width=True, hide_index=True)
+
+# --- HISTORICAL TRENDS ---
+@st.cache_data
+def load_trends(site_id, days, path, mtime):
+    """The history store when it is local (watch mode), else the committed trends export; mtime keys the cache to new runs"""
+    if path == history_store.HISTORY_PATH:
+        return history_store.query_days(site_id, days, columns=history_store.TREND_COLUMNS)
+    return history_store.read_trends(site_id, days, path)
+
+@st.fragment
+def trends_section(site_id):
+    """Changing the range reruns only this section"""
+    st.markdown("## 📈 Historical Trends")
+
+    path = next((path for path in (history_store.HISTORY_PATH, history_store.TRENDS_PATH) if os.path.exists(path)), None)
+    if site_id and path:
+        days = st.radio("Range", [30, 90], horizontal=True, format_func=lambda d: f"{d} days")
+        trends = load_trends(site_id, days, path, os.path.getmtime(path))
+
+        if trends.empty:
+            st.info("No history recorded for this range yet")
+        else:
+            col1, col2 = st.columns(2)
+            with col1:
+                st.markdown("**Temperature & Humidity**")
+                st.line_chart(trends[['temperature_f', 'humidity_percent']])
+            with col2:
+                st.markdown("**Rainfall (in)**")
+                st.line_chart(trends[['rain_24h', 'rain_72h']])
+
+            col1, col2 = st.columns(2)
+            with col1:
+                st.markdown("**Evaporation (kg/m²/h)**")
+                st.line_chart(trends[['evap_rate_kg_m2_h']])
+            with col2:
+                st.markdown("**Concrete Pour Calls**")
+                st.bar_chart(trends['concrete_pouring_status'].value_counts())
+    else:
+        st.info("No history recorded yet")
 
 # --- SWPPP MAP ---
-st.markdown("## 📍 SWPPP Compliance & Field Maintenance Map")
-st.caption("Satellite view with active inspection points")
-
-df = pd.DataFrame(data['swppp_compliance']['map_labels'])
-
-if 'color' not in df.columns:
-    df['color'] = df['priority'].apply(lambda x: [230, 0, 0] if x == 'High' else [255, 165, 0])
-
-view_state = pdk.ViewState(
-    latitude=data['site_info']['location']['lat'],
-    longitude=data['site_info']['location']['lon'],
-    zoom=17.5,
-    pitch=45
-)
-
-points = pdk.Layer(
-    "ScatterplotLayer",
-    df,
-    get_position="[lon, lat]",
-    get_color="color",
-    get_radius=8,
-    pickable=True
-)
-
-labels = pdk.Layer(
-    "TextLayer",
-    df,
-    get_position="[lon, lat]",
-    get_text="label",
-    get_size=16,
-    get_color=[255, 255, 255],
-    get_alignment_baseline="'bottom'",
-    get_pixel_offset=[0, -15],
-)
-
-deck = pdk.Deck(
-    map_style="mapbox://styles/mapbox/satellite-v9",
-    api_keys={"mapbox": MAPBOX_TOKEN},
-    initial_view_state=view_state,
-    layers=[points, labels],
-    tooltip={"text": "{label}\nPriority: {priority}"}
-)
-
-st.pydeck_chart(deck)
-
-with st.expander("📋 Inspection Points Details"):
-    st.dataframe(
-        df[['label', 'priority', 'lat', 'lon']],
-        use_container_width=True,
-        hide_index=True
-    )
-
+@st.fragment
+def map_section(view):
+    """Zooming reruns only this section; the deck is cached per (map inputs, zoom, point store)"""
+    st.markdown("## 📍 SWPPP Compliance & Field Maintenance Map")
+    st.caption("Satellite view with active inspection points")
+
+    # Only the points in view are sent to the browser; zoomed out, nearby points merge into counted clusters
+    zoom = st.select_slider("Map zoom", options=[13.0, 14.0, 15.0, 16.0, 17.0, 17.5, 18.0, 19.0, 20.0], value=17.5)
+    site_map = load_map(view, MAPBOX_TOKEN, zoom)
+    st.pydeck_chart(site_map['deck'])
+    st.caption(f"{site_map['in_view']} inspection points in view ({site_map['markers']} markers)")
+
+    with st.expander("📋 Inspection Points Details"):
+        st.dataframe(
+            site_map['map_table'],
+            use_container_width=True,
+            hide_index=True
+        )
+
+# --- PAGE ---
+alerts_section()
+conditions_section()
+st.divider()
+recommendations_section(view)
+st.divider()
+forecast_section(view)
+st.divider()
+windows_section(view)
+st.divider()
+trends_section(data.site_info.id)
+st.divider()
+map_section(view)
 st.divider()
 
 # --- FOOTER ---
-st.caption(f"📡 Data Sources: {data['site_info']['gauge']} | NOAA NWS | KCLT Weather Station")
+st.caption(f"📡 Data Sources: {data.site_info.gauge} | NOAA NWS | KCLT Weather Station")
 st.caption("🔄 Auto-updates daily at 8:30 AM EST | Manual: GitHub Actions → Run Workflow")
@@ -0,0 +1,255 @@
+# Deterministic NWS / NWIS payloads in the shape the live APIs return.
+# The stub server falls back to these when no recorded payload exists, so the
+# benchmarks can vary forecast length, gauge count and alert volume freely.
+import math
+import random
+from datetime import datetime, timedelta, timezone
+
+EASTERN = timezone(timedelta(hours=-4))
+DAY_NAMES = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+def _start_of_hour():
+    return datetime.now(EASTERN).replace(minute=0, second=0, microsecond=0)
+
+def observation(station, seed=0, timestamp=None):
+    rng = random.Random(f"obs:{station}:{seed}")
+    timestamp = timestamp or datetime.now(timezone.utc).replace(second=0, microsecond=0)
+    return {
+        'properties': {
+            'station': station,
+            'timestamp': timestamp.isoformat(),
+            'temperature': {'unitCode': 'wmoUnit:degC', 'value': round(rng.uniform(5, 35), 1)},
+            'windSpeed': {'unitCode': 'wmoUnit:km_h-1', 'value': round(rng.uniform(0, 12), 1)},
+            'windDirection': {'unitCode': 'wmoUnit:degree_(angle)', 'value': rng.randrange(0, 360, 10)},
+            'relativeHumidity': {'unitCode': 'wmoUnit:percent', 'value': round(rng.uniform(30, 95), 1)},
+            'textDescription': rng.choice(['Clear', 'Partly Cloudy', 'Cloudy', 'Light Rain']),
+        }
+    }
+
+def forecast(office, x, y, periods=14):
+    rng = random.Random(f"forecast:{office}:{x}:{y}")
+    start = _start_of_hour().replace(hour=6)
+    items = []
+    for i in range(periods):
+        is_day = i % 2 == 0
+        begin = start + timedelta(hours=12 * i)
+        pop = rng.choice([None, 0, 10, 20, 40, 60, 80, 100])
+        items.append({
+            'number': i + 1,
+            'name': DAY_NAMES[begin.weekday()] + ("" if is_day else " Night"),
+            'startTime': begin.isoformat(),
+            'endTime': (begin + timedelta(hours=12)).isoformat(),
+            'isDaytime': is_day,
+            'temperature': rng.randint(70, 95) if is_day else rng.randint(50, 70),
+            'temperatureUnit': 'F',
+            'probabilityOfPrecipitation': {'unitCode': 'wmoUnit:percent', 'value': pop},
+            'windSpeed': f"{rng.randint(0, 10)} to {rng.randint(10, 25)} mph",
+            'windDirection': rng.choice(['N', 'NE', 'E', 'SE', 'S', 'SW', 'W', 'NW']),
+            'shortForecast': rng.choice(['Sunny', 'Chance Showers And Thunderstorms', 'Mostly Cloudy']),
+            'detailedForecast': "Showers and thunderstorms. Cloudy, with a high near 73. "
+                                "New rainfall amounts between a half and three quarters of an inch possible.",
+        })
+    return {'properties': {'periods': items}}
+
+def hourly_forecast(office, x, y, hours=156):
+    rng = random.Random(f"hourly:{office}:{x}:{y}")
+    start = _start_of_hour()
+    items = []
+    for i in range(hours):
+        begin = start + timedelta(hours=i)
+        diurnal = math.sin((begin.hour - 9) / 24 * 2 * math.pi)
+        items.append({
+            'number': i + 1,
+            'startTime': begin.isoformat(),
+            'endTime': (begin + timedelta(hours=1)).isoformat(),
+            'temperature': round(72 + 12 * diurnal + rng.uniform(-2, 2)),
+            'temperatureUnit': 'F',
+            'probabilityOfPrecipitation': {'unitCode': 'wmoUnit:percent', 'value': rng.choice([0, 5, 10, 15, 30, 60])},
+            'relativeHumidity': {'unitCode': 'wmoUnit:percent', 'value': round(70 - 20 * diurnal)},
+            'windSpeed': f"{rng.randint(0, 18)} mph",
+            'windDirection': 'SW',
+            'shortForecast': 'Partly Sunny',
+        })
+    return {'properties': {'periods': items}}
+
+def gridpoint(office, x, y, hours=156, start=None):
+    """Raw /gridpoints layers: ISO-8601 validTime intervals of mixed length, SI units like the live API"""
+    rng = random.Random(f"gridpoint:{office}:{x}:{y}")
+    start = (start or _start_of_hour()).astimezone(timezone.utc)
+
+    def layer(uom, spans, value):
+        values, offset = [], 0
+        while offset < hours:
+            span = min(rng.choice(spans), hours - offset)
+            begin = start + timedelta(hours=offset)
+            values.append({'validTime': f"{begin.isoformat()}/{'P1D' if span == 24 else f'PT{span}H'}", 'value': value(begin, span)})
+            offset += span
+        return {'uom': uom, 'values': values}
+
+    def diurnal(begin):
+        return math.sin((begin.astimezone(EASTERN).hour - 9) / 24 * 2 * math.pi)
+
+    return {'properties': {
+        'updateTime': start.isoformat(),
+        'validTimes': f"{start.isoformat()}/P7DT12H",
+        'temperature': layer('wmoUnit:degC', [1, 1, 2, 3], lambda b, s: round(22 + 7 * diurnal(b) + rng.uniform(-1, 1), 1)),
+        'relativeHumidity': layer('wmoUnit:percent', [1, 2, 3], lambda b, s: round(70 - 20 * diurnal(b))),
+        'probabilityOfPrecipitation': layer('wmoUnit:percent', [1, 3, 6], lambda b, s: rng.choice([0, 5, 10, 15, 30, 60])),
+        'quantitativePrecipitation': layer('wmoUnit:mm', [6], lambda b, s: rng.choice([0, 0, 0, 0.5, 2.5, 8.1])),
+        'windGust': layer('wmoUnit:km_h-1', [1, 2, 3], lambda b, s: round(rng.uniform(10, 55), 1)),
+        'windSpeed': layer('wmoUnit:km_h-1', [1, 2, 3], lambda b, s: round(rng.uniform(0, 30), 1)),
+        'skyCover': layer('wmoUnit:percent', [1, 2], lambda b, s: rng.randint(0, 100)),
+    }}
+
+# Rough state bounding boxes (south, west, north, east) for the generated station/gauge catalogs
+STATE_BOUNDS = {'NC': (33.8, -84.3, 36.6, -75.5), 'SC': (32.0, -83.4, 35.2, -78.5), 'GA': (30.4, -85.6, 35.0, -80.8)}
+NWS_OFFICES = ['GSP', 'RAH', 'ILM', 'MHX', 'CAE', 'FFC']
+
+def points(lat, lon):
+    """/points/{lat},{lon}: office and grid cell (~2.5 km) for a location"""
+    office = NWS_OFFICES[int((lon + 180) * 2) % len(NWS_OFFICES)]
+    x, y = int((lon + 180) * 40) % 200, int((lat + 90) * 40) % 200
+    return {'properties': {
+        'gridId': office, 'gridX': x, 'gridY': y,
+        'forecast': f"https://api.weather.gov/gridpoints/{office}/{x},{y}/forecast",
+        'forecastZone': f"https://api.weather.gov/zones/forecast/NCZ{x % 100:03d}",
+    }}
+
+def stations(state, count=150):
+    """/stations?state=XX as GeoJSON; KCLT sits at its real location"""
+    rng = random.Random(f"stations:{state}")
+    south, west, north, east = STATE_BOUNDS.get(state, (30.0, -90.0, 40.0, -75.0))
+    features = []
+    for i in range(count):
+        ident = f"K{state[0]}{i:02d}" if i else ('KCLT' if state == 'NC' else f"K{state}X")
+        lat, lon = (35.2144, -80.9473) if ident == 'KCLT' else (rng.uniform(south, north), rng.uniform(west, east))
+        features.append({
+            'geometry': {'type': 'Point', 'coordinates': [round(lon, 4), round(lat, 4)]},
+            'properties': {'stationIdentifier': ident, 'name': f"{state} Station {i}"},
+        })
+    return {'features': features, 'pagination': {'next': None}}
+
+def nwis_sites(state, count=300):
+    """/nwis/site/?format=rdb listing of precipitation gauges; 02146409 sits at its real location"""
+    rng = random.Random(f"nwis_sites:{state}")
+    south, west, north, east = STATE_BOUNDS.get(state, (30.0, -90.0, 40.0, -75.0))
+    lines = ['# Generated NWIS site listing', 'agency_cd\tsite_no\tstation_nm\tsite_tp_cd\tdec_lat_va\tdec_long_va',
+             '5s\t15s\t50s\t7s\t16s\t16s']
+    for i in range(count):
+        site = '02146409' if state == 'NC' and i == 0 else f"0{rng.randint(2000000, 3999999)}"
+        lat, lon = (35.1636, -80.8267) if site == '02146409' else (rng.uniform(south, north), rng.uniform(west, east))
+        lines.append(f"USGS\t{site}\t{'Archdale Dr' if site == '02146409' else f'{state} Rain Gage {i}'}\tAT\t{lat:.5f}\t{lon:.5f}")
+    return '\n'.join(lines) + '\n'
+
+def alerts(count=1, seed=0):
+    rng = random.Random(f"alerts:{seed}")
+    features = []
+    now = datetime.now(timezone.utc)
+    for i in range(count):
+        features.append({
+            'id': f"urn:oid:2.49.0.1.840.0.stub.{seed}.{i}",
+            'properties': {
+                'id': f"urn:oid:2.49.0.1.840.0.stub.{seed}.{i}",
+                'event': rng.choice(['Flood Watch', 'Heat Advisory', 'Severe Thunderstorm Warning']),
+                'severity': rng.choice(['Moderate', 'Severe']),
+                'urgency': 'Expected',
+                'headline': 'Stub alert issued for benchmarking',
+                'description': 'Synthetic alert body. ' * 20,
+                'instruction': 'Monitor conditions.',
+                'onset': now.isoformat(),
+                'expires': (now + timedelta(hours=6)).isoformat(),
+            }
+        })
+    return {'type': 'FeatureCollection', 'features': features}
+
+def _box(lat, lon, half_lat, half_lon):
+    return [[round(lon - half_lon, 4), round(lat - half_lat, 4)], [round(lon + half_lon, 4), round(lat - half_lat, 4)],
+            [round(lon + half_lon, 4), round(lat + half_lat, 4)], [round(lon - half_lon, 4), round(lat + half_lat, 4)],
+            [round(lon - half_lon, 4), round(lat - half_lat, 4)]]
+
+def area_alerts(areas, count=20):
+    """/alerts/active?area=NC,SC: alternating storm-based warnings (own polygon) and zone-based products (UGC codes only).
+
+    The first warning and a Flood Watch on NCZ071 cover Charlotte.
+    """
+    now = datetime.now(timezone.utc)
+    features = []
+    for state in areas:
+        rng = random.Random(f"area_alerts:{state}")
+        south, west, north, east = STATE_BOUNDS.get(state, (30.0, -90.0, 40.0, -75.0))
+        for i in range(count):
+            ident = f"urn:oid:2.49.0.1.840.0.stub.{state}.{i}"
+            if i % 2 == 0:
+                lat, lon = (35.12, -80.87) if (state, i) == ('NC', 0) else (rng.uniform(south, north), rng.uniform(west, east))
+                geometry = {'type': 'Polygon', 'coordinates': [_box(lat, lon, rng.uniform(0.1, 0.3), rng.uniform(0.1, 0.3))]}
+                event, ugc = 'Severe Thunderstorm Warning', []
+            else:
+                geometry, event = None, rng.choice(['Flood Watch', 'Heat Advisory', 'Wind Advisory'])
+                ugc = sorted({f"{state}{rng.choice('ZC')}{rng.randrange(1, 120):03d}" for _ in range(3)})
+                if (state, i) == ('NC', 1):
+                    event, ugc = 'Flood Watch', ['NCZ070', 'NCZ071', 'NCZ072']
+            features.append({
+                'id': ident,
+                'geometry': geometry,
+                'properties': {
+                    'id': ident,
+                    'event': event,
+                    'severity': rng.choice(['Moderate', 'Severe']),
+                    'urgency': 'Expected',
+                    'headline': f"Stub {event.lower()} issued for benchmarking",
+                    'description': 'Synthetic alert body. ' * 20,
+                    'instruction': 'Monitor conditions.',
+                    'onset': now.isoformat(),
+                    'expires': (now + timedelta(hours=6)).isoformat(),
+                    'geocode': {'UGC': ugc},
+                }
+            })
+    return {'type': 'FeatureCollection', 'features': features}
+
+def zone(zone_id):
+    """/zones/{forecast,county}/{id}: a county-sized box inside the zone's state; NCZ071 covers Charlotte"""
+    rng = random.Random(f"zone:{zone_id}")
+    south, west, north, east = STATE_BOUNDS.get(zone_id[:2], (30.0, -90.0, 40.0, -75.0))
+    lat, lon = (35.25, -80.83) if zone_id == 'NCZ071' else (rng.uniform(south, north), rng.uniform(west, east))
+    return {'id': zone_id, 'geometry': {'type': 'Polygon', 'coordinates': [_box(lat, lon, 0.2, 0.25)]},
+            'properties': {'id': zone_id, 'name': f"Stub Zone {zone_id}"}}
+
+def nwis_iv(sites, days=3, interval_min=15, end=None):
+    """NWIS instantaneous values for parameter 00045 (precipitation) over `days` up to `end` (default: now)"""
+    end = (end or datetime.now(EASTERN)).astimezone(EASTERN).replace(second=0, microsecond=0)
+    end -= timedelta(minutes=end.minute % interval_min)
+    samples = days * 24 * 60 // interval_min
+    series = []
+    for site in sites:
+        rng = random.Random(f"nwis:{site}")
+        values = []
+        for i in range(samples):
+            stamp = end - timedelta(minutes=interval_min * (samples - 1 - i))
+            rain = rng.choice([0.0] * 20 + [0.01, 0.02, 0.05])
+            values.append({'value': f"{rain:.2f}", 'qualifiers': ['P'], 'dateTime': stamp.isoformat(timespec='milliseconds')})
+        series.append({
+            'sourceInfo': {'siteName': f"STUB GAUGE {site}", 'siteCode': [{'value': site, 'network': 'NWIS', 'agencyCode': 'USGS'}]},
+            'variable': {'variableCode': [{'value': '00045'}], 'noDataValue': -999999.0},
+            'values': [{'value': values}],
+            'name': f"USGS:{site}:00045:00000",
+        })
+    return {'name': 'ns1:timeSeriesResponseType', 'value': {'timeSeries': series}}
+
+def inspection_points(site_id, lat, lon, count, spread_m=600, seed=0):
+    """Silt fence / inlet / slope inspection points scattered around a site"""
+    rng = random.Random(f"inspections:{site_id}:{seed}")
+    kinds = [('silt_fence', 'Silt Fence'), ('inlet', 'Inlet Protection'), ('slope', 'Slope Stabilization')]
+    points = []
+    for i in range(count):
+        kind, name = rng.choice(kinds)
+        dlat = rng.gauss(0, spread_m / 3) / 111320
+        dlon = rng.gauss(0, spread_m / 3) / (111320 * math.cos(math.radians(lat)))
+        points.append({
+            'id': f"{site_id}:{i}",
+            'lat': round(lat + dlat, 6),
+            'lon': round(lon + dlon, 6),
+            'kind': kind,
+            'label': f"{name} #{i}",
+            'priority': rng.choices(['High', 'Med', 'Low'], weights=[1, 3, 6])[0],
+        })
+    return points
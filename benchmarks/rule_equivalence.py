@@ -0,0 +1,296 @@
+# Equivalence check: the declarative activity rule table against the hand-written
+# generate_recommendations / find_optimal_work_windows it replaced.
+#
+#   python -m benchmarks.rule_equivalence    # exit 1 on any mismatch
+#
+# Three parts:
+#   1. Baseline: update_report.generate_recommendations is run against the
+#      original if/elif chains (copied verbatim below) over a grid of the
+#      inputs those chains read - weather, 24h rain, evaporation, forecast
+#      precipitation - with the inputs added since held at dry, calm values.
+#      The only change by design: concrete and grading judge wet ground by
+#      modelled soil moisture instead of 24h rain, so the baseline's
+#      rain-driven concrete STOP and grading rules are not compared.
+#   2. New rules (soil moisture, forecast rain, gusts, missing data) have no
+#      baseline; targeted cases pin their thresholds, notes and precedence.
+#   3. The vectorized evaluation agrees with the scalar one on every status
+#      over a threshold grid of the fields each activity reads, NaN included.
+import itertools
+import sys
+
+import numpy as np
+
+import activity_rules
+import update_report
+
+NAN = float('nan')
+
+# ===== BASELINE (update_report.py before the rule table, verbatim) =====
+def baseline_recommendations(weather, forecast, rain_24h, evap_rate):
+    """Generate construction activity recommendations"""
+
+    recommendations = {
+        'concrete_pouring': {'status': 'GO', 'notes': []},
+        'grading_excavation': {'status': 'GO', 'notes': []},
+        'asphalt_paving': {'status': 'GO', 'notes': []},
+        'painting_coating': {'status': 'GO', 'notes': []},
+        'crane_ops': {'status': 'GO', 'notes': []},
+        'general_safety': []
+    }
+
+    # Concrete Pouring Assessment
+    if rain_24h > 0.25:
+        recommendations['concrete_pouring']['status'] = 'STOP'
+        recommendations['concrete_pouring']['notes'].append('Recent rainfall - soil too wet')
+    elif evap_rate > 1.0:
+        recommendations['concrete_pouring']['status'] = 'CAUTION'
+        recommendations['concrete_pouring']['notes'].append(f'High evaporation ({evap_rate} kg/m²/h) - increase curing')
+    elif weather['temp_f'] < 40:
+        recommendations['concrete_pouring']['status'] = 'CAUTION'
+        recommendations['concrete_pouring']['notes'].append('Cold weather - use heated concrete/protection')
+    elif weather['temp_f'] > 90:
+        recommendations['concrete_pouring']['status'] = 'CAUTION'
+        recommendations['concrete_pouring']['notes'].append('Hot weather - plan for early morning pours')
+    else:
+        recommendations['concrete_pouring']['notes'].append('Optimal conditions for concrete work')
+
+    # Check upcoming rain in forecast
+    upcoming_rain = False
+    for day in forecast[:3]:  # Next 3 days
+        if day['precipitation_prob'] > 60:
+            upcoming_rain = True
+            recommendations['concrete_pouring']['notes'].append(f"Rain expected {day['day']} ({day['precipitation_prob']}%)")
+
+    # Grading & Excavation
+    if rain_24h > 0.5:
+        recommendations['grading_excavation']['status'] = 'STOP'
+        recommendations['grading_excavation']['notes'].append('Soil saturated - equipment damage risk')
+    elif rain_24h > 0.25:
+        recommendations['grading_excavation']['status'] = 'CAUTION'
+        recommendations['grading_excavation']['notes'].append('Soil wet - limited operations only')
+    else:
+        recommendations['grading_excavation']['notes'].append('Ground conditions suitable')
+
+    # Asphalt Paving
+    if rain_24h > 0.1:
+        recommendations['asphalt_paving']['status'] = 'STOP'
+        recommendations['asphalt_paving']['notes'].append('Surface must be dry')
+    elif weather['temp_f'] < 50:
+        recommendations['asphalt_paving']['status'] = 'STOP'
+        recommendations['asphalt_paving']['notes'].append('Temperature too low for asphalt')
+    elif upcoming_rain:
+        recommendations['asphalt_paving']['status'] = 'CAUTION'
+        recommendations['asphalt_paving']['notes'].append('Rain forecasted - complete quickly')
+
+    # Painting/Coating
+    if weather['humidity'] > 85:
+        recommendations['painting_coating']['status'] = 'STOP'
+        recommendations['painting_coating']['notes'].append('Humidity too high')
+    elif weather['temp_f'] < 50 or weather['temp_f'] > 90:
+        recommendations['painting_coating']['status'] = 'CAUTION'
+        recommendations['painting_coating']['notes'].append('Temperature outside optimal range')
+    elif rain_24h > 0:
+        recommendations['painting_coating']['status'] = 'CAUTION'
+        recommendations['painting_coating']['notes'].append('Recent moisture - verify surface dry')
+
+    # Crane Operations
+    if weather['wind_speed_mph'] > 20:
+        recommendations['crane_ops']['status'] = 'STOP'
+        recommendations['crane_ops']['notes'].append(f'Wind speed {weather["wind_speed_mph"]} mph exceeds safe limits')
+    elif weather['wind_speed_mph'] > 15:
+        recommendations['crane_ops']['status'] = 'CAUTION'
+        recommendations['crane_ops']['notes'].append('Monitor wind speeds closely')
+
+    # General Safety Alerts
+    if weather['temp_f'] > 90:
+        recommendations['general_safety'].append('🌡️ Heat Advisory: Ensure hydration stations, frequent breaks')
+    if weather['wind_speed_mph'] > 25:
+        recommendations['general_safety'].append('💨 High Wind: Secure loose materials, caution with tall equipment')
+
+    return recommendations
+
+def baseline_work_windows(forecast):
+    """Identify best days for different activities over next week"""
+
+    windows = {
+        'concrete_pouring': [],
+        'grading': [],
+        'painting': []
+    }
+
+    for day in forecast:
+        # Concrete windows (dry, moderate temps)
+        if day['precipitation_prob'] < 30 and 45 <= day['high'] <= 85:
+            windows['concrete_pouring'].append(day['day'])
+
+        # Grading windows (dry)
+        if day['precipitation_prob'] < 20:
+            windows['grading'].append(day['day'])
+
+        # Painting windows (dry, moderate humidity assumed)
+        if day['precipitation_prob'] < 20 and 50 <= day['high'] <= 85:
+            windows['painting'].append(day['day'])
+
+    return windows
+
+# ===== 1. BASELINE GRID =====
+def _forecast(*pops):
+    return [{'day': f"Day {i}", 'precipitation_prob': pop, 'high': 70} for i, pop in enumerate(pops)]
+
+BASELINE_GRID = {
+    'temp_f': [30, 40, 45, 50, 70, 90, 95],
+    'humidity': [50, 85, 90],
+    'wind_speed_mph': [10, 15, 18, 20, 25, 30],
+    'rain_24h': [0.0, 0.05, 0.1, 0.2, 0.25, 0.3, 0.5, 0.6],
+    'evap_rate': [0.5, 1.0, 1.5],
+    'forecast': [_forecast(10, 10, 10), _forecast(60, 30, 10), _forecast(61, 10, 10),
+                 _forecast(80, 90, 70), _forecast(10, 10, 10, 95)],
+}
+BASELINE_NEUTRAL = {'temp_f': 70, 'humidity': 50, 'wind_speed_mph': 5, 'rain_24h': 0.0, 'evap_rate': 0.2,
+                    'forecast': _forecast(10, 10, 10)}
+BASELINE_FIELDS = {
+    'concrete_pouring': ['rain_24h', 'evap_rate', 'temp_f', 'forecast'],
+    'grading_excavation': ['rain_24h'],
+    'asphalt_paving': ['rain_24h', 'temp_f', 'forecast'],
+    'painting_coating': ['humidity', 'temp_f', 'rain_24h'],
+    'crane_ops': ['wind_speed_mph'],
+    'general_safety': ['temp_f', 'wind_speed_mph'],
+}
+# Inputs the baseline did not have: dry subgrade, no forecast rain, light gusts
+DRY_SOIL_PCT = 40.0
+CALM_QUANTITIES = {'rain_in': {'6h': 0.0, '12h': 0.0, '24h': 0.0, '48h': 0.0}, 'peak_gust_mph': 10.0, 'peak_gust_time': None}
+
+def _wet_ground(activity, c):
+    """Baseline cases decided by 24h rain that now read soil moisture instead (changed by design)"""
+    return ((activity == 'concrete_pouring' and c['rain_24h'] > 0.25)
+            or (activity == 'grading_excavation' and c['rain_24h'] > 0.25))
+
+def check_baseline():
+    mismatches = []
+    for activity, fields in BASELINE_FIELDS.items():
+        for values in itertools.product(*(BASELINE_GRID[field] for field in fields)):
+            c = {**BASELINE_NEUTRAL, **dict(zip(fields, values))}
+            if _wet_ground(activity, c):
+                continue
+            weather = {'temp_f': c['temp_f'], 'humidity': c['humidity'], 'wind_speed_mph': c['wind_speed_mph']}
+            expected = baseline_recommendations(weather, c['forecast'], c['rain_24h'], c['evap_rate'])[activity]
+            actual = update_report.generate_recommendations(weather, c['forecast'], c['rain_24h'], c['evap_rate'],
+                                                            quantities=CALM_QUANTITIES, soil_percent=DRY_SOIL_PCT)[activity]
+            if actual != expected:
+                shown = {field: value for field, value in zip(fields, values) if field != 'forecast'}
+                if 'forecast' in fields:
+                    shown['pops'] = [day['precipitation_prob'] for day in c['forecast']]
+                mismatches.append(f"{activity} {shown}: table {actual!r}, baseline {expected!r}")
+
+    forecast = [{'day': f"Day {pop}/{high}", 'precipitation_prob': pop, 'high': high}
+                for pop in (0, 10, 19, 20, 25, 29, 30, 50) for high in (40, 44, 45, 49, 50, 70, 85, 86, 90)]
+    expected = baseline_work_windows(forecast)
+    actual = update_report.find_optimal_work_windows(forecast)
+    for activity in expected:
+        if actual.get(activity) != expected[activity]:
+            mismatches.append(f"work windows {activity}: table {actual.get(activity)}, baseline {expected[activity]}")
+    return mismatches
+
+# ===== 2. NEW RULES =====
+NEUTRAL = {'rain_24h': 0.0, 'soil_moisture': DRY_SOIL_PCT, 'evap_rate': 0.2, 'temp_f': 70.0, 'humidity': 50.0,
+           'wind_mph': 5.0, 'upcoming_rain_prob': 10.0, 'forecast_rain_24h': 0.0, 'gust_mph': 10.0}
+# (conditions differing from NEUTRAL, activity, expected (status, first note))
+NEW_RULE_CASES = [
+    # Soil moisture (percent of field capacity) in place of 24h rain
+    ({'soil_moisture': 65.0}, 'concrete_pouring', ('GO', 'Optimal conditions for concrete work')),
+    ({'soil_moisture': 70.0}, 'concrete_pouring', ('STOP', 'Subgrade too wet (70.0% soil moisture)')),
+    ({'soil_moisture': 65.0}, 'grading_excavation', ('GO', 'Ground conditions suitable')),
+    ({'soil_moisture': 70.0}, 'grading_excavation', ('CAUTION', 'Soil wet (70.0%) - limited operations only')),
+    ({'soil_moisture': 85.0}, 'grading_excavation', ('CAUTION', 'Soil wet (85.0%) - limited operations only')),
+    ({'soil_moisture': 90.0}, 'grading_excavation', ('STOP', 'Soil saturated (90.0%) - equipment damage risk')),
+    ({'rain_24h': 2.0}, 'concrete_pouring', ('GO', 'Optimal conditions for concrete work')),
+    ({'rain_24h': 2.0}, 'grading_excavation', ('GO', 'Ground conditions suitable')),
+    # Forecast rain totals
+    ({'forecast_rain_24h': 0.25}, 'concrete_pouring', ('GO', 'Optimal conditions for concrete work')),
+    ({'forecast_rain_24h': 0.3}, 'concrete_pouring', ('CAUTION', '0.3 in of rain forecast in the next 24h - protect fresh concrete')),
+    ({'forecast_rain_24h': 0.5}, 'grading_excavation', ('GO', 'Ground conditions suitable')),
+    ({'forecast_rain_24h': 0.6}, 'grading_excavation', ('CAUTION', '0.6 in of rain forecast - stabilize exposed slopes, check silt fence')),
+    ({'forecast_rain_24h': 0.3, 'evap_rate': 1.5}, 'concrete_pouring', ('CAUTION', '0.3 in of rain forecast in the next 24h - protect fresh concrete')),
+    ({'soil_moisture': 70.0, 'forecast_rain_24h': 0.8}, 'concrete_pouring', ('STOP', 'Subgrade too wet (70.0% soil moisture)')),
+    ({'soil_moisture': 90.0, 'forecast_rain_24h': 0.8}, 'grading_excavation', ('STOP', 'Soil saturated (90.0%) - equipment damage risk')),
+    # Forecast gusts
+    ({'gust_mph': 25.0}, 'crane_ops', ('GO', None)),
+    ({'gust_mph': 28.0}, 'crane_ops', ('CAUTION', 'Gusts to 28.0 mph forecast - plan lifts for calm periods')),
+    ({'gust_mph': 30.0}, 'crane_ops', ('CAUTION', 'Gusts to 30.0 mph forecast - plan lifts for calm periods')),
+    ({'gust_mph': 35.0}, 'crane_ops', ('STOP', 'Gusts to 35.0 mph forecast - no lifts')),
+    ({'gust_mph': 35.0, 'wind_mph': 25.0}, 'crane_ops', ('STOP', 'Wind speed 25.0 mph exceeds safe limits')),
+    ({'gust_mph': 35.0, 'wind_mph': 18.0}, 'crane_ops', ('STOP', 'Gusts to 35.0 mph forecast - no lifts')),
+    ({'gust_mph': 28.0, 'wind_mph': 18.0}, 'crane_ops', ('CAUTION', 'Monitor wind speeds closely')),
+    # Missing data: CAUTION naming every absent field, unless a rule on present data already fired
+    ({'temp_f': NAN}, 'concrete_pouring', ('CAUTION', 'No current temperature reading - verify conditions on site')),
+    ({'soil_moisture': NAN, 'forecast_rain_24h': NAN}, 'grading_excavation',
+     ('CAUTION', 'No current soil moisture, forecast rainfall reading - verify conditions on site')),
+    ({'rain_24h': NAN}, 'asphalt_paving', ('CAUTION', 'No current rainfall reading - verify conditions on site')),
+    ({'rain_24h': NAN, 'temp_f': 45.0}, 'asphalt_paving', ('STOP', 'Temperature too low for asphalt')),
+    ({'rain_24h': NAN}, 'painting_coating', ('CAUTION', 'No current rainfall reading - verify conditions on site')),
+    ({'humidity': NAN, 'rain_24h': 0.2}, 'painting_coating', ('CAUTION', 'Recent moisture - verify surface dry')),
+    ({'gust_mph': NAN}, 'crane_ops', ('CAUTION', 'No current gust forecast reading - verify conditions on site')),
+    ({'wind_mph': NAN, 'gust_mph': 35.0}, 'crane_ops', ('STOP', 'Gusts to 35.0 mph forecast - no lifts')),
+    ({'temp_f': NAN, 'wind_mph': NAN}, 'general_safety', []),
+]
+
+def _outcome(recommendations, activity):
+    if activity == 'general_safety':
+        return recommendations[activity]
+    entry = recommendations[activity]
+    return entry['status'], entry['notes'][0] if entry['notes'] else None
+
+def check_new_rules():
+    mismatches = []
+    for overrides, activity, expected in NEW_RULE_CASES:
+        actual = _outcome(activity_rules.recommend({**NEUTRAL, **overrides}), activity)
+        if actual != expected:
+            mismatches.append(f"{activity} {overrides}: table {actual!r}, expected {expected!r}")
+    return mismatches
+
+# ===== 3. VECTORIZED vs SCALAR =====
+GRID = {
+    'rain_24h': [0.0, 0.05, 0.1, 0.2, NAN],
+    'soil_moisture': [50.0, 65.0, 70.0, 85.0, 95.0, NAN],
+    'evap_rate': [0.5, 1.0, 1.5, NAN],
+    'temp_f': [30.0, 40.0, 45.0, 50.0, 70.0, 90.0, 95.0, NAN],
+    'humidity': [50.0, 85.0, 90.0, NAN],
+    'wind_mph': [10.0, 15.0, 18.0, 20.0, 25.0, 30.0, NAN],
+    'upcoming_rain_prob': [30.0, 60.0, 80.0, NAN],
+    'forecast_rain_24h': [0.0, 0.25, 0.4, 0.5, 0.8, NAN],
+    'gust_mph': [10.0, 25.0, 28.0, 30.0, 40.0, NAN],
+}
+ACTIVITY_FIELDS = {
+    activity: list(dict.fromkeys(field for rule in spec['rules'] for field, _, _ in rule['when']))
+    for activity, spec in activity_rules.ACTIVITY_RULES.items()
+}
+
+def check_vectorized():
+    mismatches = []
+    for activity, fields in ACTIVITY_FIELDS.items():
+        combos = list(itertools.product(*(GRID[field] for field in fields)))
+        columns = {**{field: np.full(len(combos), value) for field, value in NEUTRAL.items()},
+                   **{field: np.array(column) for field, column in zip(fields, zip(*combos))}}
+        codes = activity_rules.STATUSES[activity_rules.status_codes(columns)[activity]]
+        for values, status in zip(combos, codes.tolist()):
+            expected = activity_rules.recommend({**NEUTRAL, **dict(zip(fields, values))})[activity]['status']
+            if status != expected:
+                mismatches.append(f"{activity} (vectorized) {dict(zip(fields, values))}: {status}, scalar {expected}")
+    return mismatches
+
+def check():
+    """Mismatches from all three checks, as readable strings (empty when everything agrees)"""
+    return check_baseline() + check_new_rules() + check_vectorized()
+
+def main():
+    mismatches = check()
+    if mismatches:
+        print(f"❌ {len(mismatches)} rule table mismatches:")
+        for mismatch in mismatches[:50]:
+            print(f"   - {mismatch}")
+        sys.exit(1)
+    print(f"✅ Rule table matches the baseline if/elif chains, {len(NEW_RULE_CASES)} new-rule cases "
+          f"and its own vectorized path")
+
+if __name__ == "__main__":
+    main()
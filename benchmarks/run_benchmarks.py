@@ -0,0 +1,505 @@
+# Offline benchmark suite for the briefing pipeline.
+#
+#   python -m benchmarks.run_benchmarks                      # full run -> bench_results.json
+#   python -m benchmarks.run_benchmarks --quick              # smaller matrix
+#   python -m benchmarks.run_benchmarks --compare old.json   # exit 1 on p50 regressions
+#   python -m benchmarks.rule_equivalence                    # rule table vs the baseline if/elif chains only
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+import msgspec
+import numpy as np
+
+import activity_rules
+import alert_index
+import fleet
+import http_client
+import inspection_points
+import replay
+import report_schema
+import snapshot_archive
+import update_report
+from benchmarks import payloads, rule_equivalence
+from benchmarks.stub_server import StubConfig, StubServer
+from evaporation import project_hourly
+from fetch_stage import run_fetch_stage
+from gridpoint import forecast_quantities, parse_gridpoint
+from work_windows import find_hourly_windows
+
+# --- CONFIGURATION ---
+DEFAULT_OUTPUT = 'bench_results.json'
+DEFAULT_TOLERANCE = 0.25  # p50 may grow 25% before --compare calls it a regression
+
+class Bench:
+    """Collects timing results in a machine-readable list"""
+
+    def __init__(self, iterations):
+        self.iterations = iterations
+        self.results = []
+
+    def measure(self, name, fn, params=None, iterations=None, warmup=1, **extra):
+        iterations = iterations or self.iterations
+        for _ in range(warmup):
+            fn()
+        samples = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            fn()
+            samples.append((time.perf_counter() - start) * 1000)
+        return self.record(name, samples, params, **extra)
+
+    def record(self, name, samples_ms, params=None, **extra):
+        ordered = sorted(samples_ms)
+        result = {
+            'name': name,
+            'params': params or {},
+            'iterations': len(ordered),
+            'mean_ms': round(statistics.fmean(ordered), 4),
+            'p50_ms': round(ordered[len(ordered) // 2], 4),
+            'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 4),
+            'p99_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))], 4),
+            'min_ms': round(ordered[0], 4),
+            **extra,
+        }
+        self.results.append(result)
+        label = ' '.join(f"{key}={value}" for key, value in result['params'].items())
+        print(f"   {name:<28} {label:<36} p50 {result['p50_ms']:>10.3f} ms   p95 {result['p95_ms']:>10.3f} ms   "
+              f"p99 {result['p99_ms']:>10.3f} ms", file=sys.__stdout__)
+        return result
+
+@contextlib.contextmanager
+def quiet():
+    """Silence the pipeline's progress prints while timing"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+def point_pipeline_at(server):
+    update_report.NWS_API = server.url
+    update_report.USGS_API = server.url
+
+def fleet_manifest(path, sites, sites_per_grid=5, sites_per_station=10, sites_per_gauge=2):
+    """Synthetic manifest: neighbouring sites share grids, stations and gauges"""
+    entries = []
+    for i in range(sites):
+        entries.append({
+            'id': f"site-{i:04d}",
+            'name': f"Bench Site {i}",
+            'gauge_name': f"Stub Gauge {i // sites_per_gauge}",
+            'usgs_site': f"{2146000 + i // sites_per_gauge:08d}",
+            'lat': 35.1 + 0.001 * i,
+            'lon': -80.85 - 0.001 * i,
+            'nws_office': 'GSP',
+            'nws_grid': [40 + i // sites_per_grid, 60],
+            'forecast_zone': f"NCZ{71 + i // 100:03d}",
+            'nws_station': f"K{i // sites_per_station:03d}",
+            'map_labels': update_report.SITE_MAP_LABELS,
+        })
+    with open(path, 'w') as f:
+        json.dump({'sites': entries}, f)
+
+def bench_fetch(bench, server):
+    print("🔌 Fetch functions", file=sys.__stdout__)
+    site = update_report.DEFAULT_SITE
+    calls = {
+        'get_usgs_data': lambda: update_report.get_usgs_data(site=site['usgs_site']),
+        'get_current_weather': lambda: update_report.get_current_weather(station=site['nws_station']),
+        'get_forecast': lambda: update_report.get_forecast(office=site['nws_office'], grid=site['nws_grid']),
+        'get_hourly_forecast': lambda: update_report.get_hourly_forecast(office=site['nws_office'], grid=site['nws_grid']),
+        'get_alerts': lambda: update_report.get_alerts(lat=site['lat'], lon=site['lon']),
+    }
+    with quiet():
+        for name, call in calls.items():
+            bench.measure(f"fetch.{name}", call, {'latency_ms': server.config.latency_s * 1000})
+
+def bench_fetch_stage(bench, server, deadline):
+    print("🧵 Fetch stage", file=sys.__stdout__)
+    sources = update_report.site_fetch_sources(update_report.DEFAULT_SITE)
+    with quiet():
+        bench.measure('fetch_stage.healthy', lambda: run_fetch_stage(sources, deadline),
+                      {'latency_ms': server.config.latency_s * 1000})
+
+    # Failure injection: 5xx responses and stalls past the deadline
+    config = server.config
+    saved = (config.failure_rate, config.stall_rate, config.stall_s)
+    config.failure_rate, config.stall_rate, config.stall_s = 0.2, 0.1, deadline * 2
+    stale_counts = []
+
+    def degraded():
+        _, freshness = run_fetch_stage(sources, deadline)
+        stale_counts.append(sum(status['stale'] for status in freshness.values()))
+
+    with quiet():
+        result = bench.measure('fetch_stage.degraded', degraded,
+                               {'failure_rate': 0.2, 'stall_rate': 0.1, 'deadline_s': deadline})
+    result['stale_sources_mean'] = round(statistics.fmean(stale_counts), 3)
+    config.failure_rate, config.stall_rate, config.stall_s = saved
+    http_client.reset_breakers()  # Don't let the degraded run's open breakers leak into later scenarios
+
+def bench_tail_latency(bench, server, requests=200):
+    print("🪝 Tail latency (hedged requests)", file=sys.__stdout__)
+    config = server.config
+    url = f"{server.url}/stations/{update_report.NWS_STATION}/observations/latest"
+    saved = (config.stall_rate, config.stall_s, config.max_age, http_client.HEDGE_REQUESTS)
+    config.max_age = 0  # Every call goes upstream
+    for hedge in (False, True):
+        http_client.reset_breakers()
+        config.stall_rate = 0.0
+        for _ in range(http_client.HEDGE_MIN_SAMPLES + 10):  # Seed the host's latency window
+            http_client.get_bytes(url, 10)
+        config.stall_rate, config.stall_s = 0.03, max(0.5, config.latency_s * 20)
+        http_client.HEDGE_REQUESTS = hedge
+        server.reset_counts()
+        bench.measure('client.tail_latency', lambda: http_client.get_bytes(url, 10),
+                      {'hedge': hedge, 'stall_rate': 0.03}, iterations=requests, warmup=0)
+        bench.results[-1]['upstream_requests'] = server.requests['observations']
+    config.stall_rate, config.stall_s, config.max_age, http_client.HEDGE_REQUESTS = saved
+    http_client.reset_breakers()
+
+def bench_end_to_end(bench, workdir):
+    print("🏁 End to end", file=sys.__stdout__)
+    argv = sys.argv
+    sys.argv = ['update_report.py']
+    try:
+        with quiet():
+            bench.measure('pipeline.single_site', update_report.main)
+    finally:
+        sys.argv = argv
+    bench.results[-1]['report_bytes'] = os.path.getsize(os.path.join(workdir, 'latest_report.json'))
+    bench.results[-1]['compact_bytes'] = os.path.getsize(os.path.join(workdir, 'latest_report.msgpack'))
+
+def bench_fleet(bench, server, workdir, fleet_sizes):
+    print("🚚 Fleet", file=sys.__stdout__)
+    for sites in fleet_sizes:
+        manifest = os.path.join(workdir, f"sites_{sites}.json")
+        fleet_manifest(manifest, sites)
+        server.reset_counts()
+        with quiet():
+            result = bench.measure('pipeline.fleet', lambda: fleet.run_fleet(manifest, os.path.join(workdir, 'reports')),
+                                   {'sites': sites}, iterations=max(1, bench.iterations // 5), warmup=0)
+        result['upstream_requests_per_run'] = sum(server.requests.values()) // result['iterations']
+
+def bench_alert_assign(bench, server, site_counts):
+    print("🗺️ Area alerts (one request, indexed point-in-polygon)", file=sys.__stdout__)
+    rng = np.random.default_rng(0)
+    south, west, north, east = payloads.STATE_BOUNDS['NC']
+    with quiet():
+        alert_index.get_area_alerts(['NC', 'SC'])  # Warm the zone geometry cache
+    for count in site_counts:
+        sites = [{'id': f"site-{i:05d}", 'lat': lat, 'lon': lon, 'forecast_zone': f"NCZ{i % 120 + 1:03d}"}
+                 for i, (lat, lon) in enumerate(zip(rng.uniform(south, north, count), rng.uniform(west, east, count)))]
+
+        def full():
+            index = alert_index.AlertIndex(sites)
+            index.update(alert_index.get_area_alerts(['NC', 'SC']))
+            return index.site_alerts()
+
+        server.reset_counts()
+        with quiet():
+            result = bench.measure('alerts.area_assign', full, {'sites': count})
+            result['upstream_requests_per_run'] = sum(server.requests.values()) // (result['iterations'] + 1)
+            result['matched'] = sum(len(alerts) for alerts in full().values())
+            alerts = alert_index.get_area_alerts(['NC', 'SC'])
+
+        index = alert_index.AlertIndex(sites)
+        index.update(alerts)
+        rolled = iter(range(10 ** 6))
+
+        def refresh():
+            # One alert expires and one is issued, the usual poll-to-poll change
+            step = next(rolled) % len(alerts)
+            index.update(alerts[:step] + alerts[step + 1:])
+            return index.site_alerts()
+
+        bench.measure('alerts.incremental_refresh', refresh, {'sites': count})
+
+def bench_concurrent_runs(bench, concurrency_levels):
+    print("👥 Concurrent runs", file=sys.__stdout__)
+    site = update_report.DEFAULT_SITE
+
+    def one_run():
+        fetched, freshness = run_fetch_stage(update_report.site_fetch_sources(site))
+        update_report.build_report(site, fetched['weather'], fetched['forecast'], fetched['usgs'],
+                                   fetched['alerts'], freshness, hourly=fetched['forecast_hourly'])
+
+    for level in concurrency_levels:
+        def burst():
+            threads = [threading.Thread(target=one_run) for _ in range(level)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        with quiet():
+            result = bench.measure('pipeline.concurrent_runs', burst, {'runs': level})
+        result['runs_per_s'] = round(level / (result['p50_ms'] / 1000), 2)
+
+def bench_logic(bench, hourly_lengths, grid_sizes):
+    print("🧮 Rules, windows, evaporation", file=sys.__stdout__)
+    weather = {'temp_f': 88.0, 'humidity': 55, 'wind_speed_mph': 12.0}
+    daily = [{'day': period['name'], 'high': period['temperature'],
+              'precipitation_prob': period['probabilityOfPrecipitation']['value']}
+             for period in payloads.forecast('GSP', 49, 68)['properties']['periods'][::2]]
+
+    quantities = forecast_quantities(parse_gridpoint(payloads.gridpoint('GSP', 49, 68)))
+    bench.measure('logic.generate_recommendations',
+                  lambda: update_report.generate_recommendations(weather, daily, 0.1, 0.6, quantities=quantities,
+                                                                         soil_percent=55.0),
+                  iterations=bench.iterations * 20)
+    bench.measure('logic.find_optimal_work_windows', lambda: update_report.find_optimal_work_windows(daily),
+                  iterations=bench.iterations * 20)
+
+    for hours in hourly_lengths:
+        hourly = hourly_columns(payloads.hourly_forecast('GSP', 49, 68, hours))
+        bench.measure('logic.find_hourly_windows', lambda: find_hourly_windows(hourly), {'hours': hours},
+                      iterations=bench.iterations * 5)
+        bench.measure('logic.project_hourly_evaporation', lambda: project_hourly(hourly), {'hours': hours},
+                      iterations=bench.iterations * 5)
+        raw = json.dumps(payloads.gridpoint('GSP', 49, 68, hours)).encode()
+        bench.measure('logic.expand_gridpoint', lambda: parse_gridpoint(raw, hours), {'hours': hours},
+                      iterations=bench.iterations * 5, payload_bytes=len(raw))
+
+    rng = np.random.default_rng(0)
+    for hours, sites in grid_sizes:
+        conditions = {
+            'rain_24h': rng.uniform(0, 1, (hours, sites)),
+            'soil_moisture': rng.uniform(0, 100, (hours, sites)),
+            'evap_rate': rng.uniform(0, 2, (hours, sites)),
+            'temp_f': rng.uniform(20, 100, (hours, sites)),
+            'humidity': rng.uniform(0, 100, (hours, sites)),
+            'wind_mph': rng.uniform(0, 30, (hours, sites)),
+            'upcoming_rain_prob': rng.uniform(0, 100, (1, sites)),
+            'forecast_rain_24h': rng.uniform(0, 1, (hours, sites)),
+            'gust_mph': rng.uniform(0, 45, (hours, sites)),
+        }
+        bench.measure('logic.rule_grid', lambda: activity_rules.status_codes(conditions), {'hours': hours, 'sites': sites})
+
+def hourly_columns(payload):
+    """Columnar hourly forecast from a raw /forecast/hourly payload, as get_hourly_forecast builds it"""
+    periods = payload['properties']['periods']
+    return {
+        'start': [p['startTime'] for p in periods],
+        'end': [p['endTime'] for p in periods],
+        'temp_f': [p['temperature'] for p in periods],
+        'pop': [p['probabilityOfPrecipitation']['value'] or 0 for p in periods],
+        'humidity': [p['relativeHumidity']['value'] for p in periods],
+        'wind_mph': [float(p['windSpeed'].split()[-2]) for p in periods],
+    }
+
+def bench_serialization(bench, workdir, fleet_sizes):
+    print("📦 Report serialization", file=sys.__stdout__)
+    with open(os.path.join(workdir, 'latest_report.json')) as f:
+        report = json.load(f)
+    typed = report_schema.decode_json(json.dumps(report).encode())
+    fleet_json_decoder = msgspec.json.Decoder(List[report_schema.Report])
+    fleet_decoder = msgspec.msgpack.Decoder(List[report_schema.Report])
+
+    for sites in sorted({1, *fleet_sizes}):
+        reports = [report] * sites
+        encoded = json.dumps(reports, indent=4)
+        bench.measure('serialize.json_dump', lambda: json.dumps(reports, indent=4), {'reports': sites},
+                      payload_bytes=len(encoded.encode()))
+        bench.measure('serialize.json_load', lambda: json.loads(encoded), {'reports': sites})
+
+        # Typed schema: validated decode into structs, compact msgpack alongside the indented JSON
+        structs = [typed] * sites
+        compact = msgspec.msgpack.encode(structs)
+        bench.measure('serialize.schema_json_encode', lambda: msgspec.json.format(msgspec.json.encode(structs), indent=4),
+                      {'reports': sites})
+        bench.measure('serialize.schema_json_decode', lambda: fleet_json_decoder.decode(encoded), {'reports': sites})
+        bench.measure('serialize.schema_compact_encode', lambda: msgspec.msgpack.encode(structs), {'reports': sites},
+                      payload_bytes=len(compact))
+        bench.measure('serialize.schema_compact_decode', lambda: fleet_decoder.decode(compact), {'reports': sites})
+
+def bench_inspection_map(bench, workdir, point_counts):
+    print("📍 Inspection map (viewport query + clustering)", file=sys.__stdout__)
+    site = update_report.DEFAULT_SITE
+    for points in point_counts:
+        store = os.path.join(workdir, f"inspections_{points}.sqlite")
+        inspection_points.upsert(site['id'], payloads.inspection_points(site['id'], site['lat'], site['lon'], points), store)
+        for zoom in (15.0, 17.5, 19.0):
+            clustered, in_view = inspection_points.viewport(site['lat'], site['lon'], zoom, site['id'], path=store)
+            markers = json.dumps({name: clustered[name].tolist() for name in ('lat', 'lon', 'label', 'priority', 'count')})
+            bench.measure('map.viewport', lambda: inspection_points.viewport(site['lat'], site['lon'], zoom, site['id'], path=store),
+                          {'points': points, 'zoom': zoom}, points_in_view=in_view,
+                          markers=len(clustered['lat']), payload_bytes=len(markers.encode()))
+
+def write_archive(root, site, months, snapshot_every_h=6):
+    """Synthetic replay archive for one site: NWIS, hourly observations and gridpoint snapshots per month"""
+    directory = {kind: os.path.join(root, site['id'], kind) for kind in replay.KINDS}
+    for path in directory.values():
+        os.makedirs(path, exist_ok=True)
+    for month in months:
+        start, end = (datetime.fromtimestamp(bound, timezone.utc) for bound in replay.month_bounds(month))
+        hours = int((end - start).total_seconds() // 3600)
+        with open(os.path.join(directory['nwis'], f"{month}.json"), 'w') as f:
+            json.dump(payloads.nwis_iv([site['usgs_site']], days=hours // 24, end=end), f)
+        with open(os.path.join(directory['observations'], f"{month}.jsonl"), 'w') as f:
+            for hour in range(hours):
+                stamp = start + timedelta(hours=hour, minutes=52)
+                f.write(json.dumps(payloads.observation(site['nws_station'], seed=hour, timestamp=stamp)) + '\n')
+        with open(os.path.join(directory['gridpoint'], f"{month}.jsonl"), 'w') as f:
+            for hour in range(0, hours, snapshot_every_h):
+                issued = start + timedelta(hours=hour)
+                f.write(json.dumps(payloads.gridpoint(site['nws_office'], *site['nws_grid'], hours=96, start=issued)) + '\n')
+
+def bench_replay(bench, workdir, site_months):
+    print("📼 Backtest replay (archived months across the process pool)", file=sys.__stdout__)
+    root = os.path.join(workdir, 'archive')
+    months = [replay.shift_month('2024-01', i) for i in range(max(site_months))]
+    site = update_report.DEFAULT_SITE
+    write_archive(root, site, months)
+    for count in site_months:
+        for workers in sorted({1, os.cpu_count() or 1}):
+            run = lambda: replay.replay([site], root, last=months[count - 1], workers=workers)
+            totals = run()
+            bench.measure('replay.backtest', run, {'site_months': count, 'workers': workers}, iterations=2,
+                          hours=totals['hours'])
+
+def drifting_reports(report, count):
+    """`count` successive runs of one report: readings drift every run, the forecast rolls over every 4th"""
+    data = report_schema.to_builtins(report)
+    start = datetime.fromisoformat(data['last_updated'])
+    rng = np.random.default_rng(0)
+    reports = []
+    for run in range(count):
+        data['last_updated'] = (start + timedelta(hours=6 * run)).isoformat()
+        data['current_conditions']['temperature_f'] = round(float(rng.uniform(40, 90)), 1)
+        projection = data['concrete_ops']['evap_projection']
+        projection['evap_kg_m2_h'] = np.round(rng.uniform(0, 1.2, len(projection['evap_kg_m2_h'])), 2).tolist()
+        if run % 4 == 3:
+            data['forecast_7day'] = data['forecast_7day'][1:] + data['forecast_7day'][:1]
+        reports.append(report_schema.from_builtins({k: v for k, v in data.items() if k != 'schema_version'}))
+    return reports
+
+def bench_snapshot_archive(bench, workdir, snapshot_counts):
+    print("🗄️ Snapshot archive (material check, delta write, random access)", file=sys.__stdout__)
+    with open(os.path.join(workdir, 'latest_report.json'), 'rb') as f:
+        report = report_schema.decode_json(f.read())
+    for count in snapshot_counts:
+        store = os.path.join(workdir, f"snapshots_{count}.sqlite")
+        reports = drifting_reports(report, count)
+        samples = []
+        for typed in reports:
+            start = time.perf_counter()
+            snapshot_archive.record('bench', typed, store)
+            samples.append((time.perf_counter() - start) * 1000)
+        stored = snapshot_archive.stats(store)
+        bench.record('archive.record', samples, {'snapshots': count},
+                     stored_bytes=stored['manifest_bytes'] + stored['chunk_bytes'],
+                     raw_json_bytes=sum(len(report_schema.encode_json(typed)) for typed in reports))
+        bench.measure('archive.changed', lambda: snapshot_archive.changed('bench', reports[-1], store), {'snapshots': count})
+        seqs = iter(np.random.default_rng(1).integers(0, count, 10 ** 6).tolist())
+        bench.measure('archive.get_random', lambda: snapshot_archive.get('bench', next(seqs), store), {'snapshots': count})
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results, baseline_path, tolerance):
+    """Regressions where p50 grew more than `tolerance` versus a previous results file"""
+    with open(baseline_path) as f:
+        baseline = {(r['name'], json.dumps(r['params'], sort_keys=True)): r for r in json.load(f)['results']}
+
+    regressions = []
+    for result in results:
+        previous = baseline.get((result['name'], json.dumps(result['params'], sort_keys=True)))
+        if previous and previous['p50_ms'] > 0:
+            ratio = result['p50_ms'] / previous['p50_ms']
+            if ratio > 1 + tolerance:
+                regressions.append({'name': result['name'], 'params': result['params'],
+                                    'baseline_p50_ms': previous['p50_ms'], 'p50_ms': result['p50_ms'],
+                                    'ratio': round(ratio, 3)})
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the briefing pipeline")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help="Machine-readable results file")
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--latency-ms', type=float, default=50.0, help="Injected stub latency per request")
+    parser.add_argument('--jitter-ms', type=float, default=10.0)
+    parser.add_argument('--recordings', help="Directory of recorded payloads to replay")
+    parser.add_argument('--quick', action='store_true', help="Smaller matrix for CI smoke runs")
+    parser.add_argument('--compare', metavar='BASELINE', help="Previous results file to check for regressions")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    fleet_sizes = (1, 10) if args.quick else (1, 10, 50, 200)
+    hourly_lengths = (48, 156) if args.quick else (48, 156, 336)
+    grid_sizes = ((156, 10),) if args.quick else ((156, 10), (156, 100), (156, 1000))
+    concurrency = (1, 4) if args.quick else (1, 4, 8, 16)
+    point_counts = (100, 2000) if args.quick else (100, 2000, 20000)
+    site_months = (1, 3) if args.quick else (1, 6, 12)
+    snapshot_counts = (50,) if args.quick else (50, 500, 2000)
+    alert_site_counts = (10, 1000) if args.quick else (10, 1000, 10000)
+    iterations = max(2, args.iterations // 4) if args.quick else args.iterations
+
+    config = StubConfig(latency_s=args.latency_ms / 1000, jitter_s=args.jitter_ms / 1000, recordings=args.recordings)
+    bench = Bench(iterations)
+    output = os.path.abspath(args.output)
+    origin = os.getcwd()
+
+    rule_equivalence.main()  # Timings of a rule table that drifted from the baseline rules mean nothing
+
+    with tempfile.TemporaryDirectory() as workdir, StubServer(config) as server:
+        os.chdir(workdir)
+        try:
+            point_pipeline_at(server)
+            http_client.configure_cache(os.path.join(workdir, 'http_cache.sqlite'))
+            print(f"🔄 Benchmarking against stub {server.url} ({args.latency_ms:g} ms latency)", file=sys.__stdout__)
+
+            bench_fetch(bench, server)
+            bench_fetch_stage(bench, server, deadline=max(1.0, args.latency_ms / 1000 * 10))
+            bench_tail_latency(bench, server, requests=100 if args.quick else 300)
+            bench_end_to_end(bench, workdir)
+            bench_fleet(bench, server, workdir, fleet_sizes)
+            bench_alert_assign(bench, server, alert_site_counts)
+            bench_concurrent_runs(bench, concurrency)
+            bench_logic(bench, hourly_lengths, grid_sizes)
+            bench_serialization(bench, workdir, fleet_sizes)
+            bench_inspection_map(bench, workdir, point_counts)
+            bench_replay(bench, workdir, site_months)
+            bench_snapshot_archive(bench, workdir, snapshot_counts)
+        finally:
+            os.chdir(origin)
+
+    document = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'git_commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'iterations': iterations,
+            'stub': {'latency_ms': args.latency_ms, 'jitter_ms': args.jitter_ms, 'recordings': args.recordings},
+        },
+        'results': bench.results,
+    }
+    if args.compare:
+        document['regressions'] = compare(bench.results, args.compare, args.tolerance)
+
+    with open(output, 'w') as f:
+        json.dump(document, f, indent=2)
+    print(f"\n✅ {len(bench.results)} benchmark results written to {output}")
+
+    if document.get('regressions'):
+        print(f"❌ {len(document['regressions'])} regressions over {args.tolerance:.0%}:")
+        for regression in document['regressions']:
+            print(f"   - {regression['name']} {regression['params']}: {regression['baseline_p50_ms']} → {regression['p50_ms']} ms")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
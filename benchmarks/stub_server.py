@@ -0,0 +1,201 @@
+# Local stand-in for api.weather.gov and waterservices.usgs.gov.
+#
+# Replays recorded payloads from a directory when present, otherwise serves
+# generated ones from benchmarks.payloads. Latency, jitter, 5xx failures and
+# stalls can be injected per request.
+#
+# Recorded file names: observations_<STATION>.json, forecast_<OFFICE>_<X>_<Y>.json,
+# forecast_hourly_<OFFICE>_<X>_<Y>.json, gridpoint_<OFFICE>_<X>_<Y>.json, alerts.json, nwis.json
+import json
+import os
+import random
+import re
+import socket
+import threading
+import time
+import zlib
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks import payloads
+
+ROUTES = [
+    ('observations', re.compile(r'^/stations/(?P<station>[^/]+)/observations/latest$')),
+    ('forecast_hourly', re.compile(r'^/gridpoints/(?P<office>[^/]+)/(?P<x>\d+),(?P<y>\d+)/forecast/hourly$')),
+    ('forecast', re.compile(r'^/gridpoints/(?P<office>[^/]+)/(?P<x>\d+),(?P<y>\d+)/forecast$')),
+    ('gridpoint', re.compile(r'^/gridpoints/(?P<office>[^/]+)/(?P<x>\d+),(?P<y>\d+)$')),
+    ('alerts', re.compile(r'^/alerts/active$')),
+    ('zone', re.compile(r'^/zones/(?P<kind>forecast|county)/(?P<zone>[A-Z]{2}[CZ]\d{3})$')),
+    ('nwis', re.compile(r'^/nwis/iv/?$')),
+    ('points', re.compile(r'^/points/(?P<lat>-?[\d.]+),(?P<lon>-?[\d.]+)$')),
+    ('stations', re.compile(r'^/stations$')),
+    ('nwis_site', re.compile(r'^/nwis/site/?$')),
+]
+
+class StubConfig:
+    """Knobs the benchmarks turn between scenarios; safe to change while serving"""
+
+    def __init__(self, latency_s=0.0, jitter_s=0.0, failure_rate=0.0, stall_rate=0.0, stall_s=30.0,
+                 hourly_hours=156, alert_count=1, area_alert_count=20, max_age=0, recordings=None, seed=0):
+        self.latency_s = latency_s
+        self.jitter_s = jitter_s
+        self.failure_rate = failure_rate
+        self.stall_rate = stall_rate
+        self.stall_s = stall_s
+        self.hourly_hours = hourly_hours
+        self.alert_count = alert_count
+        self.area_alert_count = area_alert_count
+        self.max_age = max_age
+        self.recordings = recordings
+        self.rng = random.Random(seed)
+
+class StubServer:
+    """Threaded stub HTTP server; use as a context manager"""
+
+    def __init__(self, config=None, host='127.0.0.1', port=0):
+        self.config = config or StubConfig()
+        self.requests = Counter()
+        self._lock = threading.Lock()
+        self._bodies = {}
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def reset_counts(self):
+        with self._lock:
+            self.requests.clear()
+
+    def body(self, route, params, query):
+        """Payload bytes for a route, recorded if available, generated (and memoized) otherwise"""
+        config = self.config
+        if route == 'nwis':
+            sites = tuple(sorted(query.get('sites', [''])[0].split(',')))
+            key = (route, sites)
+        elif route in ('forecast_hourly', 'gridpoint'):
+            key = (route, params['office'], params['x'], params['y'], config.hourly_hours)
+        elif route == 'alerts' and 'area' in query:
+            key = (route, 'area', query['area'][0], config.area_alert_count)
+        elif route == 'alerts':
+            key = (route, query.get('point', [''])[0], config.alert_count)
+        elif route == 'stations':
+            key = (route, query.get('state', [''])[0])
+        elif route == 'nwis_site':
+            key = (route, query.get('stateCd', [''])[0].upper())
+        else:
+            key = (route,) + tuple(params.values())
+
+        with self._lock:
+            if key in self._bodies:
+                return self._bodies[key]
+
+        recorded = self._recorded(route, params)
+        if recorded is not None:
+            body = recorded
+        elif route == 'observations':
+            body = json.dumps(payloads.observation(params['station'])).encode()
+        elif route == 'forecast':
+            body = json.dumps(payloads.forecast(params['office'], params['x'], params['y'])).encode()
+        elif route == 'forecast_hourly':
+            body = json.dumps(payloads.hourly_forecast(params['office'], params['x'], params['y'], config.hourly_hours)).encode()
+        elif route == 'gridpoint':
+            body = json.dumps(payloads.gridpoint(params['office'], params['x'], params['y'], config.hourly_hours)).encode()
+        elif route == 'alerts' and key[1] == 'area':
+            body = json.dumps(payloads.area_alerts(key[2].split(','), config.area_alert_count)).encode()
+        elif route == 'alerts':
+            body = json.dumps(payloads.alerts(config.alert_count, seed=zlib.crc32(repr(key).encode()))).encode()
+        elif route == 'zone':
+            body = json.dumps(payloads.zone(params['zone'])).encode()
+        elif route == 'nwis':
+            body = json.dumps(payloads.nwis_iv(sites)).encode()
+        elif route == 'points':
+            body = json.dumps(payloads.points(float(params['lat']), float(params['lon']))).encode()
+        elif route == 'stations':
+            body = json.dumps(payloads.stations(key[1])).encode()
+        elif route == 'nwis_site':
+            body = payloads.nwis_sites(key[1]).encode()
+        else:
+            return None
+
+        with self._lock:
+            self._bodies[key] = body
+        return body
+
+    def _recorded(self, route, params):
+        if not self.config.recordings:
+            return None
+        name = '_'.join([route] + [str(value) for value in params.values()]) + '.json'
+        path = os.path.join(self.config.recordings, name)
+        if not os.path.exists(path):
+            path = os.path.join(self.config.recordings, f"{route}.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # Keep-alive, like the real APIs
+
+            def setup(self):
+                super().setup()
+                # Headers and body go out in separate writes; don't let Nagle add a delayed-ACK stall
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                for route, pattern in ROUTES:
+                    match = pattern.match(parsed.path)
+                    if match:
+                        break
+                else:
+                    return self._send(404, b'{"title": "Not Found"}')
+
+                with server._lock:
+                    server.requests[route] += 1
+
+                config = server.config
+                delay = config.latency_s + config.rng.uniform(0, config.jitter_s)
+                if config.rng.random() < config.stall_rate:
+                    delay = config.stall_s
+                if delay:
+                    time.sleep(delay)
+                if config.rng.random() < config.failure_rate:
+                    return self._send(503, b'{"title": "Service Unavailable"}')
+
+                body = server.body(route, match.groupdict(), parse_qs(parsed.query))
+                if body is None:
+                    return self._send(404, b'{"title": "Not Found"}')
+                self._send(200, body)
+
+            def _send(self, status, body):
+                try:
+                    self.send_response(status)
+                    self.send_header('Content-Type', 'application/geo+json')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.send_header('Cache-Control', f"public, max-age={server.config.max_age}")
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # Client gave up on a stalled request - expected under failure injection
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,130 @@
+import hashlib
+import os
+
+import msgspec
+import numpy as np
+import pandas as pd
+import pydeck as pdk
+import streamlit as st
+
+import inspection_points
+import report_schema
+
+# --- CONFIGURATION ---
+REPORT_PATH = 'latest_report.json'
+MAP_STYLE = "mapbox://styles/mapbox/satellite-v9"
+
+# Everything below is cached with cache_resource: one shared, read-only copy
+# for every session, rebuilt only when the report file actually changes.
+
+@st.cache_resource(max_entries=4)
+def _read_report(path, mtime_ns, size):
+    """Decode and validate the report once per (mtime, size); returns (content hash, Report).
+
+    Raises report_schema.SchemaError if the writer's schema has drifted from this reader's.
+    """
+    with open(path, 'rb') as f:
+        raw = f.read()
+    decode = report_schema.decode_compact if path.endswith(report_schema.COMPACT_SUFFIX) else report_schema.decode_json
+    return hashlib.sha256(raw).hexdigest(), decode(raw)
+
+@st.cache_resource(max_entries=4)
+def _view_model(digest, _data):
+    """Derived frames, keyed on the report's content hash"""
+    data = _data
+    view = {'digest': digest, 'data': data, 'forecast_table': None}
+    view['sections'] = report_schema.section_digests(data)
+
+    if data.forecast_7day:
+        forecast_df = pd.DataFrame(msgspec.to_builtins(data.forecast_7day))
+        display_df = forecast_df[['day', 'high', 'low', 'precipitation_prob', 'wind_speed', 'short_forecast']].copy()
+        display_df.columns = ['Day', 'High °F', 'Low °F', 'Rain %', 'Wind', 'Conditions']
+        view['forecast_table'] = display_df
+
+    view['evaporation_curve'] = None
+    projection = data.concrete_ops.evap_projection
+    if projection.start:
+        curve = pd.DataFrame(
+            {'Evaporation (kg/m²/h)': projection.evap_kg_m2_h, 'Caution (0.5)': 0.5, 'Critical (1.0)': 1.0},
+            index=pd.to_datetime(projection.start, utc=True)
+        )
+        view['evaporation_curve'] = curve
+
+    return view
+
+@st.cache_resource(max_entries=32)
+def _map_view(map_digest, _data, mapbox_token, zoom, store_mtime_ns):
+    """Viewport-clustered inspection points and the deck, per (map inputs, zoom, point store version).
+
+    Points come from the inspection point store when it has any for this
+    site, otherwise from the report's map labels; either way only the
+    points in view are shipped, merged into clusters when zoomed out.
+    """
+    data = _data
+    site_id, location = data.site_info.id, data.site_info.location
+    labels = None
+    if not store_mtime_ns or not inspection_points.count(site_id):
+        labels = inspection_points.from_labels(site_id, msgspec.to_builtins(data.swppp_compliance.map_labels))
+    clusters, in_view = inspection_points.viewport(location.lat, location.lon, zoom, site_id=site_id, points=labels)
+
+    df = pd.DataFrame({name: clusters[name] for name in ('lat', 'lon', 'label', 'priority', 'count')})
+    df['color'] = df['priority'].map(lambda p: inspection_points.PRIORITY_COLORS.get(p, [255, 165, 0]))
+    df['radius'] = 6 + 3 * np.sqrt(df['count'])
+    view = {'in_view': in_view, 'markers': len(df), 'map_table': df[['label', 'priority', 'count', 'lat', 'lon']]}
+
+    view_state = pdk.ViewState(
+        latitude=location.lat,
+        longitude=location.lon,
+        zoom=zoom,
+        pitch=45
+    )
+
+    points = pdk.Layer(
+        "ScatterplotLayer",
+        df,
+        get_position="[lon, lat]",
+        get_color="color",
+        get_radius="radius",
+        radius_units="'pixels'",
+        pickable=True
+    )
+
+    labels = pdk.Layer(
+        "TextLayer",
+        df,
+        get_position="[lon, lat]",
+        get_text="label",
+        get_size=16,
+        get_color=[255, 255, 255],
+        get_alignment_baseline="'bottom'",
+        get_pixel_offset=[0, -15],
+    )
+
+    view['deck'] = pdk.Deck(
+        map_style=MAP_STYLE,
+        api_keys={"mapbox": mapbox_token},
+        initial_view_state=view_state,
+        layers=[points, labels],
+        tooltip={"text": "{label}\nPriority: {priority}"}
+    )
+    return view
+
+def load_view(path=REPORT_PATH):
+    """Current report and its precomputed view model.
+
+    A rerun costs one os.stat; the file is re-parsed only when its mtime or
+    size changes, and derived frames/layers are rebuilt only when the
+    content hash changes.
+    """
+    compact = report_schema.compact_path(path)
+    if os.path.exists(compact) and os.stat(compact).st_mtime_ns >= os.stat(path).st_mtime_ns:
+        path = compact  # Same report, a fraction of the bytes to read and decode
+    stat = os.stat(path)
+    digest, data = _read_report(path, stat.st_mtime_ns, stat.st_size)
+    return _view_model(digest, data)
+
+def load_map(view, mapbox_token, zoom):
+    """Inspection map for the given zoom; re-queried only when the zoom, the site/map labels or the point store changes"""
+    path = inspection_points.POINTS_PATH
+    store_mtime_ns = os.stat(path).st_mtime_ns if os.path.exists(path) else 0
+    return _map_view(view['sections']['map'], view['data'], mapbox_token, zoom, store_mtime_ns)
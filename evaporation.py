@@ -0,0 +1,53 @@
+import numpy as np
+
+# --- CONFIGURATION ---
+MODERATE_EVAP = 0.5  # kg/m²/h - take precautions above this
+HIGH_EVAP = 1.0      # kg/m²/h - plastic shrinkage cracking likely above this
+
+def evaporation_rate(air_temp_f, concrete_temp_f, humidity, wind_mph):
+    """Uno / ACI 305R surface evaporation rate in kg/m²/h, vectorized over any array shape.
+
+    E = 5 * ((Tc + 18)^2.5 - r * (Ta + 18)^2.5) * (V + 4) * 1e-6
+    with concrete (Tc) and air (Ta) temperature in °C, relative humidity r as
+    a fraction and wind speed V in km/h. Negative rates (condensation) clip to
+    0; missing inputs (NaN) propagate as NaN.
+    """
+    ta = (np.asarray(air_temp_f, dtype=np.float64) - 32) * 5 / 9
+    tc = (np.asarray(concrete_temp_f, dtype=np.float64) - 32) * 5 / 9
+    rh = np.asarray(humidity, dtype=np.float64) / 100.0
+    v = np.asarray(wind_mph, dtype=np.float64) * 1.60934
+
+    # Below -18 °C the power terms are undefined; the formula has no meaning there anyway
+    evap = 5 * (np.maximum(tc + 18, 0) ** 2.5 - rh * np.maximum(ta + 18, 0) ** 2.5) * (v + 4) * 1e-6
+    return np.where(np.isnan(evap), np.nan, np.maximum(evap, 0))
+
+def evaporation_levels(evap):
+    """0 LOW, 1 MODERATE (> 0.5), 2 HIGH (> 1.0) per element; NaN counts as LOW"""
+    evap = np.asarray(evap, dtype=np.float64)
+    return (evap > MODERATE_EVAP).astype(np.int8) + (evap > HIGH_EVAP).astype(np.int8)
+
+def project_hourly(hourly, concrete_temp_f=None):
+    """Projected evaporation curve over the hourly forecast, in one vectorized pass.
+
+    `concrete_temp_f` is the placed-concrete temperature (scalar or per-hour);
+    when unknown the air temperature is used, as for the current snapshot.
+    """
+    air = np.asarray(hourly['temp_f'], dtype=np.float64)
+    concrete = air if concrete_temp_f is None else np.broadcast_to(np.asarray(concrete_temp_f, dtype=np.float64), air.shape)
+    evap = evaporation_rate(air, concrete, hourly['humidity'], hourly['wind_mph'])
+    levels = evaporation_levels(evap)
+
+    projection = {
+        'start': list(hourly['start']),
+        'evap_kg_m2_h': [round(float(e), 3) for e in evap],
+        'level': levels.tolist(),
+        'hours_above_0_5': int((levels >= 1).sum()),
+        'hours_above_1_0': int((levels == 2).sum()),
+        'peak_kg_m2_h': None,
+        'peak_time': None,
+    }
+    if len(evap) and not np.isnan(evap).all():
+        peak = int(np.nanargmax(evap))
+        projection['peak_kg_m2_h'] = round(float(evap[peak]), 3)
+        projection['peak_time'] = hourly['start'][peak]
+    return projection
@@ -0,0 +1,85 @@
+import copy
+import threading
+import time
+from concurrent.futures import Future, wait
+
+from pipeline_metrics import MetricsRecorder
+
+# --- CONFIGURATION ---
+FETCH_DEADLINE_S = 20.0  # Wall-clock budget for the whole fetch stage
+
+def run_fetch_stage(sources, deadline=FETCH_DEADLINE_S, metrics=None):
+    """Run all data sources concurrently under one wall-clock deadline.
+
+    `sources` maps a source name to {'fetch': fn, 'default': value, 'timeout': seconds};
+    each fetch function is called as fn(timeout=...). A source that errors or misses
+    the deadline falls back to a copy of its default and is marked stale; one the
+    HTTP client answered from its last known good copy keeps that data, marked
+    stale with its age.
+    Each source is timed as a `fetch.<name>` stage on `metrics`, if given.
+    Returns (results, freshness).
+    """
+    metrics = metrics or MetricsRecorder()
+    started = time.monotonic()
+    futures = {}
+    for name, source in sources.items():
+        timeout = min(source['timeout'], deadline)
+        futures[name] = _start(f"fetch-{name}", _timed_call, source['fetch'], timeout, metrics, f"fetch.{name}")
+
+    wait(futures.values(), timeout=deadline)
+
+    results, freshness = {}, {}
+    for name, future in futures.items():
+        if not future.done():
+            print(f"⏱️ {name} missed the {deadline:g}s deadline - using defaults")
+            results[name] = copy.deepcopy(sources[name]['default'])
+            freshness[name] = {'stale': True, 'reason': 'deadline', 'elapsed_s': round(time.monotonic() - started, 3)}
+            metrics.update(f"fetch.{name}", latency_ms=round((time.monotonic() - started) * 1000, 3), fallback_used=True, error='deadline')
+            continue
+
+        try:
+            value, elapsed, record = future.result()
+        except Exception as e:
+            print(f"❌ Error fetching {name}: {e}")
+            results[name] = copy.deepcopy(sources[name]['default'])
+            freshness[name] = {'stale': True, 'reason': f'error: {type(e).__name__}', 'elapsed_s': None}
+            metrics.update(f"fetch.{name}", fallback_used=True, error=f"{type(e).__name__}: {e}"[:200])
+            continue
+
+        results[name] = value
+        if record.get('stale'):
+            age = record['stale']['age_s']
+            print(f"♻️ {name}: upstream unavailable - serving last known good data"
+                  f"{f' ({age / 60:.0f} min old)' if age is not None else ''}")
+            freshness[name] = {'stale': True, 'reason': f"last good ({record['stale']['reason']})",
+                               'elapsed_s': round(elapsed, 3), 'age_s': None if age is None else round(age)}
+            metrics.update(f"fetch.{name}", fallback_used=True)
+            continue
+        freshness[name] = {'stale': False, 'reason': None, 'elapsed_s': round(elapsed, 3)}
+
+    return results, freshness
+
+def _start(name, fn, *args):
+    """Run fn(*args) on its own daemon thread and return its Future.
+
+    A pool's workers are joined at interpreter exit, so one upstream call
+    stalled past the deadline would still hold the process open; a daemon
+    thread is simply abandoned with its result.
+    """
+    future = Future()
+
+    def run():
+        future.set_running_or_notify_cancel()
+        try:
+            future.set_result(fn(*args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name=name, daemon=True).start()
+    return future
+
+def _timed_call(fetch, timeout, metrics, stage):
+    start = time.monotonic()
+    with metrics.stage(stage) as record:
+        value = fetch(timeout=timeout)
+    return value, time.monotonic() - start, record
@@ -0,0 +1,207 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import alert_index
+import snapshot_archive
+import soil_moisture
+import static_briefing
+from fetch_stage import run_fetch_stage
+from gridpoint import empty_grid
+from history_store import append_report
+from http_client import cache_stats
+from pipeline_metrics import MetricsRecorder, export as export_metrics
+from rainfall import empty_totals
+from update_report import (
+    ALERTS_TIMEOUT, DEFAULT_WEATHER, FORECAST_TIMEOUT, GRIDPOINT_TIMEOUT, HOURLY_TIMEOUT, USGS_TIMEOUT, WEATHER_TIMEOUT,
+    build_report, get_alerts, get_current_weather, get_forecast, get_gridpoint, get_hourly_forecast, get_usgs_batch,
+    print_summary, write_report
+)
+from work_windows import empty_hourly
+
+# --- CONFIGURATION ---
+FLEET_WORKERS = os.cpu_count() or 1
+AREA_ALERTS = 'alerts:areas'  # One alert request for every site whose state is known
+
+def load_manifest(path):
+    """Load the site manifest: {"sites": [{id, name, gauge_name, usgs_site, lat, lon, nws_office, nws_grid, nws_station, forecast_zone?, state?, thresholds?, concrete_temp_f?, ...}]}"""
+    with open(path) as f:
+        manifest = json.load(f)
+
+    sites = manifest['sites']
+    for site in sites:
+        site['nws_grid'] = tuple(site['nws_grid'])
+    return sites
+
+def grid_key(site):
+    return f"{site['nws_office']}/{site['nws_grid'][0]},{site['nws_grid'][1]}"
+
+def alert_key(site):
+    return AREA_ALERTS if alert_index.site_area(site) else f"alerts:{grid_key(site)}"
+
+def plan_fetches(sites):
+    """Build one fetch source per distinct gridpoint, station and gauge batch.
+
+    Upstream calls scale with distinct grids (forecasts), stations, one NWIS
+    request for all gauges and one alert request for all states - not with
+    the number of sites.
+    """
+    sources = {}
+    gauges = sorted({site['usgs_site'] for site in sites})
+    sources['usgs'] = {'fetch': partial(get_usgs_batch, gauges), 'default': {g: empty_totals() for g in gauges}, 'timeout': USGS_TIMEOUT}
+    areas = sorted({alert_index.site_area(site) for site in sites} - {None})
+    if areas:
+        sources[AREA_ALERTS] = {
+            'fetch': partial(alert_index.get_area_alerts, areas),
+            'default': [], 'timeout': alert_index.AREA_TIMEOUT
+        }
+
+    for site in sites:
+        station_source = f"weather:{site['nws_station']}"
+        if station_source not in sources:
+            sources[station_source] = {
+                'fetch': partial(get_current_weather, station=site['nws_station']),
+                'default': DEFAULT_WEATHER, 'timeout': WEATHER_TIMEOUT
+            }
+
+        grid = grid_key(site)
+        if f"forecast:{grid}" not in sources:
+            sources[f"forecast:{grid}"] = {
+                'fetch': partial(get_forecast, office=site['nws_office'], grid=site['nws_grid']),
+                'default': [], 'timeout': FORECAST_TIMEOUT
+            }
+            sources[f"forecast_hourly:{grid}"] = {
+                'fetch': partial(get_hourly_forecast, office=site['nws_office'], grid=site['nws_grid']),
+                'default': empty_hourly(), 'timeout': HOURLY_TIMEOUT
+            }
+            sources[f"gridpoint:{grid}"] = {
+                'fetch': partial(get_gridpoint, office=site['nws_office'], grid=site['nws_grid']),
+                'default': empty_grid(), 'timeout': GRIDPOINT_TIMEOUT
+            }
+        # Sites without a known state fall back to a point query; the first site on a gridpoint stands in for its ~2.5 km cell
+        if alert_key(site) not in sources:
+            sources[alert_key(site)] = {
+                'fetch': partial(get_alerts, lat=site['lat'], lon=site['lon']),
+                'default': [], 'timeout': ALERTS_TIMEOUT
+            }
+    return sources
+
+def assign_alerts(sites, fetched, freshness, metrics=None):
+    """{site_id: alerts} for the sites on the area alert feed, matching only alerts new since the last run.
+
+    The previous run's alerts and matches are persisted with the zone cache
+    (see alert_index.AlertIndex), so a fleet run that sees the same alerts
+    tests no polygons at all. If the feed fetch failed, the previous alert
+    set is kept rather than expired.
+    """
+    area_sites = [site for site in sites if alert_index.site_area(site)]
+    if not area_sites:
+        return {}
+    metrics = metrics or MetricsRecorder('fleet')
+    with metrics.stage('alert_assign'):
+        index = alert_index.for_sites(area_sites)
+        if freshness[AREA_ALERTS]['stale']:
+            # An empty fallback would expire every active warning (and persist that) for the outage
+            print(f"⚠️ Area alert feed unavailable - keeping the {len(index.alerts)} alerts from the last run")
+            new, expired, changed = [], [], []
+        else:
+            new, expired, changed = index.update(fetched[AREA_ALERTS])
+        assigned = index.site_alerts()
+    affected = sum(1 for alerts in assigned.values() if alerts)
+    print(f"🗺️ Alerts matched to {affected}/{len(area_sites)} sites ({len(new)} new, {len(expired)} expired; "
+          f"{len(changed)} sites with alert changes)")
+    return assigned
+
+def site_inputs(site, fetched, freshness, metrics=None, soil_state=None, alerts=None):
+    """Pick this site's slice of the shared fetch results (and their fetch stage timings).
+
+    `alerts` are the site's matches from the area feed (see assign_alerts);
+    otherwise its point query's alerts are used.
+    """
+    grid = grid_key(site)
+    keys = {
+        'usgs': 'usgs',
+        'weather': f"weather:{site['nws_station']}",
+        'forecast': f"forecast:{grid}",
+        'forecast_hourly': f"forecast_hourly:{grid}",
+        'gridpoint': f"gridpoint:{grid}",
+        'alerts': alert_key(site),
+    }
+    return {
+        'site': site,
+        'weather': fetched[keys['weather']],
+        'forecast': fetched[keys['forecast']],
+        'rainfall': fetched['usgs'][site['usgs_site']],
+        'alerts': fetched[keys['alerts']] if alerts is None else alerts,
+        'hourly': fetched[keys['forecast_hourly']],
+        'gridpoint': fetched[keys['gridpoint']],
+        'soil_state': soil_state,
+        'freshness': {name: freshness[key] for name, key in keys.items()},
+        'fetch_metrics': [stage for stage in (metrics.stages('fetch.') if metrics else [])
+                          if stage['stage'][len('fetch.'):] in keys.values()],
+    }
+
+def _build_site_report(inputs):
+    metrics = MetricsRecorder(inputs['site']['id'])
+    metrics.add(inputs.get('fetch_metrics', []))
+    return build_report(inputs['site'], inputs['weather'], inputs['forecast'], inputs['rainfall'],
+                        inputs['alerts'], inputs['freshness'], hourly=inputs['hourly'], metrics=metrics,
+                        gridpoint=inputs['gridpoint'], soil_state=inputs.get('soil_state'))
+
+def run_fleet(manifest_path, out_dir):
+    """Fetch shared data once for the whole fleet and write one report per site"""
+    sites = load_manifest(manifest_path)
+    sources = plan_fetches(sites)
+
+    print(f"🔄 Generating briefings for {len(sites)} sites ({len(sources)} upstream requests)...")
+    print("="*60)
+
+    fetch_metrics = MetricsRecorder('fleet')
+    fetched, freshness = run_fetch_stage(sources, metrics=fetch_metrics)
+    soil_states = soil_moisture.load_states([site['id'] for site in sites])
+    assigned = assign_alerts(sites, fetched, freshness, fetch_metrics)
+    inputs = [site_inputs(site, fetched, freshness, fetch_metrics, soil_states.get(site['id']), assigned.get(site['id']))
+              for site in sites]
+
+    workers = max(1, min(FLEET_WORKERS, len(sites)))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        reports = list(executor.map(_build_site_report, inputs, chunksize=max(1, len(inputs) // (workers * 4))))
+
+    stats = cache_stats()
+    os.makedirs(out_dir, exist_ok=True)
+    index = []
+    archived = {}
+    recorders = [fetch_metrics]
+    for site, report_data in zip(sites, reports):
+        report_data['http_cache'] = stats
+        print_summary(report_data)
+        # Shared fetches are exported once under the 'fleet' recorder; per-site exports carry analysis + write
+        site_metrics = MetricsRecorder(site['id'])
+        site_metrics.add(stage for stage in report_data['pipeline_metrics']['stages'] if not stage['stage'].startswith('fetch.'))
+        recorders.append(site_metrics)
+        path = os.path.join(out_dir, f"{site['id']}.json")
+        with site_metrics.stage('report_write'):
+            report = write_report(path, report_data)
+            append_report(site['id'], report_data)
+        archived[site['id']] = report
+        with site_metrics.stage('static_briefing'):
+            static_briefing.export(report, os.path.join(out_dir, static_briefing.BRIEFING_DIR, site['id']))
+        index.append({
+            'id': site['id'],
+            'name': site['name'],
+            'report': path,
+            'pour_status': report_data['concrete_ops']['pour_status'],
+            'active_alerts': len(report_data['active_alerts']),
+        })
+
+    soil_moisture.save_states({site['id']: report_data['soil_moisture']['state'] for site, report_data in zip(sites, reports)})
+    archived = snapshot_archive.record_many(archived)
+    with open(os.path.join(out_dir, 'index.json'), 'w') as f:
+        json.dump({'sites': index, 'upstream_requests': len(sources), 'http_cache': stats}, f, indent=4)
+    export_metrics(recorders)
+
+    print(f"\n✅ {len(reports)} site briefings written to {out_dir}/ "
+          f"({sum(1 for _, changed in archived.values() if changed)} with material changes archived)")
+    print("="*60)
+    return reports
@@ -0,0 +1,114 @@
+import json
+import re
+from datetime import datetime, timezone
+
+import numpy as np
+
+# --- CONFIGURATION ---
+GRID_HOURS = 168               # Hourly slots expanded from now (NWS grids run ~7 days)
+FORECAST_WINDOWS_H = (6, 24, 48, 72)
+GUST_WINDOW_H = 24             # Peak gust is taken over the next day
+
+# Report field -> NWS raw gridpoint layer
+GRID_LAYERS = {
+    'qpf_in': 'quantitativePrecipitation',
+    'pop': 'probabilityOfPrecipitation',
+    'gust_mph': 'windGust',
+    'humidity': 'relativeHumidity',
+    'temp_f': 'temperature',
+}
+# Layers whose value is a total over the interval (spread evenly across its hours) rather than a rate or level
+ACCUMULATED = {'qpf_in'}
+
+_UNITS = {
+    'wmoUnit:mm': lambda v: v / 25.4,
+    'wmoUnit:km_h-1': lambda v: v * 0.621371,
+    'wmoUnit:m_s-1': lambda v: v * 2.236936,
+    'wmoUnit:degC': lambda v: v * 9 / 5 + 32,
+}
+_DURATION = re.compile(r'^P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?)?$')
+
+def empty_grid(hours=0):
+    """Gridpoint forecast with no data, in the shape parse_gridpoint returns"""
+    start = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0).timestamp()
+    return {'start': start, **{field: np.full(hours, np.nan) for field in GRID_LAYERS}}
+
+def _interval(valid_time):
+    """'2024-05-01T06:00:00+00:00/PT6H' -> (start epoch, whole hours)"""
+    stamp, duration = valid_time.split('/')
+    match = _DURATION.match(duration)
+    days, hours, minutes = (int(part or 0) for part in match.groups())
+    return datetime.fromisoformat(stamp).timestamp(), days * 24 + hours + (minutes + 59) // 60
+
+def parse_gridpoint(payload, hours=GRID_HOURS, start=None):
+    """Expand NWS raw gridpoint layers into aligned hourly arrays.
+
+    `payload` is the /gridpoints/{office}/{x},{y} JSON (bytes or dict). Each
+    layer is a list of {validTime: "<start>/<ISO-8601 duration>", value}
+    intervals of varying length; all of them are scattered onto one
+    (layer x hour) grid starting at `start` (default: this hour, UTC) in a
+    single vectorized pass. Values are converted to inches, mph, °F and
+    percent; accumulated layers (QPF) are split evenly over their hours.
+    Hours no interval covers are NaN.
+
+    Returns {'start': epoch seconds of hour 0, field: float64 array, ...}.
+    """
+    if isinstance(payload, (bytes, bytearray, str)):
+        payload = json.loads(payload)
+    properties = payload['properties']
+    if start is None:
+        start = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0).timestamp()
+
+    layer_ids, starts, durations, values = [], [], [], []
+    for layer_id, (field, layer) in enumerate(GRID_LAYERS.items()):
+        series = properties.get(layer) or {}
+        convert = _UNITS.get(series.get('uom'), lambda v: v)
+        items = series.get('values') or []
+        raw = np.array([np.nan if item['value'] is None else item['value'] for item in items], dtype=np.float64)
+        spans = [_interval(item['validTime']) for item in items]
+        layer_starts = np.array([span[0] for span in spans], dtype=np.float64)
+        layer_hours = np.array([span[1] for span in spans], dtype=np.int64)
+        layer_values = convert(raw)
+        if field in ACCUMULATED:
+            layer_values = layer_values / np.maximum(layer_hours, 1)
+        layer_ids.append(np.full(len(items), layer_id))
+        starts.append(layer_starts)
+        durations.append(layer_hours)
+        values.append(layer_values)
+
+    layer_ids, starts, values = np.concatenate(layer_ids), np.concatenate(starts), np.concatenate(values)
+    durations = np.concatenate(durations)
+
+    # Every interval becomes `duration` consecutive hour slots: repeat its row/offset/value, then add 0..duration-1
+    first = np.floor((starts - start) / 3600.0).astype(np.int64)
+    rows = np.repeat(layer_ids, durations)
+    step = np.arange(durations.sum()) - np.repeat(np.cumsum(durations) - durations, durations)
+    cols = np.repeat(first, durations) + step
+    keep = (cols >= 0) & (cols < hours)
+
+    grid = np.full((len(GRID_LAYERS), hours), np.nan)
+    grid[rows[keep], cols[keep]] = np.repeat(values, durations)[keep]
+    return {'start': start, **{field: grid[i] for i, field in enumerate(GRID_LAYERS)}}
+
+def forecast_quantities(grid, windows_h=FORECAST_WINDOWS_H, gust_window_h=GUST_WINDOW_H, now=None):
+    """Forecast rain totals and peak gust ahead of `now`, as plain numbers for the rules and the report.
+
+    Totals are None when the grid has no QPF for any hour of the window.
+    """
+    if now is None:
+        now = datetime.now(timezone.utc).timestamp()
+    offset = max(0, int((now - grid['start']) // 3600))
+    qpf, gust = grid['qpf_in'][offset:], grid['gust_mph'][offset:]
+
+    rain = {}
+    for window in windows_h:
+        hours = qpf[:window]
+        rain[f"{window}h"] = None if np.isnan(hours).all() else round(float(np.nansum(hours)), 2)
+
+    ahead = gust[:gust_window_h]
+    peak, peak_time = None, None
+    if not np.isnan(ahead).all():
+        index = int(np.nanargmax(ahead))
+        peak = round(float(ahead[index]), 1)
+        peak_time = datetime.fromtimestamp(grid['start'] + (offset + index) * 3600, timezone.utc).isoformat()
+    return {'rain_in': rain, 'peak_gust_mph': peak, 'peak_gust_time': peak_time}
@@ -0,0 +1,152 @@
+import csv
+import io
+import json
+import os
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+# --- CONFIGURATION ---
+HISTORY_PATH = "history/observations.sqlite"
+# The store itself lives in the Actions cache; the dashboard's trends read this
+# small text export, which is what gets committed
+TRENDS_PATH = "history/trends.csv"
+TRENDS_DAYS = 90
+TREND_COLUMNS = ['temperature_f', 'humidity_percent', 'rain_24h', 'rain_72h', 'evap_rate_kg_m2_h', 'concrete_pouring_status']
+
+ACTIVITIES = ['concrete_pouring', 'grading_excavation', 'asphalt_paving', 'painting_coating', 'crane_ops']
+
+# Scalar columns stored per run; forecast and statuses ride along as compact JSON/text
+COLUMNS = [
+    'temperature_f', 'wind_speed_mph', 'humidity_percent',
+    'rain_1h', 'rain_6h', 'rain_24h', 'rain_48h', 'rain_72h',
+    'evap_rate_kg_m2_h', 'active_alerts',
+] + [f'{activity}_status' for activity in ACTIVITIES] + ['conditions', 'forecast_json']
+TEXT_COLUMNS = {f'{activity}_status' for activity in ACTIVITIES} | {'conditions', 'forecast_json'}
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS observations (
+    site_id TEXT NOT NULL,
+    day TEXT NOT NULL,
+    ts REAL NOT NULL,
+    {', '.join(f'{column} {"TEXT" if column in TEXT_COLUMNS else "REAL"}' for column in COLUMNS)},
+    PRIMARY KEY (site_id, ts)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS observations_site_day ON observations (site_id, day);
+"""
+
+def connect(path=HISTORY_PATH):
+    """Open (and create if needed) the history store"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    db = sqlite3.connect(path, timeout=30)
+    db.executescript(_SCHEMA)
+    return db
+
+def report_row(site_id, report_data):
+    """Flatten one briefing report into a history row"""
+    updated = datetime.fromisoformat(report_data['last_updated'])
+    if updated.tzinfo is None:
+        updated = updated.astimezone()
+    updated = updated.astimezone(timezone.utc)
+    conditions = report_data['current_conditions']
+    rainfall = report_data.get('rainfall_accumulation', {})
+    recommendations = report_data['activity_recommendations']
+
+    row = {
+        'site_id': site_id,
+        'day': updated.strftime('%Y-%m-%d'),
+        'ts': updated.timestamp(),
+        'temperature_f': conditions['temperature_f'],
+        'wind_speed_mph': conditions['wind_speed_mph'],
+        'humidity_percent': conditions['humidity_percent'],
+        'rain_24h': conditions['precipitation_24h'],
+        'evap_rate_kg_m2_h': report_data['concrete_ops']['evap_rate_kg_m2_h'],
+        'active_alerts': len(report_data['active_alerts']),
+        'conditions': conditions['conditions'],
+        'forecast_json': json.dumps(report_data['forecast_7day'], separators=(',', ':')),
+    }
+    for window in ('1h', '6h', '48h', '72h'):
+        row[f'rain_{window}'] = rainfall.get(window)
+    for activity in ACTIVITIES:
+        row[f'{activity}_status'] = recommendations[activity]['status']
+    return row
+
+def append_report(site_id, report_data, path=HISTORY_PATH):
+    """Append one run's normalized observations, forecast snapshot and statuses"""
+    row = report_row(site_id, report_data)
+    names = list(row)
+    db = connect(path)
+    try:
+        with db:
+            db.execute(
+                f"INSERT OR REPLACE INTO observations ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})",
+                [row[name] for name in names]
+            )
+    finally:
+        db.close()
+
+def query(site_id, start, end=None, columns=None, path=HISTORY_PATH):
+    """Observations for one site between two datetimes as a DataFrame indexed by UTC timestamp.
+
+    Only the (site_id, ts) primary-key range is read, so cost follows the
+    size of the window rather than the size of the history.
+    """
+    import pandas as pd  # Only the dashboard reads history; the writer stays pandas-free
+    
+    end = end or datetime.now(timezone.utc)
+    columns = columns or [column for column in COLUMNS if column != 'forecast_json']
+    db = connect(path)
+    try:
+        frame = pd.read_sql_query(
+            f"SELECT ts, {', '.join(columns)} FROM observations WHERE site_id = ? AND ts >= ? AND ts <= ? ORDER BY ts",
+            db, params=(site_id, _epoch(start), _epoch(end))
+        )
+    finally:
+        db.close()
+    frame.index = pd.to_datetime(frame.pop('ts'), unit='s', utc=True)
+    return frame
+
+def export_trends(site_id, days=TRENDS_DAYS, path=HISTORY_PATH, out=TRENDS_PATH):
+    """Write the last `days` days of the trend columns as CSV (a few KB, diffs by line)"""
+    start = (datetime.now(timezone.utc) - timedelta(days=days)).timestamp()
+    db = connect(path)
+    try:
+        rows = db.execute(
+            f"SELECT ts, {', '.join(TREND_COLUMNS)} FROM observations WHERE site_id = ? AND ts >= ? ORDER BY ts",
+            (site_id, start)
+        ).fetchall()
+    finally:
+        db.close()
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(['site_id', 'ts'] + TREND_COLUMNS)
+    writer.writerows([site_id, *row] for row in rows)
+    tmp = f"{out}.tmp"
+    with open(tmp, 'w', newline='') as f:
+        f.write(buffer.getvalue())
+    os.replace(tmp, out)
+    return len(rows)
+
+def read_trends(site_id, days, path=TRENDS_PATH):
+    """The last `days` days of an export_trends() file, in query()'s shape"""
+    import pandas as pd
+    
+    frame = pd.read_csv(path)
+    frame = frame[(frame.pop('site_id') == site_id)
+                  & (frame['ts'] >= (datetime.now(timezone.utc) - timedelta(days=days)).timestamp())]
+    frame.index = pd.to_datetime(frame.pop('ts'), unit='s', utc=True)
+    return frame
+
+def query_days(site_id, days, columns=None, path=HISTORY_PATH):
+    """The last `days` days of observations for one site"""
+    end = datetime.now(timezone.utc)
+    return query(site_id, end - timedelta(days=days), end, columns=columns, path=path)
+
+def _epoch(value):
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.astimezone()
+        return value.timestamp()
+    return float(value)
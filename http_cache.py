@@ -0,0 +1,167 @@
+import email.utils
+import os
+import re
+import sqlite3
+import threading
+import time
+
+# --- CONFIGURATION ---
+CACHE_PATH = ".cache/http_cache.sqlite"
+CACHE_MAX_BYTES = 50 * 1024 * 1024  # LRU eviction keeps the cache under this size
+
+_MAX_AGE_RE = re.compile(r'(?:^|,)\s*(?:s-)?max-age\s*=\s*"?(\d+)"?', re.IGNORECASE)
+
+class ResponseCache:
+    """On-disk HTTP response cache keyed by URL.
+
+    Backed by SQLite so concurrent runs (threads or separate processes) share
+    one store safely. Entries carry their validators (ETag / Last-Modified) and
+    a freshness deadline from Cache-Control max-age or Expires.
+    """
+
+    def __init__(self, path=CACHE_PATH, max_bytes=CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._stats = {'hits': 0, 'revalidated': 0, 'misses': 0, 'stale_served': 0, 'evictions': 0}
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as db:
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    url TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    expires_at REAL NOT NULL,
+                    body BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    verified_at REAL
+                )
+            """)
+            db.execute("CREATE INDEX IF NOT EXISTS responses_lru ON responses (accessed_at)")
+            try:
+                # Stores created before last-known-good serving lack the column
+                db.execute("ALTER TABLE responses ADD COLUMN verified_at REAL")
+            except sqlite3.OperationalError:
+                pass
+
+    def _connect(self):
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30)
+            db.execute("PRAGMA journal_mode=WAL")
+            self._local.db = db
+        return db
+
+    def _count(self, key, n=1):
+        with self._stats_lock:
+            self._stats[key] += n
+
+    def stats(self):
+        """Hit / 304 / miss counters for this process"""
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def lookup(self, url):
+        """Return the cached entry for a URL as a dict, or None"""
+        row = self._connect().execute(
+            "SELECT etag, last_modified, expires_at, body, verified_at FROM responses WHERE url = ?", (url,)
+        ).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, expires_at, body, verified_at = row
+        return {'etag': etag, 'last_modified': last_modified, 'expires_at': expires_at, 'body': body,
+                'verified_at': verified_at}
+
+    def is_fresh(self, entry):
+        return entry['expires_at'] > time.time()
+
+    def age(self, entry):
+        """Seconds since the origin last confirmed this entry (None if unknown)"""
+        return None if entry['verified_at'] is None else max(0.0, time.time() - entry['verified_at'])
+
+    def conditional_headers(self, entry):
+        """If-None-Match / If-Modified-Since headers for revalidating an entry"""
+        headers = {}
+        if entry and entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def hit(self, url):
+        """Record a local hit and bump the entry's LRU position"""
+        self._count('hits')
+        with self._connect() as db:
+            db.execute("UPDATE responses SET accessed_at = ? WHERE url = ?", (time.time(), url))
+
+    def revalidated(self, url, response):
+        """Record a 304 and extend the entry's freshness from the new headers"""
+        self._count('revalidated')
+        now = time.time()
+        with self._connect() as db:
+            db.execute(
+                "UPDATE responses SET expires_at = ?, accessed_at = ?, verified_at = ? WHERE url = ?",
+                (freshness_deadline(response.headers), now, now, url)
+            )
+
+    def served_stale(self, url):
+        """Record serving an expired entry because the origin could not be reached"""
+        self._count('stale_served')
+        with self._connect() as db:
+            db.execute("UPDATE responses SET accessed_at = ? WHERE url = ?", (time.time(), url))
+
+    def store(self, url, response):
+        """Record a miss and cache a 200 response unless it says no-store"""
+        self._count('misses')
+        cache_control = response.headers.get('Cache-Control', '')
+        if 'no-store' in cache_control.lower():
+            return
+
+        body = response.content
+        now = time.time()
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO responses (url, etag, last_modified, expires_at, body, size, accessed_at, verified_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, response.headers.get('ETag'), response.headers.get('Last-Modified'),
+                 freshness_deadline(response.headers), body, len(body), now, now)
+            )
+            self._evict(db)
+
+    def _evict(self, db):
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        for url, size in db.execute("SELECT url, size FROM responses ORDER BY accessed_at").fetchall():
+            if total <= self.max_bytes:
+                break
+            db.execute("DELETE FROM responses WHERE url = ?", (url,))
+            total -= size
+            evicted += 1
+        self._count('evictions', evicted)
+
+def freshness_deadline(headers):
+    """Absolute expiry time from Cache-Control max-age (less Age), else Expires, else now"""
+    now = time.time()
+    cache_control = headers.get('Cache-Control', '')
+    if 'no-cache' in cache_control.lower():
+        return now
+
+    match = _MAX_AGE_RE.search(cache_control)
+    if match:
+        age = headers.get('Age', '0')
+        age = int(age) if age.isdigit() else 0
+        return now + max(0, int(match.group(1)) - age)
+
+    expires = headers.get('Expires')
+    if expires:
+        try:
+            return email.utils.parsedate_to_datetime(expires).timestamp()
+        except (TypeError, ValueError):
+            pass
+    return now
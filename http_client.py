@@ -0,0 +1,259 @@
+import email.utils
+import json
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from http_cache import ResponseCache
+from pipeline_metrics import record_request
+
+# --- CONFIGURATION ---
+USER_AGENT = 'SWPPP-Dashboard/1.0'
+POOL_CONNECTIONS = 4  # Distinct hosts kept warm (api.weather.gov, waterservices.usgs.gov, ...)
+POOL_MAXSIZE = 8      # Keep-alive connections per host
+
+# Retries: full-jitter exponential backoff, all attempts inside the caller's timeout
+RETRY_ATTEMPTS = 4
+RETRY_BASE_S = 0.25
+RETRY_CAP_S = 4.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Hedging: if a request is still out after the host's p95 latency, race a second one.
+# Off by default: in bench_tail_latency (3% stalled responses) it cuts p99 from ~1 s
+# to ~130 ms for ~4% more upstream requests, but p95 moves +/-10 ms either way, and
+# hedging later (1.5x p95) was worse on both. Worth it only against a stall-heavy host.
+HEDGE_REQUESTS = False
+HEDGE_MIN_SAMPLES = 20  # Latency samples needed before the p95 is trusted
+HEDGE_WINDOW = 200      # Recent latencies kept per host
+
+# Circuit breaker: after this many consecutive failures a host is skipped for the cooldown
+BREAKER_FAILURES = 8
+BREAKER_COOLDOWN_S = 60.0
+
+_session = None
+_session_lock = threading.Lock()
+_cache = None
+_hosts = {}
+_hedge_pool = None
+
+class CircuitOpenError(requests.ConnectionError):
+    """The host's circuit breaker is open and there is no cached copy to fall back on"""
+
+class HostHealth:
+    """Per-host circuit breaker plus a rolling latency window for the hedge delay"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self.latencies = deque(maxlen=HEDGE_WINDOW)
+
+    def allow(self):
+        """Closed: allow. Open: refuse until the cooldown passes, then let one trial request through."""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self._trial or time.monotonic() - self.opened_at < BREAKER_COOLDOWN_S:
+                return False
+            self._trial = True
+            return True
+
+    def success(self, elapsed):
+        with self._lock:
+            self.failures, self.opened_at, self._trial = 0, None, False
+            self.latencies.append(elapsed)
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= BREAKER_FAILURES:
+                self.opened_at, self._trial = time.monotonic(), False
+
+    def hedge_delay(self):
+        with self._lock:
+            if len(self.latencies) < HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(self.latencies)
+        return ordered[int(len(ordered) * 0.95) - 1]
+
+def get_session():
+    """Return the shared session with pooled keep-alive connections per host"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                session.headers.update({'User-Agent': USER_AGENT})
+                _session = session
+    return _session
+
+def get_cache():
+    """Return the shared on-disk response cache"""
+    global _cache
+    if _cache is None:
+        with _session_lock:
+            if _cache is None:
+                _cache = ResponseCache()
+    return _cache
+
+def configure_cache(path, max_bytes=None):
+    """Point the shared response cache at a different store (benchmarks, tests, fleet hosts)"""
+    global _cache
+    with _session_lock:
+        _cache = ResponseCache(path) if max_bytes is None else ResponseCache(path, max_bytes)
+    return _cache
+
+def cache_stats():
+    """Response cache hit / 304 / miss / stale counters for this run"""
+    return get_cache().stats()
+
+def host_health(host):
+    with _session_lock:
+        if host not in _hosts:
+            _hosts[host] = HostHealth()
+        return _hosts[host]
+
+def reset_breakers():
+    """Forget breaker state and latency history (benchmark scenarios, tests)"""
+    with _session_lock:
+        _hosts.clear()
+
+def _hedge_executor():
+    global _hedge_pool
+    if _hedge_pool is None:
+        with _session_lock:
+            if _hedge_pool is None:
+                _hedge_pool = ThreadPoolExecutor(max_workers=POOL_MAXSIZE, thread_name_prefix='hedge')
+    return _hedge_pool
+
+def _send(url, timeout, headers, health):
+    """One GET, raced against a hedged duplicate if it outlives the host's p95 latency.
+
+    Returns (response, start time of the request that answered), so a hedge
+    win feeds the latency window its own round trip, not the hedge delay too.
+    """
+    session = get_session()
+    delay = health.hedge_delay() if HEDGE_REQUESTS else None
+    if delay is None or delay >= timeout:
+        start = time.monotonic()
+        return session.get(url, timeout=timeout, headers=headers), start
+
+    executor = _hedge_executor()
+    started = {executor.submit(session.get, url, timeout=timeout, headers=headers): time.monotonic()}
+    done, _ = wait(started, timeout=delay)
+    if not done:
+        started[executor.submit(session.get, url, timeout=max(0.1, timeout - delay), headers=headers)] = time.monotonic()
+    pending, error = set(started), None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            try:
+                return future.result(), started[future]  # The slower request finishes in the background and is dropped
+            except requests.RequestException as e:
+                error = e
+    raise error
+
+def _retry_after(response):
+    """Seconds a 429/503 asks us to wait (delta-seconds or HTTP-date), or None"""
+    value = response.headers.get('Retry-After', '').strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def _get_with_retries(url, timeout, headers, health):
+    """GET with jittered exponential retries, never running past `timeout` in total.
+
+    A Retry-After on a 429/503 sets the minimum wait before the next attempt.
+    Returns (response, retries). Raises the last error once retries or the
+    time budget run out; a retryable status on the final attempt raises HTTPError.
+    """
+    deadline = time.monotonic() + timeout
+    for attempt in range(RETRY_ATTEMPTS):
+        remaining = deadline - time.monotonic()
+        retry_after = None
+        try:
+            response, start = _send(url, remaining, headers, health)
+            if response.status_code not in RETRY_STATUSES:
+                health.success(time.monotonic() - start)
+                return response, attempt
+            error = requests.HTTPError(f"{response.status_code} Server Error for url: {url}", response=response)
+            retry_after = _retry_after(response)
+        except requests.RequestException as e:
+            error = e
+        except BaseException:
+            health.failure()  # Anything else still settles a half-open trial, or the breaker never closes
+            raise
+        health.failure()
+
+        backoff = random.uniform(0, min(RETRY_CAP_S, RETRY_BASE_S * 2 ** attempt))
+        if retry_after is not None:
+            backoff = max(backoff, retry_after)
+        if attempt + 1 == RETRY_ATTEMPTS or time.monotonic() + backoff >= deadline - 0.1 or not health.allow():
+            error.retries = attempt
+            raise error
+        time.sleep(backoff)
+
+def _last_good(url, entry, reason, retries):
+    """Serve an expired cache entry in place of a failed request, tagging the stage as stale"""
+    cache = get_cache()
+    cache.served_stale(url)
+    record_request(len(entry['body']), 'stale', retries, stale={'reason': reason, 'age_s': cache.age(entry)})
+    return entry['body']
+
+def get_bytes(url, timeout):
+    """GET a URL through the response cache and return the raw body.
+
+    Fresh entries are served locally; stale ones are revalidated with
+    If-None-Match / If-Modified-Since so an unchanged payload costs a 304.
+    Transient failures are retried within `timeout`; if the host stays down
+    (or its circuit breaker is open) the last good cached body is served
+    instead, and the enclosing metrics stage is marked stale with its age.
+    """
+    cache = get_cache()
+    entry = cache.lookup(url)
+    if entry and cache.is_fresh(entry):
+        cache.hit(url)
+        record_request(len(entry['body']), 'hit')
+        return entry['body']
+
+    health = host_health(urlsplit(url).netloc)
+    if not health.allow():
+        if entry:
+            return _last_good(url, entry, 'circuit open', 0)
+        raise CircuitOpenError(f"Circuit open for {urlsplit(url).netloc}")
+
+    try:
+        response, retries = _get_with_retries(url, timeout, cache.conditional_headers(entry), health)
+    except requests.RequestException as e:
+        retries = getattr(e, 'retries', 0)
+        if entry:
+            return _last_good(url, entry, f"error: {type(e).__name__}", retries)
+        record_request(0, None, retries)
+        raise
+
+    if response.status_code == 304 and entry:
+        cache.revalidated(url, response)
+        record_request(len(entry['body']), 'revalidated', retries)
+        return entry['body']
+
+    response.raise_for_status()
+    cache.store(url, response)
+    record_request(len(response.content), 'miss', retries)
+    return response.content
+
+def get_json(url, timeout):
+    """GET a URL through the response cache and decode the JSON body"""
+    return json.loads(get_bytes(url, timeout))
@@ -0,0 +1,327 @@
+import argparse
+import csv
+import json
+import math
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+# --- CONFIGURATION ---
+POINTS_PATH = "inspections/points.sqlite"
+TILE_PX = 256            # Web-mercator tile size; world width at zoom z is TILE_PX * 2**z pixels
+CLUSTER_CELL_PX = 48     # Points closer than this on screen are merged into one marker
+CLUSTER_ZOOMS = range(8, 21)  # Zoom levels with precomputed clusters; deeper zooms cluster the few points in view live
+VIEWPORT_PX = (1200, 600)  # Map size assumed when the client cannot report its viewport
+VIEWPORT_PAD = 0.25        # Extra margin per side, so a small pan or the pitched horizon isn't empty
+
+PRIORITY_RANK = {'Low': 0, 'Med': 1, 'Medium': 1, 'High': 2}
+PRIORITY_NAMES = ['Low', 'Med', 'High']
+PRIORITY_COLORS = {'Low': [255, 215, 0], 'Med': [255, 165, 0], 'High': [230, 0, 0]}
+
+COLUMNS = ['key', 'site_id', 'lat', 'lon', 'kind', 'label', 'priority']
+CLUSTER_COLUMNS = COLUMNS + ['count']
+
+# Attributes live in `points`; the R*Tree holds each point's (degenerate) box under the same id.
+# R*Tree coordinates are 32-bit and rounded outward, so queries re-check the exact lat/lon, and they
+# CROSS JOIN so SQLite drives from the R*Tree instead of the site_id index.
+# `clusters` is the per-zoom pyramid rebuilt on every write, indexed by (zoom, lat, lon), so a
+# viewport read costs the number of markers in view no matter how many points the site has.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS points (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    site_id TEXT NOT NULL,
+    lat REAL NOT NULL,
+    lon REAL NOT NULL,
+    kind TEXT,
+    label TEXT NOT NULL,
+    priority TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS points_site ON points (site_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS points_rtree USING rtree(id, min_lat, max_lat, min_lon, max_lon);
+CREATE TABLE IF NOT EXISTS clusters (
+    id INTEGER PRIMARY KEY,
+    key TEXT,
+    site_id TEXT NOT NULL,
+    lat REAL NOT NULL,
+    lon REAL NOT NULL,
+    kind TEXT,
+    label TEXT NOT NULL,
+    priority TEXT NOT NULL,
+    count INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS clusters_site ON clusters (site_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS clusters_rtree USING rtree(id, min_zoom, max_zoom, min_lat, max_lat, min_lon, max_lon);
+"""
+
+def connect(path=POINTS_PATH):
+    """Open (and create if needed) the inspection point store"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    db = sqlite3.connect(path, timeout=30)
+    db.executescript(_SCHEMA)
+    return db
+
+def point_key(site_id, point):
+    """Stable identity for a point without its own id (manifest map labels)"""
+    return point.get('id') or f"{site_id}:{point['label']}@{float(point['lat']):.6f},{float(point['lon']):.6f}"
+
+def upsert(site_id, points, path=POINTS_PATH):
+    """Insert or update inspection points ({lat, lon, label, priority, kind?, id?}); returns the count written"""
+    now = time.time()
+    rows = [(point_key(site_id, p), site_id, float(p['lat']), float(p['lon']), p.get('kind'),
+             p['label'], p.get('priority') or 'Med', now) for p in points]
+    db = connect(path)
+    try:
+        with db:
+            for row in rows:
+                db.execute(
+                    "INSERT INTO points (key, site_id, lat, lon, kind, label, priority, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET site_id = excluded.site_id, lat = excluded.lat, lon = excluded.lon, "
+                    "kind = excluded.kind, label = excluded.label, priority = excluded.priority, updated_at = excluded.updated_at",
+                    row
+                )
+                (point_id,) = db.execute("SELECT id FROM points WHERE key = ?", (row[0],)).fetchone()
+                db.execute("INSERT OR REPLACE INTO points_rtree VALUES (?, ?, ?, ?, ?)",
+                           (point_id, row[2], row[2], row[3], row[3]))
+            _rebuild_clusters(db, site_id)
+    finally:
+        db.close()
+    return len(rows)
+
+def remove(keys, path=POINTS_PATH):
+    """Drop resolved points by key"""
+    db = connect(path)
+    try:
+        with db:
+            sites = set()
+            for key in keys:
+                sites.update(site for (site,) in db.execute("SELECT site_id FROM points WHERE key = ?", (key,)))
+                db.execute("DELETE FROM points_rtree WHERE id = (SELECT id FROM points WHERE key = ?)", (key,))
+                db.execute("DELETE FROM points WHERE key = ?", (key,))
+            for site_id in sites:
+                _rebuild_clusters(db, site_id)
+    finally:
+        db.close()
+
+def count(site_id=None, path=POINTS_PATH):
+    db = connect(path)
+    try:
+        if site_id is None:
+            return db.execute("SELECT COUNT(*) FROM points").fetchone()[0]
+        return db.execute("SELECT COUNT(*) FROM points WHERE site_id = ?", (site_id,)).fetchone()[0]
+    finally:
+        db.close()
+
+def _columns(rows, columns=COLUMNS):
+    """Columnar points: one NumPy array per field"""
+    values = list(zip(*rows)) if rows else [()] * len(columns)
+    points = {name: np.array(column, dtype=object) for name, column in zip(columns, values)}
+    points['lat'] = points['lat'].astype(float)
+    points['lon'] = points['lon'].astype(float)
+    if 'count' in points:
+        points['count'] = points['count'].astype(int)
+    return points
+
+def _rebuild_clusters(db, site_id):
+    """Recompute one site's cluster pyramid (inside the caller's write transaction)"""
+    db.execute("DELETE FROM clusters_rtree WHERE id IN (SELECT id FROM clusters WHERE site_id = ?)", (site_id,))
+    db.execute("DELETE FROM clusters WHERE site_id = ?", (site_id,))
+    points = _columns(db.execute(f"SELECT {', '.join(COLUMNS)} FROM points WHERE site_id = ?", (site_id,)).fetchall())
+    next_id = (db.execute("SELECT MAX(id) FROM clusters").fetchone()[0] or 0) + 1
+    for zoom in CLUSTER_ZOOMS:
+        clusters = cluster(points, zoom)
+        ids = range(next_id, next_id + len(clusters['lat']))
+        next_id += len(ids)
+        rows = list(zip(ids, *(clusters[name].tolist() for name in CLUSTER_COLUMNS)))
+        db.executemany(f"INSERT INTO clusters (id, {', '.join(CLUSTER_COLUMNS)}) VALUES ({', '.join('?' * (len(CLUSTER_COLUMNS) + 1))})", rows)
+        db.executemany("INSERT INTO clusters_rtree VALUES (?, ?, ?, ?, ?, ?, ?)",
+                       [(row[0], zoom, zoom, row[3], row[3], row[4], row[4]) for row in rows])
+
+def from_labels(site_id, labels):
+    """Columnar points from report/manifest map labels (the store's fallback source)"""
+    return _columns([(point_key(site_id, p), site_id, float(p['lat']), float(p['lon']), p.get('kind'),
+                      p['label'], p.get('priority') or 'Med') for p in labels])
+
+def query_bbox(south, west, north, east, site_id=None, path=POINTS_PATH):
+    """Points inside a lat/lon box, found through the R*Tree rather than a table scan"""
+    sql = (f"SELECT {', '.join('p.' + name for name in COLUMNS)} FROM points_rtree r CROSS JOIN points p ON p.id = r.id "
+           "WHERE r.max_lat >= ? AND r.min_lat <= ? AND r.max_lon >= ? AND r.min_lon <= ? "
+           "AND p.lat BETWEEN ? AND ? AND p.lon BETWEEN ? AND ?")
+    params = [south, north, west, east, south, north, west, east]
+    if site_id is not None:
+        sql += " AND p.site_id = ?"
+        params.append(site_id)
+    db = connect(path)
+    try:
+        return _columns(db.execute(sql, params).fetchall())
+    finally:
+        db.close()
+
+def query_clusters(south, west, north, east, zoom, site_id=None, path=POINTS_PATH):
+    """Precomputed clusters for an integer zoom level whose centroid lies inside a lat/lon box"""
+    sql = (f"SELECT {', '.join('c.' + name for name in CLUSTER_COLUMNS)} FROM clusters_rtree r CROSS JOIN clusters c ON c.id = r.id "
+           "WHERE r.min_zoom <= ? AND r.max_zoom >= ? AND r.max_lat >= ? AND r.min_lat <= ? AND r.max_lon >= ? AND r.min_lon <= ? "
+           "AND c.lat BETWEEN ? AND ? AND c.lon BETWEEN ? AND ?")
+    params = [zoom, zoom, south, north, west, east, south, north, west, east]
+    if site_id is not None:
+        sql += " AND c.site_id = ?"
+        params.append(site_id)
+    db = connect(path)
+    try:
+        return _columns(db.execute(sql, params).fetchall(), CLUSTER_COLUMNS)
+    finally:
+        db.close()
+
+def haversine_m(lat, lon, lats, lons):
+    """Great-circle distance in meters from one point to arrays of points"""
+    lat, lon, lats, lons = map(np.radians, (lat, lon, lats, lons))
+    a = np.sin((lats - lat) / 2) ** 2 + np.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+    return 2 * 6371000.0 * np.arcsin(np.sqrt(a))
+
+def query_radius(lat, lon, radius_m, site_id=None, path=POINTS_PATH):
+    """Points within `radius_m` of (lat, lon), nearest first, with a distance_m column"""
+    dlat = math.degrees(radius_m / 6371000.0)
+    dlon = dlat / max(math.cos(math.radians(lat)), 1e-6)
+    points = query_bbox(lat - dlat, lon - dlon, lat + dlat, lon + dlon, site_id, path)
+    distance = haversine_m(lat, lon, points['lat'], points['lon'])
+    inside = distance <= radius_m
+    points, distance = select(points, inside), distance[inside]
+    order = np.argsort(distance, kind='stable')
+    points = select(points, order)
+    points['distance_m'] = distance[order]
+    return points
+
+def select(points, index):
+    """Rows of columnar points by mask or index array"""
+    return {name: column[index] for name, column in points.items()}
+
+def filter_bbox(points, bbox):
+    """In-memory bbox filter for columnar points that did not come from the store"""
+    south, west, north, east = bbox
+    lat, lon = points['lat'], points['lon']
+    return select(points, (lat >= south) & (lat <= north) & (lon >= west) & (lon <= east))
+
+# ===== VIEWPORT & CLUSTERING =====
+def _to_pixels(lat, lon, zoom):
+    """Web-mercator world pixel coordinates at a zoom level"""
+    world = TILE_PX * 2.0 ** zoom
+    lat = np.clip(lat, -85.05112878, 85.05112878)
+    x = (np.asarray(lon) + 180.0) / 360.0 * world
+    y = (1 - np.log(np.tan(np.radians(lat)) + 1 / np.cos(np.radians(lat))) / math.pi) / 2 * world
+    return x, y
+
+def _to_lat_lon(x, y, zoom):
+    world = TILE_PX * 2.0 ** zoom
+    lon = x / world * 360.0 - 180.0
+    lat = np.degrees(np.arctan(np.sinh(math.pi * (1 - 2 * y / world))))
+    return lat, lon
+
+def viewport_bbox(lat, lon, zoom, size=VIEWPORT_PX, pad=VIEWPORT_PAD):
+    """(south, west, north, east) visible on a `size` pixel map centered on (lat, lon)"""
+    width, height = size
+    x, y = _to_pixels(lat, lon, zoom)
+    half_w, half_h = width * (0.5 + pad), height * (0.5 + pad)
+    north, west = _to_lat_lon(x - half_w, y - half_h, zoom)
+    south, east = _to_lat_lon(x + half_w, y + half_h, zoom)
+    return float(south), float(west), float(north), float(east)
+
+def cluster(points, zoom, cell_px=CLUSTER_CELL_PX):
+    """Merge points that share a `cell_px` screen cell at this zoom, in one vectorized pass.
+
+    Each cluster sits at its members' centroid, takes the highest member
+    priority and counts its members; single points keep their own label.
+    The output is bounded by the number of screen cells, not the number of points.
+    """
+    lat, lon = points['lat'], points['lon']
+    if len(lat) == 0:
+        return {**points, 'count': np.zeros(0, dtype=int)}
+
+    x, y = _to_pixels(lat, lon, zoom)
+    cells = (np.floor(x / cell_px).astype(np.int64) << 32) | np.floor(y / cell_px).astype(np.int64)
+    _, first, inverse, counts = np.unique(cells, return_index=True, return_inverse=True, return_counts=True)
+
+    rank = np.array([PRIORITY_RANK.get(p, 1) for p in points['priority']], dtype=int)
+    top = np.zeros(len(counts), dtype=int)
+    np.maximum.at(top, inverse, rank)
+    high = np.bincount(inverse, weights=rank == 2, minlength=len(counts)).astype(int)
+
+    labels = points['label'][first]
+    merged = counts > 1
+    labels[merged] = [f"{n} inspection points ({h} high)" if h else f"{n} inspection points"
+                      for n, h in zip(counts[merged], high[merged])]
+    keys = points['key'][first]
+    keys[merged] = None
+    return {
+        'key': keys,
+        'site_id': points['site_id'][first],
+        'lat': np.bincount(inverse, weights=lat) / counts,
+        'lon': np.bincount(inverse, weights=lon) / counts,
+        'kind': np.where(merged, None, points['kind'][first]),
+        'label': labels,
+        'priority': np.array(PRIORITY_NAMES, dtype=object)[top],
+        'count': counts,
+    }
+
+def viewport(lat, lon, zoom, site_id=None, size=VIEWPORT_PX, points=None, path=POINTS_PATH):
+    """Clustered points for the map viewport centered on (lat, lon); returns (clusters, points in view).
+
+    From the store, zooms inside CLUSTER_ZOOMS read the precomputed pyramid
+    (one level down for fractional zooms) and deeper zooms cluster the few
+    points in view on the fly. Columnar `points` (e.g. report map labels)
+    are filtered to the viewport and clustered in memory.
+    """
+    bbox = viewport_bbox(lat, lon, zoom, size)
+    if points is None and zoom < CLUSTER_ZOOMS[-1] + 1:
+        clusters = query_clusters(*bbox, max(int(zoom), CLUSTER_ZOOMS[0]), site_id=site_id, path=path)
+        return clusters, int(clusters['count'].sum())
+    visible = filter_bbox(points, bbox) if points is not None else query_bbox(*bbox, site_id=site_id, path=path)
+    return cluster(visible, zoom), len(visible['lat'])
+
+# ===== IMPORT =====
+def _read_points(path):
+    """Points from a JSON list / fleet manifest or a CSV with lat, lon, label, priority[, kind, id, site_id]"""
+    if path.endswith('.csv'):
+        with open(path, newline='') as f:
+            return list(csv.DictReader(f))
+    with open(path) as f:
+        data = json.load(f)
+    if isinstance(data, dict) and 'sites' in data:
+        return [{**point, 'site_id': site['id']} for site in data['sites'] for point in site.get('map_labels', [])]
+    return data
+
+def import_points(path, site_id=None, store=POINTS_PATH):
+    """Load a field log (or the fleet manifest's map labels) into the store"""
+    by_site = {}
+    for point in _read_points(path):
+        by_site.setdefault(point.get('site_id') or site_id, []).append(point)
+    if None in by_site:
+        raise ValueError(f"{len(by_site[None])} points in {path} have no site_id; pass --site")
+    return sum(upsert(site, points, store) for site, points in by_site.items())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspection point store: import field logs and query by area")
+    parser.add_argument('--store', default=POINTS_PATH)
+    commands = parser.add_subparsers(dest='command', required=True)
+    load = commands.add_parser('import', help="Import a CSV/JSON point log or a fleet manifest (sites.json)")
+    load.add_argument('path')
+    load.add_argument('--site', help="Site id for rows without one")
+    near = commands.add_parser('near', help="Points within a radius of a location")
+    near.add_argument('lat', type=float)
+    near.add_argument('lon', type=float)
+    near.add_argument('--radius-m', type=float, default=250.0)
+    near.add_argument('--site')
+    args = parser.parse_args()
+
+    if args.command == 'import':
+        written = import_points(args.path, args.site, args.store)
+        print(f"✅ {written} inspection points imported ({count(path=args.store)} in store)")
+    else:
+        found = query_radius(args.lat, args.lon, args.radius_m, args.site, args.store)
+        print(f"📍 {len(found['lat'])} points within {args.radius_m:g} m")
+        for label, priority, distance in zip(found['label'], found['priority'], found['distance_m']):
+            print(f"   {distance:>7.1f} m  [{priority}] {label}")
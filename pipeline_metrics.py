@@ -0,0 +1,186 @@
+import argparse
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# --- CONFIGURATION ---
+METRICS_DIR = "metrics"
+PROM_PATH = os.path.join(METRICS_DIR, "briefing.prom")         # node_exporter textfile collector
+LOG_PATH = os.path.join(METRICS_DIR, "pipeline_metrics.jsonl")  # one line per site per run
+
+# When a stage makes several requests, report the most expensive cache outcome
+_CACHE_RANK = {None: 0, 'hit': 1, 'revalidated': 2, 'miss': 3, 'stale': 4}
+
+_local = threading.local()
+
+class MetricsRecorder:
+    """Per-run stage timings plus request details (bytes, retries, cache status, fallbacks).
+
+    Thread-safe: fetch stages run in worker threads, and HTTP calls made
+    inside a stage attach their details to it through record_request().
+    """
+
+    def __init__(self, site=None):
+        self.site = site
+        self.started = datetime.now(timezone.utc)
+        self._lock = threading.Lock()
+        self._stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        record = {
+            'stage': name, 'latency_ms': None, 'requests': 0, 'payload_bytes': 0,
+            'retries': 0, 'cache_status': None, 'fallback_used': False, 'error': None,
+        }
+        with self._lock:
+            self._stages[name] = record
+        previous = getattr(_local, 'record', None)
+        _local.record = record
+        start = time.perf_counter()
+        try:
+            yield record
+        except Exception as e:
+            record['error'] = type(e).__name__
+            raise
+        finally:
+            _local.record = previous
+            elapsed = round((time.perf_counter() - start) * 1000, 3)
+            with self._lock:
+                # A stage already closed out (e.g. missed the fetch deadline) keeps its recorded latency
+                if record['latency_ms'] is None:
+                    record['latency_ms'] = elapsed
+
+    def update(self, name, **fields):
+        with self._lock:
+            record = self._stages.setdefault(name, {'stage': name, 'latency_ms': None, 'requests': 0, 'payload_bytes': 0,
+                                                    'retries': 0, 'cache_status': None, 'fallback_used': False, 'error': None})
+            record.update(fields)
+
+    def add(self, records):
+        """Adopt stage records measured elsewhere (e.g. the shared fleet fetch stage)"""
+        with self._lock:
+            for record in records:
+                self._stages[record['stage']] = dict(record)
+
+    def stages(self, prefix=''):
+        with self._lock:
+            return [dict(record) for name, record in self._stages.items() if name.startswith(prefix)]
+
+    def snapshot(self):
+        """The report's pipeline_metrics block"""
+        stages = self.stages()
+        return {
+            'run_started': self.started.isoformat(),
+            'total_ms': round(sum(stage['latency_ms'] or 0 for stage in stages), 3),
+            'fallbacks_used': sum(stage['fallback_used'] for stage in stages),
+            'stages': stages,
+        }
+
+def record_request(payload_bytes, cache_status, retries=0, stale=None):
+    """Attach one HTTP request's details to the stage running on this thread, if any.
+
+    `stale` ({'reason', 'age_s'}) marks a last-known-good body served in place of a failed request.
+    """
+    record = getattr(_local, 'record', None)
+    if record is None:
+        return
+    if stale is not None:
+        record['stale'] = stale
+    record['requests'] += 1
+    record['payload_bytes'] += payload_bytes
+    record['retries'] += retries
+    if _CACHE_RANK[cache_status] > _CACHE_RANK[record['cache_status']]:
+        record['cache_status'] = cache_status
+
+def append_log(recorders, path=LOG_PATH):
+    """Append one JSON line per recorder (site) to the metrics log"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'a') as f:
+        for recorder in recorders:
+            f.write(json.dumps({'site': recorder.site, **recorder.snapshot()}, separators=(',', ':')) + '\n')
+
+def write_prometheus(recorders, path=PROM_PATH):
+    """Write the latest run as a Prometheus textfile (temp file + rename, so scrapes never see half a file)"""
+    metrics = {
+        'briefing_stage_duration_seconds': ('gauge', 'Wall time of the last run of each pipeline stage'),
+        'briefing_stage_payload_bytes': ('gauge', 'Response bytes read by the stage in the last run'),
+        'briefing_stage_retries': ('gauge', 'HTTP retries made by the stage in the last run'),
+        'briefing_stage_fallback': ('gauge', '1 if the stage served default/fallback values in the last run'),
+        'briefing_stage_cache_status': ('gauge', 'HTTP cache outcome of the stage in the last run (label status)'),
+    }
+    lines = []
+    for metric, (kind, help_text) in metrics.items():
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} {kind}")
+        for recorder in recorders:
+            for stage in recorder.stages():
+                labels = f'site="{recorder.site or ""}",stage="{stage["stage"]}"'
+                if metric == 'briefing_stage_duration_seconds':
+                    value = (stage['latency_ms'] or 0) / 1000
+                elif metric == 'briefing_stage_payload_bytes':
+                    value = stage['payload_bytes']
+                elif metric == 'briefing_stage_retries':
+                    value = stage['retries']
+                elif metric == 'briefing_stage_fallback':
+                    value = int(stage['fallback_used'])
+                else:
+                    if stage['cache_status'] is None:
+                        continue
+                    labels += f',status="{stage["cache_status"]}"'
+                    value = 1
+                lines.append(f"{metric}{{{labels}}} {value:g}")
+    lines.append("# HELP briefing_last_run_timestamp_seconds Unix time the last briefing run finished")
+    lines.append("# TYPE briefing_last_run_timestamp_seconds gauge")
+    lines.append(f"briefing_last_run_timestamp_seconds {time.time():.3f}")
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+    os.replace(tmp, path)
+
+def export(recorders, prom_path=PROM_PATH, log_path=LOG_PATH):
+    """Write the Prometheus textfile and append to the JSON-lines log"""
+    write_prometheus(recorders, prom_path)
+    append_log(recorders, log_path)
+
+def summarize(path=LOG_PATH, site=None):
+    """p50/p95 latency and fallback rate per stage across the metrics log.
+
+    Fleet fetch stages are keyed by grid/station (fetch.forecast:GSP/49,68);
+    they are pooled per source kind (fetch.forecast).
+    """
+    samples = {}
+    with open(path) as f:
+        for line in f:
+            run = json.loads(line)
+            if site and run['site'] != site:
+                continue
+            for stage in run['stages']:
+                entry = samples.setdefault(stage['stage'].split(':')[0], {'latency': [], 'fallbacks': 0})
+                entry['latency'].append(stage['latency_ms'] or 0)
+                entry['fallbacks'] += stage['fallback_used']
+
+    summary = {}
+    for name, entry in sorted(samples.items()):
+        latency = sorted(entry['latency'])
+        summary[name] = {
+            'runs': len(latency),
+            'p50_ms': latency[len(latency) // 2],
+            'p95_ms': latency[min(len(latency) - 1, int(len(latency) * 0.95))],
+            'fallback_rate': round(entry['fallbacks'] / len(latency), 3),
+        }
+    return summary
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize per-stage latency from the pipeline metrics log")
+    parser.add_argument('log', nargs='?', default=LOG_PATH)
+    parser.add_argument('--site')
+    args = parser.parse_args()
+
+    print(f"{'stage':<36} {'runs':>6} {'p50 ms':>10} {'p95 ms':>10} {'fallback':>9}")
+    for name, stats in summarize(args.log, args.site).items():
+        print(f"{name:<36} {stats['runs']:>6} {stats['p50_ms']:>10.1f} {stats['p95_ms']:>10.1f} {stats['fallback_rate']:>9.1%}")
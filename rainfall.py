@@ -0,0 +1,95 @@
+import io
+import json
+from array import array
+from datetime import datetime, timezone
+
+import numpy as np
+
+try:
+    import ijson
+except ImportError:  # Streaming is an optimization; fall back to a full json parse
+    ijson = None
+
+# --- CONFIGURATION ---
+RAIN_WINDOWS_H = (1, 6, 24, 48, 72)
+NWIS_PERIOD = "P3D"  # Long enough to cover the widest rolling window
+
+_SERIES = 'value.timeSeries.item'
+_SITE_CODE = _SERIES + '.sourceInfo.siteCode.item.value'
+_NO_DATA = _SERIES + '.variable.noDataValue'
+_SAMPLE = _SERIES + '.values.item.value.item'
+
+def parse_nwis_series(payload):
+    """Parse an NWIS instantaneous-values JSON payload into per-site numeric series.
+
+    `payload` is bytes or a binary file object. With ijson available the
+    document is streamed event by event, so long periods and many gauges never
+    exist as one nested dict. Returns {site: (times, values)} where times are
+    epoch seconds and values are inches per reporting interval, both float64
+    NumPy arrays sorted by time.
+    """
+    if isinstance(payload, (bytes, bytearray)):
+        payload = io.BytesIO(payload)
+
+    series = {}
+    if ijson is None:
+        for item in json.load(payload).get('value', {}).get('timeSeries', []):
+            site = item['sourceInfo']['siteCode'][0]['value']
+            no_data = item.get('variable', {}).get('noDataValue')
+            times, values = series.setdefault(site, (array('d'), array('d')))
+            for sample in item['values'][0]['value']:
+                _append_sample(times, values, sample['dateTime'], sample['value'], no_data)
+        return _finish(series)
+
+    no_data, stamp, sample, times, values = None, None, None, None, None
+    for prefix, event, value in ijson.parse(payload):
+        if prefix == _SITE_CODE:
+            times, values = series.setdefault(value, (array('d'), array('d')))
+        elif prefix == _NO_DATA:
+            no_data = value
+        elif prefix == _SAMPLE + '.dateTime':
+            stamp = value
+        elif prefix == _SAMPLE + '.value':
+            sample = value
+        elif prefix == _SAMPLE and event == 'end_map':
+            # NWIS emits "value" before "dateTime", so append once the sample closes
+            if times is not None and sample is not None and stamp is not None:
+                _append_sample(times, values, stamp, sample, no_data)
+            stamp, sample = None, None
+        elif prefix == _SERIES and event == 'end_map':
+            no_data, times, values = None, None, None
+    return _finish(series)
+
+def _append_sample(times, values, stamp, value, no_data):
+    value = float(value)
+    if value < 0 or (no_data is not None and value == float(no_data)):
+        return
+    times.append(datetime.fromisoformat(stamp).timestamp())
+    values.append(value)
+
+def _finish(series):
+    parsed = {}
+    for site, (times, values) in series.items():
+        t = np.frombuffer(times, dtype=np.float64)
+        v = np.frombuffer(values, dtype=np.float64)
+        order = np.argsort(t, kind='stable')
+        parsed[site] = (t[order], v[order])
+    return parsed
+
+def window_totals(times, values, windows_h=RAIN_WINDOWS_H, end=None):
+    """Rainfall totals for each trailing window ending at `end` (default: now, UTC).
+
+    Returns {'1h': inches, '6h': ..., ...} rounded to the gauge's 0.01 in resolution.
+    """
+    if end is None:
+        end = datetime.now(timezone.utc).timestamp()
+    windows = np.asarray(windows_h, dtype=np.float64)
+    csum = np.concatenate(([0.0], np.cumsum(values)))
+    stop = np.searchsorted(times, end, side='right')
+    start = np.searchsorted(times, end - windows * 3600.0, side='right')
+    totals = csum[stop] - csum[start]
+    return {f"{int(w)}h": round(float(total), 2) for w, total in zip(windows_h, totals)}
+
+def empty_totals(windows_h=RAIN_WINDOWS_H):
+    """Totals for a gauge with no reading: None in every window, so rules see missing data, not a dry day"""
+    return {f"{int(w)}h": None for w in windows_h}
@@ -0,0 +1,349 @@
+import argparse
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+
+import activity_rules
+import soil_moisture
+from activity_rules import ACTIVITY_RULES, HOURLY_WINDOW_RULES, STATUSES, resolve_thresholds
+from evaporation import evaporation_rate
+from fleet import load_manifest
+from gridpoint import parse_gridpoint
+from rainfall import parse_nwis_series
+from update_report import parse_observation
+from work_windows import runs
+
+# --- CONFIGURATION ---
+# Archive layout, one directory per site id; every file name starts with the
+# month (YYYY-MM) it covers, so a replay task only opens its own month and the
+# neighbours its rolling windows and soil moisture spin-up reach into:
+#   archive/<site>/nwis/YYYY-MM*.json           NWIS /iv payloads (parameter 00045)
+#   archive/<site>/observations/YYYY-MM*.jsonl  one /stations/{id}/observations feature per line
+#   archive/<site>/gridpoint/YYYY-MM*.jsonl     one raw /gridpoints/{office}/{x},{y} payload per line
+ARCHIVE_DIR = "archive"
+BACKTEST_PATH = "backtest.json"
+KINDS = ('nwis', 'observations', 'gridpoint')
+REPLAY_WORKERS = os.cpu_count() or 1
+
+OBS_MAX_AGE_H = 2          # An older observation counts as missing, as a dead station would live
+SNAPSHOT_MAX_AGE_H = 12    # Likewise for gridpoint forecast snapshots
+RAIN_WINDOW_H = 24
+UPCOMING_H = 72            # The briefing's "next 3 days" for upcoming_rain_prob
+SPINUP_H = 21 * 24         # Soil moisture is run this long before the month so it starts from real weather
+DECISION_HOUR_UTC = 13     # The daily briefing runs at 13:30 UTC; day-level calls are read at this hour
+WASHOUT_IN = 0.25          # Observed rain in the 24h after a call that washes out the day's work
+
+_MONTH = re.compile(r'^(\d{4}-\d{2})')
+
+# ===== ARCHIVE =====
+def month_bounds(month):
+    """'2024-05' -> (start, end) epoch seconds, UTC"""
+    start = datetime.strptime(month, '%Y-%m').replace(tzinfo=timezone.utc)
+    end = start.replace(year=start.year + start.month // 12, month=start.month % 12 + 1)
+    return start.timestamp(), end.timestamp()
+
+def shift_month(month, delta):
+    year, index = divmod(int(month[:4]) * 12 + int(month[5:7]) - 1 + delta, 12)
+    return f"{year:04d}-{index + 1:02d}"
+
+def archived_months(site_id, archive_dir=ARCHIVE_DIR):
+    """Months with any archived file for a site"""
+    months = set()
+    for kind in KINDS:
+        directory = os.path.join(archive_dir, site_id, kind)
+        if os.path.isdir(directory):
+            months.update(match.group(1) for match in map(_MONTH.match, os.listdir(directory)) if match)
+    return sorted(months)
+
+def archive_files(site_id, kind, months, archive_dir=ARCHIVE_DIR):
+    """Archived files of one kind for the given months, in name order"""
+    directory = os.path.join(archive_dir, site_id, kind)
+    if not os.path.isdir(directory):
+        return []
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory) if name[:7] in months)
+
+def _json_lines(path):
+    with open(path, 'rb') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+# ===== INPUT RECONSTRUCTION =====
+def load_rain(files, gauge, start, end):
+    """(times, inches) gauge samples in (start, end], parsed one file at a time"""
+    times, values = [np.empty(0)], [np.empty(0)]
+    for path in files:
+        with open(path, 'rb') as f:
+            series = parse_nwis_series(f)
+        if gauge in series:
+            t, v = series[gauge]
+            keep = (t > start) & (t <= end)
+            times.append(t[keep])
+            values.append(v[keep])
+    times, values = np.concatenate(times), np.concatenate(values)
+    times, first = np.unique(times, return_index=True)  # Overlapping downloads repeat samples
+    return times, values[first]
+
+def trailing_totals(times, values, ends, window_h):
+    """Rain in (end - window, end] for every end, plus the sample count behind each total"""
+    csum = np.concatenate(([0.0], np.cumsum(values)))
+    stop = np.searchsorted(times, ends, side='right')
+    start = np.searchsorted(times, ends - window_h * 3600.0, side='right')
+    return np.round(csum[stop] - csum[start], 2), stop - start
+
+def load_observations(files, start, end):
+    """(times, {'temp_f', 'wind_mph', 'humidity'}) observations in (start, end], converted as the briefing converts them"""
+    rows = []
+    for path in files:
+        for feature in _json_lines(path):
+            props = feature.get('properties', feature)
+            stamp = datetime.fromisoformat(props['timestamp']).timestamp()
+            if start < stamp <= end:
+                weather = parse_observation(props)
+                rows.append((stamp, weather['temp_f'], weather['wind_speed_mph'], weather['humidity']))
+    table = np.array(rows, dtype=np.float64).reshape(-1, 4)  # None -> NaN
+    table = table[np.argsort(table[:, 0], kind='stable')]
+    return table[:, 0], {'temp_f': table[:, 1], 'wind_mph': table[:, 2], 'humidity': table[:, 3]}
+
+def latest_at(times, columns, hours, max_age_h):
+    """Each column as it stood at every hour (last value at or before it), NaN where older than max_age_h"""
+    index = np.searchsorted(times, hours, side='right') - 1
+    fresh = index >= 0
+    fresh[fresh] = hours[fresh] - times[index[fresh]] <= max_age_h * 3600
+    sampled = {name: np.full(len(hours), np.nan) for name in columns}
+    for name, values in columns.items():
+        sampled[name][fresh] = values[index[fresh]]
+    return sampled, fresh
+
+def snapshot_fields(payload, start):
+    """Rule inputs a gridpoint snapshot gives for the hours after `start`, one row per hour of validity"""
+    horizon = SNAPSHOT_MAX_AGE_H + 1
+    grid = parse_gridpoint(payload, hours=horizon + UPCOMING_H, start=start)
+
+    def ahead(values, hours):
+        return np.lib.stride_tricks.sliding_window_view(values, hours)[:horizon]
+
+    qpf = ahead(grid['qpf_in'], RAIN_WINDOW_H)
+    rain = np.where(np.isnan(qpf).all(axis=1), np.nan, np.round(np.nansum(qpf, axis=1), 2))
+    return {
+        'forecast_rain_24h': rain,
+        'gust_mph': np.round(np.fmax.reduce(ahead(grid['gust_mph'], RAIN_WINDOW_H), axis=1), 1),
+        # The briefing takes the daily forecast's max PoP over the next 3 days, a missing day's PoP as 0
+        'upcoming_rain_prob': np.nan_to_num(np.fmax.reduce(ahead(grid['pop'], UPCOMING_H), axis=1)),
+        'pop': grid['pop'][:horizon],
+    }
+
+def load_forecasts(files, hours):
+    """Forecast rule inputs at every hour from the freshest snapshot issued at or before it.
+
+    Snapshots are streamed one line at a time and may arrive in any order;
+    each one overwrites only the hours it is the newest issue for.
+    """
+    issued = np.full(len(hours), -np.inf)
+    # Hours no snapshot covers stay NaN, like a briefing with no forecast: the rules see missing data
+    fields = {name: np.full(len(hours), np.nan) for name in ('forecast_rain_24h', 'gust_mph', 'upcoming_rain_prob', 'pop')}
+    for path in files:
+        for payload in _json_lines(path):
+            issue = datetime.fromisoformat(payload['properties']['updateTime']).timestamp()
+            first = np.searchsorted(hours, issue, side='left')
+            last = np.searchsorted(hours, issue + SNAPSHOT_MAX_AGE_H * 3600, side='right')
+            index = np.arange(first, last)
+            index = index[issued[index] <= issue]
+            if not len(index):
+                continue
+            start = hours[index[0]]
+            snapshot = snapshot_fields(payload, start)
+            offset = ((hours[index] - start) // 3600).astype(np.int64)
+            for name, values in snapshot.items():
+                fields[name][index] = values[offset]
+            issued[index] = issue
+    return fields, np.isfinite(issued)
+
+# ===== REPLAY =====
+def rule_labels(spec):
+    """Readable label per rule index of an activity, plus the -1 / -2 outcomes"""
+    labels = {-2: 'missing data', -1: 'no rule (GO)'}
+    for index, rule in enumerate(spec['rules']):
+        labels[index] = f"{rule['status']} " + ' & '.join(f"{field} {op} {threshold}" for field, op, threshold in rule['when'])
+    return labels
+
+def replay_month(task):
+    """Rebuild one site-month of hourly rule inputs from the archive and tally the calls.
+
+    Returns plain nested counters (see merge()); every hour of the month is
+    replayed in one vectorized evaluate() pass, so a task's memory is bounded
+    by one month of archive for one site.
+    """
+    site, month, archive_dir, thresholds = task
+    start, end = month_bounds(month)
+    hours = np.arange(start, end, 3600.0)
+    previous, following = shift_month(month, -1), shift_month(month, 1)
+
+    spinup = np.arange(start - SPINUP_H * 3600, start, 3600.0)
+    rain_times, rain_values = load_rain(archive_files(site['id'], 'nwis', {previous, month, following}, archive_dir),
+                                        site['usgs_site'], spinup[0] - 3600, end + RAIN_WINDOW_H * 3600)
+    rain_24h, gauge_samples = trailing_totals(rain_times, rain_values, hours, RAIN_WINDOW_H)
+    rain_after, _ = trailing_totals(rain_times, rain_values, hours + RAIN_WINDOW_H * 3600, RAIN_WINDOW_H)
+    obs_times, obs_columns = load_observations(archive_files(site['id'], 'observations', {previous, month}, archive_dir),
+                                               spinup[0] - OBS_MAX_AGE_H * 3600, end)
+    observed, observed_fresh = latest_at(obs_times, obs_columns, hours, OBS_MAX_AGE_H)
+    forecast, forecast_fresh = load_forecasts(archive_files(site['id'], 'gridpoint', {previous, month}, archive_dir), hours)
+
+    # Soil moisture carries over from earlier months; rebuild it hour by hour from a spin-up period instead
+    modelled = np.concatenate((spinup, hours)) + 3600  # State at the end of each hour
+    hourly_rain, _ = trailing_totals(rain_times, rain_values, modelled, 1)
+    weather, _ = latest_at(obs_times, obs_columns, modelled, OBS_MAX_AGE_H)
+    drying = soil_moisture.potential_evaporation(weather['temp_f'], weather['humidity'], weather['wind_mph'])
+    soil = soil_moisture.percent(soil_moisture.simulate(soil_moisture.SEED_IN, hourly_rain, drying)[len(spinup) - 1:-1])
+
+    covered = observed_fresh | forecast_fresh | (gauge_samples > 0)
+    concrete_temp = observed['temp_f'] if site.get('concrete_temp_f') is None else site['concrete_temp_f']
+    evap = np.round(evaporation_rate(observed['temp_f'], concrete_temp, observed['humidity'], observed['wind_mph']), 3)
+    conditions = {
+        'rain_24h': rain_24h,
+        'soil_moisture': soil,
+        'evap_rate': evap,
+        'temp_f': observed['temp_f'],
+        'humidity': observed['humidity'],
+        'wind_mph': observed['wind_mph'],
+        'upcoming_rain_prob': forecast['upcoming_rain_prob'],
+        'forecast_rain_24h': forecast['forecast_rain_24h'],
+        'gust_mph': forecast['gust_mph'],
+    }
+    matched = activity_rules.evaluate({name: values[covered] for name, values in conditions.items()}, thresholds)
+    codes = activity_rules.matched_status_codes(matched)
+
+    decision = (hours[covered] // 3600 % 24) == DECISION_HOUR_UTC
+    washout = rain_after[covered][decision] >= WASHOUT_IN
+    stats = {
+        'site_months': 1,
+        'hours': int(covered.sum()),
+        'hours_uncovered': int((~covered).sum()),
+        'days': int(decision.sum()),
+        'washout_days': int(washout.sum()),
+        'activities': {},
+        'work_windows': {},
+        'sites': {site['id']: {}},
+    }
+    for activity, spec in ACTIVITY_RULES.items():
+        code, rule = codes[activity], matched[activity]
+        day_code, day_rule = code[decision], rule[decision]
+        hits = np.bincount(rule + 2, minlength=len(spec['rules']) + 2)
+        stats['activities'][activity] = {
+            'status_hours': {name: int((code == i).sum()) for i, name in enumerate(STATUSES)},
+            'status_days': {name: int((day_code == i).sum()) for i, name in enumerate(STATUSES)},
+            'go_before_washout': int(((day_code == 0) & washout).sum()),
+            'rules': {label: {'hours': int(hits[index + 2]),
+                              'days': int((day_rule == index).sum()),
+                              'dry_days': int(((day_rule == index) & ~washout).sum())}
+                      for index, label in rule_labels(spec).items()},
+        }
+        stats['sites'][site['id']][activity] = stats['activities'][activity]['status_hours']
+
+    # Hours that met each activity's hourly window criteria as they turned out (observed weather, forecast PoP)
+    fields = {'temp_f': observed['temp_f'], 'humidity': observed['humidity'], 'wind_mph': observed['wind_mph'],
+              'pop': forecast['pop']}
+    for activity, spec in HOURLY_WINDOW_RULES.items():
+        feasible = activity_rules.match(spec['when'], fields, thresholds) & covered
+        starts, stops = runs(feasible, np.ones(len(hours), dtype=bool))
+        usable = (stops - starts) >= int(thresholds[spec['min_hours']])
+        stats['work_windows'][activity] = {
+            'feasible_hours': int(feasible.sum()),
+            'blocks': int(usable.sum()),
+            'block_hours': int((stops - starts)[usable].sum()),
+        }
+    return stats
+
+def merge(total, part):
+    """Add one task's counters into the running totals"""
+    for key, value in part.items():
+        if isinstance(value, dict):
+            merge(total.setdefault(key, {}), value)
+        else:
+            total[key] = total.get(key, 0) + value
+    return total
+
+def plan_tasks(sites, archive_dir=ARCHIVE_DIR, first=None, last=None, overrides=None):
+    """One (site, month, archive, thresholds) task per archived site-month in range"""
+    tasks = []
+    for site in sites:
+        thresholds = resolve_thresholds({**(site.get('thresholds') or {}), **(overrides or {})})
+        for month in archived_months(site['id'], archive_dir):
+            if (first is None or month >= first) and (last is None or month <= last):
+                tasks.append((site, month, archive_dir, thresholds))
+    return tasks
+
+def replay(sites, archive_dir=ARCHIVE_DIR, first=None, last=None, overrides=None, workers=REPLAY_WORKERS):
+    """Replay every archived site-month across a process pool and return the merged statistics.
+
+    Tasks share nothing and return only counters, so throughput grows with
+    workers until the disk saturates, and the parent holds one set of totals
+    no matter how long the archive is.
+    """
+    tasks = plan_tasks(sites, archive_dir, first, last, overrides)
+    totals = {}
+    if workers <= 1:
+        for task in tasks:
+            merge(totals, replay_month(task))
+        return totals
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for stats in executor.map(replay_month, tasks):
+            merge(totals, stats)
+    return totals
+
+def print_summary(totals):
+    print(f"\n📼 Replayed {totals.get('site_months', 0)} site-months: {totals.get('hours', 0)} hours "
+          f"({totals.get('hours_uncovered', 0)} without data), {totals.get('days', 0)} daily calls, "
+          f"{totals.get('washout_days', 0)} washouts")
+    for activity, stats in totals.get('activities', {}).items():
+        hours = sum(stats['status_hours'].values()) or 1
+        split = ' | '.join(f"{name} {count / hours:.0%}" for name, count in stats['status_hours'].items())
+        print(f"   - {activity}: {split} of hours; {stats['go_before_washout']} GO calls before a washout")
+        costly = sorted(((rule['dry_days'], label) for label, rule in stats['rules'].items()
+                         if not label.startswith(('GO', 'no rule')) and rule['dry_days']), reverse=True)
+        for dry_days, label in costly[:3]:
+            print(f"       {dry_days:>4} dry days held back by {label}")
+
+# ===== MAIN EXECUTION =====
+def _override(text):
+    key, _, value = text.partition('=')
+    return key, float(value)
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay archived weather through the activity rules")
+    parser.add_argument('--manifest', default='sites.json', help="Site manifest (JSON)")
+    parser.add_argument('--archive', default=ARCHIVE_DIR, help="Archive root (see the layout in replay.py)")
+    parser.add_argument('--out', default=BACKTEST_PATH, help="Statistics output (JSON)")
+    parser.add_argument('--site', action='append', help="Only these site ids (repeatable)")
+    parser.add_argument('--from', dest='first', metavar='YYYY-MM', help="First month to replay")
+    parser.add_argument('--to', dest='last', metavar='YYYY-MM', help="Last month to replay")
+    parser.add_argument('--set', dest='overrides', action='append', type=_override, default=[], metavar='THRESHOLD=VALUE',
+                        help="Try a threshold value for every site (repeatable)")
+    parser.add_argument('--workers', type=int, default=REPLAY_WORKERS)
+    args = parser.parse_args()
+
+    sites = [site for site in load_manifest(args.manifest) if not args.site or site['id'] in args.site]
+    overrides = dict(args.overrides)
+    print(f"🔄 Replaying {len(sites)} sites from {args.archive}/ on {args.workers} workers...")
+    totals = replay(sites, args.archive, args.first, args.last, overrides, args.workers)
+    print_summary(totals)
+
+    document = {
+        'generated': datetime.now(timezone.utc).isoformat(),
+        'archive': args.archive,
+        'months': [args.first, args.last],
+        'threshold_overrides': overrides,
+        'decision_hour_utc': DECISION_HOUR_UTC,
+        'washout_in': WASHOUT_IN,
+        **totals,
+    }
+    with open(args.out, 'w') as f:
+        json.dump(document, f, indent=2)
+    print(f"\n✅ Backtest statistics written to {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+import hashlib
+import os
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import msgspec
+
+# --- CONFIGURATION ---
+# Bump on any change to the structs below (and add a step to MIGRATIONS). Readers
+# migrate reports of older versions and refuse newer ones rather than misread them.
+SCHEMA_VERSION = 4
+COMPACT_SUFFIX = '.msgpack'
+LEGACY_SITE_ID = 'south-blvd'  # Reports before v1 were only ever written for the one original site
+
+# Report fields behind each briefing section. The dashboard and the static
+# briefing redraw a section only when the digest of its own fields changes.
+SECTIONS = {
+    'alerts': ('active_alerts',),
+    'conditions': ('current_conditions', 'rainfall_accumulation', 'soil_moisture', 'data_freshness', 'last_updated'),
+    'recommendations': ('activity_recommendations',),
+    'evaporation': ('concrete_ops',),
+    'forecast': ('forecast_7day', 'forecast_quantities'),
+    'windows': ('optimal_work_windows', 'hourly_work_windows'),
+    'map': ('site_info', 'swppp_compliance'),
+}
+
+class SchemaError(ValueError):
+    """A report does not match this schema (version mismatch or drifted fields)"""
+
+class Record(msgspec.Struct, kw_only=True, forbid_unknown_fields=True, omit_defaults=True):
+    """Base for report records: unknown fields are an error, so writer/reader drift fails loudly"""
+
+# ===== SITE & CONDITIONS =====
+class Location(Record):
+    lat: float
+    lon: float
+
+class SiteInfo(Record):
+    id: str
+    name: str
+    gauge: str
+    location: Location
+
+class Conditions(Record):
+    temperature_f: Optional[float]
+    temperature_c: Optional[float]
+    wind_speed_mph: Optional[float]
+    wind_direction: str
+    humidity_percent: Optional[int]
+    conditions: str
+    precipitation_24h: Optional[float]
+
+class ForecastDay(Record):
+    day: str
+    date: str
+    high: Optional[int]
+    low: Optional[int]
+    precipitation_prob: Optional[int]
+    wind_speed: str
+    wind_direction: str
+    short_forecast: str
+    detailed_forecast: str
+
+class ForecastQuantities(Record):
+    rain_in: Dict[str, Optional[float]]
+    peak_gust_mph: Optional[float]
+    peak_gust_time: Optional[str]
+
+class Alert(Record):
+    event: str
+    severity: str
+    urgency: str
+    headline: Optional[str]
+    description: Optional[str]
+    instruction: Optional[str]
+    onset: Optional[str]
+    expires: Optional[str]
+
+class SoilState(Record):
+    ts: float
+    storage_in: float
+    rain_through: Optional[float]
+
+class SoilMoisture(Record):
+    level: str
+    status: str
+    last_rain_inches: Optional[float]
+    percent: float
+    state: SoilState
+
+# ===== CONCRETE & ACTIVITIES =====
+class EvapProjection(Record):
+    start: List[str]
+    evap_kg_m2_h: List[Optional[float]]
+    level: List[int]
+    hours_above_0_5: int
+    hours_above_1_0: int
+    peak_kg_m2_h: Optional[float]
+    peak_time: Optional[str]
+
+class ConcreteOps(Record):
+    pour_status: str
+    evap_rate_kg_m2_h: Optional[float]
+    evap_status: str
+    concrete_temp_f: Optional[float]
+    evap_projection: EvapProjection
+    notes: List[str]
+
+class Recommendation(Record):
+    status: str
+    notes: List[str]
+
+class Recommendations(Record):
+    concrete_pouring: Recommendation
+    grading_excavation: Recommendation
+    asphalt_paving: Recommendation
+    painting_coating: Recommendation
+    crane_ops: Recommendation
+    general_safety: List[str]
+
+class HourlyWindow(Record):
+    start: str
+    end: str
+    hours: int
+    score: float
+    best_start: str
+    best_end: str
+
+class MapLabel(Record):
+    lat: float
+    lon: float
+    label: str
+    priority: str
+    color: Optional[List[int]] = None
+
+class Compliance(Record):
+    risk_level: str
+    map_labels: List[MapLabel]
+
+# ===== RUN METADATA =====
+class Freshness(Record):
+    stale: bool
+    reason: Optional[str]
+    elapsed_s: Optional[float]
+    age_s: Optional[int] = None
+
+class StaleServed(Record):
+    reason: str
+    age_s: Optional[float]
+
+class StageMetrics(Record):
+    stage: str
+    latency_ms: Optional[float]
+    requests: int
+    payload_bytes: int
+    retries: int
+    cache_status: Optional[str]
+    fallback_used: bool
+    error: Optional[str]
+    stale: Optional[StaleServed] = None
+
+class PipelineMetrics(Record):
+    run_started: str
+    total_ms: float
+    fallbacks_used: int
+    stages: List[StageMetrics]
+
+class Report(Record):
+    schema_version: int
+    site_info: SiteInfo
+    current_conditions: Conditions
+    rainfall_accumulation: Dict[str, Optional[float]]
+    forecast_7day: List[ForecastDay]
+    forecast_quantities: ForecastQuantities
+    active_alerts: List[Alert]
+    soil_moisture: SoilMoisture
+    concrete_ops: ConcreteOps
+    activity_recommendations: Recommendations
+    optimal_work_windows: Dict[str, List[str]]
+    hourly_work_windows: Dict[str, List[HourlyWindow]]
+    swppp_compliance: Compliance
+    data_freshness: Dict[str, Freshness]
+    last_updated: str
+    pipeline_metrics: Optional[PipelineMetrics] = None
+    http_cache: Optional[Dict[str, int]] = None
+
+class _Version(msgspec.Struct):
+    schema_version: int = 0
+
+# Encoders/decoders are reusable and thread-safe; build them once
+_json_encoder = msgspec.json.Encoder()
+_json_decoder = msgspec.json.Decoder(Report)
+_version_decoder = msgspec.json.Decoder(_Version)
+_compact_encoder = msgspec.msgpack.Encoder()
+_compact_envelope = msgspec.msgpack.Decoder(Tuple[int, msgspec.Raw])
+_compact_decoder = msgspec.msgpack.Decoder(Report)
+
+def from_builtins(report_data):
+    """Validate a report dict (as update_report assembles it) into a typed Report"""
+    try:
+        return msgspec.convert({'schema_version': SCHEMA_VERSION, **report_data}, Report)
+    except msgspec.ValidationError as e:
+        raise SchemaError(f"Report does not match schema v{SCHEMA_VERSION}: {e}") from e
+
+def to_builtins(report):
+    """Plain dicts/lists again (history store, console summary)"""
+    return msgspec.to_builtins(report)
+
+def encode_json(report, indent=4):
+    """Human-readable JSON, same layout as the hand-written reports"""
+    raw = _json_encoder.encode(report)
+    return msgspec.json.format(raw, indent=indent) if indent else raw
+
+def encode_compact(report):
+    """Compact form: msgpack of (schema version, report), with the version readable on its own"""
+    return _compact_encoder.encode((SCHEMA_VERSION, msgspec.Raw(_compact_encoder.encode(report))))
+
+def decode_json(raw):
+    """Decode and validate human-readable JSON into a Report (older versions are migrated)"""
+    version = _version_decoder.decode(raw).schema_version
+    if version < SCHEMA_VERSION:
+        return _migrated(msgspec.json.decode(raw), version)
+    _check_version(version)
+    try:
+        return _json_decoder.decode(raw)
+    except msgspec.ValidationError as e:
+        raise SchemaError(f"Report drifted from schema v{SCHEMA_VERSION}: {e}") from e
+
+def decode_compact(raw):
+    """Decode and validate the compact form into a Report"""
+    try:
+        version, payload = _compact_envelope.decode(raw)
+    except msgspec.ValidationError as e:
+        raise SchemaError(f"Not a compact report: {e}") from e
+    if version < SCHEMA_VERSION:
+        return _migrated(msgspec.msgpack.decode(payload), version)
+    _check_version(version)
+    try:
+        return _compact_decoder.decode(payload)
+    except msgspec.ValidationError as e:
+        raise SchemaError(f"Report drifted from schema v{SCHEMA_VERSION}: {e}") from e
+
+def _check_version(version):
+    if version != SCHEMA_VERSION:
+        raise SchemaError(f"Report schema v{version}, this reader understands up to v{SCHEMA_VERSION}")
+
+# ===== MIGRATIONS =====
+# A report on disk can predate the reader by a schema bump until the next
+# writer run; each step fills what the next version added with its no-data form.
+def _from_v0(data):
+    data['site_info'].setdefault('id', LEGACY_SITE_ID)
+    data.setdefault('rainfall_accumulation', {})
+    data['concrete_ops'].setdefault('concrete_temp_f', None)
+    data['concrete_ops'].setdefault('evap_projection', {
+        'start': [], 'evap_kg_m2_h': [], 'level': [], 'hours_above_0_5': 0, 'hours_above_1_0': 0,
+        'peak_kg_m2_h': None, 'peak_time': None,
+    })
+    data.setdefault('hourly_work_windows', {})
+    data.setdefault('data_freshness', {})
+    return data
+
+def _from_v1(data):
+    data.setdefault('forecast_quantities', {'rain_in': {}, 'peak_gust_mph': None, 'peak_gust_time': None})
+    return data
+
+def _from_v2(data):
+    from soil_moisture import CAPACITY_IN
+
+    soil = data['soil_moisture']
+    percent = float(soil['level'].rstrip('%'))
+    updated = datetime.fromisoformat(data['last_updated'])
+    soil.setdefault('percent', percent)
+    soil.setdefault('state', {
+        'ts': (updated if updated.tzinfo else updated.astimezone()).timestamp(),
+        'storage_in': round(percent / 100 * CAPACITY_IN, 4),
+        'rain_through': None,
+    })
+    return data
+
+def _from_v3(data):
+    return data  # v4 only lets rainfall totals be null (no gauge reading)
+
+MIGRATIONS = {0: _from_v0, 1: _from_v1, 2: _from_v2, 3: _from_v3}
+
+def migrate(data, version):
+    """Upgrade a report dict written at an older schema version to SCHEMA_VERSION"""
+    for step in range(version, SCHEMA_VERSION):
+        data = MIGRATIONS[step](data)
+    data['schema_version'] = SCHEMA_VERSION
+    return data
+
+def _migrated(data, version):
+    try:
+        return msgspec.convert(migrate(data, version), Report)
+    except (msgspec.ValidationError, KeyError, ValueError) as e:
+        raise SchemaError(f"Report schema v{version} could not be migrated to v{SCHEMA_VERSION}: {e}") from e
+
+def section_digests(report):
+    """{section: short content hash of the section's report fields}"""
+    return {name: hashlib.sha256(_json_encoder.encode([getattr(report, field) for field in fields])).hexdigest()[:16]
+            for name, fields in SECTIONS.items()}
+
+def compact_path(path):
+    return os.path.splitext(path)[0] + COMPACT_SUFFIX
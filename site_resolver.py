@@ -0,0 +1,349 @@
+import argparse
+import csv
+import heapq
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+import requests
+
+import update_report
+from http_client import get_bytes, get_json
+
+# --- CONFIGURATION ---
+CATALOG_PATH = "catalog/site_catalog.sqlite"
+POINTS_TTL_S = 30 * 86400  # NWS grid assignments only move when office boundaries are redrawn
+POINTS_TIMEOUT = 10
+CATALOG_TIMEOUT = 30
+NEAREST = 3                # Stations / gauges returned per site
+RESOLVE_WORKERS = 8        # Concurrent /points lookups for cache misses
+STATIONS_PAGE = 500
+EARTH_RADIUS_KM = 6371.0
+LEAF_SIZE = 16
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS stations (
+    kind TEXT NOT NULL,
+    id TEXT NOT NULL,
+    name TEXT,
+    state TEXT,
+    lat REAL NOT NULL,
+    lon REAL NOT NULL,
+    PRIMARY KEY (kind, id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS points (
+    key TEXT PRIMARY KEY,
+    office TEXT NOT NULL,
+    grid_x INTEGER NOT NULL,
+    grid_y INTEGER NOT NULL,
+    forecast_zone TEXT,
+    fetched_at REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+_indexes = {}
+
+def connect(path=CATALOG_PATH):
+    """Open (and create if needed) the station/gauge catalog and /points cache"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    db = sqlite3.connect(path, timeout=30)
+    db.executescript(_SCHEMA)
+    return db
+
+# ===== SPATIAL INDEX =====
+def unit_vectors(lat, lon):
+    """Points on the unit sphere; straight-line distance between them grows monotonically with great-circle distance"""
+    lat, lon = np.radians(np.asarray(lat, dtype=np.float64)), np.radians(np.asarray(lon, dtype=np.float64))
+    return np.stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)], axis=-1)
+
+def chord_to_km(chord):
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(np.asarray(chord) / 2, 0, 1))
+
+class KDTree:
+    """Static k-d tree over 3-D points with nearest-k queries.
+
+    Built once per catalog load by median splits on the widest axis; a query
+    visits O(log n) leaves, skipping any subtree whose splitting plane is
+    farther away than the current k-th best.
+    """
+
+    def __init__(self, points):
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        self.order = np.arange(len(self.points))
+        self.nodes = []  # (start, stop, axis, split, left, right); axis -1 marks a leaf
+        if len(self.points):
+            self._build(0, len(self.points))
+
+    def _build(self, start, stop):
+        node = len(self.nodes)
+        self.nodes.append(None)
+        if stop - start <= LEAF_SIZE:
+            self.nodes[node] = (start, stop, -1, 0.0, -1, -1)
+            return node
+        members = self.order[start:stop]
+        coords = self.points[members]
+        axis = int(np.argmax(coords.max(axis=0) - coords.min(axis=0)))
+        middle = (stop - start) // 2
+        self.order[start:stop] = members[np.argpartition(coords[:, axis], middle)]
+        split = self.points[self.order[start + middle], axis]
+        left = self._build(start, start + middle)
+        right = self._build(start + middle, stop)
+        self.nodes[node] = (start, stop, axis, split, left, right)
+        return node
+
+    def query(self, point, k=1):
+        """(distances, indices) of the k nearest points, nearest first"""
+        point = np.asarray(point, dtype=np.float64)
+        best = []  # Max-heap of (-squared distance, index)
+        stack = [(0, 0.0)] if self.nodes else []
+        while stack:
+            node, bound = stack.pop()
+            if len(best) == k and bound >= -best[0][0]:
+                continue
+            start, stop, axis, split, left, right = self.nodes[node]
+            if axis < 0:
+                members = self.order[start:stop]
+                distances = ((self.points[members] - point) ** 2).sum(axis=1)
+                for distance, index in zip(distances.tolist(), members.tolist()):
+                    if len(best) < k:
+                        heapq.heappush(best, (-distance, index))
+                    elif distance < -best[0][0]:
+                        heapq.heapreplace(best, (-distance, index))
+                continue
+            offset = point[axis] - split
+            near, far = (left, right) if offset < 0 else (right, left)
+            stack.append((far, max(bound, offset * offset)))
+            stack.append((near, bound))
+        ranked = sorted((-distance, index) for distance, index in best)
+        return np.sqrt([distance for distance, _ in ranked]), [index for _, index in ranked]
+
+def catalog_index(kind, path=CATALOG_PATH):
+    """(rows, KDTree) for one catalog kind ('station' or 'gauge'), rebuilt only when the catalog changes"""
+    db = connect(path)
+    try:
+        version = db.execute("SELECT COUNT(*), TOTAL(lat), TOTAL(lon) FROM stations WHERE kind = ?", (kind,)).fetchone()
+        cached = _indexes.get((path, kind))
+        if cached and cached[0] == version:
+            return cached[1], cached[2]
+        rows = db.execute("SELECT id, name, state, lat, lon FROM stations WHERE kind = ? ORDER BY id", (kind,)).fetchall()
+    finally:
+        db.close()
+    tree = KDTree(unit_vectors([row[3] for row in rows], [row[4] for row in rows]))
+    _indexes[(path, kind)] = (version, rows, tree)
+    return rows, tree
+
+def nearest(kind, lat, lon, k=NEAREST, path=CATALOG_PATH, index=None):
+    """The k catalog entries of `kind` nearest to (lat, lon), with distance_km"""
+    rows, tree = index or catalog_index(kind, path)
+    chords, indices = tree.query(unit_vectors(lat, lon), k)
+    return [{'id': rows[i][0], 'name': rows[i][1], 'lat': rows[i][3], 'lon': rows[i][4],
+             'distance_km': round(float(km), 2)} for i, km in zip(indices, chord_to_km(chords))]
+
+# ===== CATALOG REFRESH =====
+def fetch_stations(state, timeout=CATALOG_TIMEOUT):
+    """NWS observation stations in a state, following the API's cursor pagination"""
+    url = f"{update_report.NWS_API}/stations?state={state}&limit={STATIONS_PAGE}"
+    stations = []
+    while url:
+        page = get_json(url, timeout)
+        features = page.get('features', [])
+        for feature in features:
+            lon, lat = feature['geometry']['coordinates'][:2]
+            props = feature['properties']
+            stations.append(('station', props['stationIdentifier'], props.get('name'), state, lat, lon))
+        url = (page.get('pagination') or {}).get('next') if len(features) >= STATIONS_PAGE else None
+    return stations
+
+def fetch_gauges(state, timeout=CATALOG_TIMEOUT):
+    """Active NWIS sites in a state reporting instantaneous precipitation (parameter 00045)"""
+    url = (f"{update_report.USGS_API}/nwis/site/?format=rdb&stateCd={state.lower()}"
+           f"&parameterCd=00045&hasDataTypeCd=iv&siteStatus=active")
+    lines = [line for line in get_bytes(url, timeout).decode().splitlines() if line and not line.startswith('#')]
+    if not lines:
+        return []
+    header = lines[0].split('\t')
+    gauges = []
+    for line in lines[2:]:  # Line 2 is the RDB column-format row
+        row = dict(zip(header, line.split('\t')))
+        try:
+            gauges.append(('gauge', row['site_no'], row.get('station_nm'), state,
+                           float(row['dec_lat_va']), float(row['dec_long_va'])))
+        except (KeyError, ValueError):
+            continue  # Sites without coordinates can't be ranked
+    return gauges
+
+def refresh_catalog(states, path=CATALOG_PATH):
+    """Replace the catalog entries for the given states with the current NWS and NWIS listings"""
+    counts = {}
+    for state in states:
+        rows = fetch_stations(state) + fetch_gauges(state)
+        db = connect(path)
+        try:
+            with db:
+                db.execute("DELETE FROM stations WHERE state = ?", (state,))
+                db.executemany("INSERT OR REPLACE INTO stations VALUES (?, ?, ?, ?, ?, ?)", rows)
+        finally:
+            db.close()
+        counts[state] = {kind: sum(row[0] == kind for row in rows) for kind in ('station', 'gauge')}
+        print(f"✅ {state}: {counts[state]['station']} stations, {counts[state]['gauge']} rain gauges")
+    return counts
+
+# ===== /points LOOKUPS =====
+def points_key(lat, lon):
+    # api.weather.gov accepts at most 4 decimals (~11 m), far finer than its 2.5 km grid
+    return f"{lat:.4f},{lon:.4f}"
+
+def _cached_points(keys, path):
+    db = connect(path)
+    try:
+        rows = {}
+        for key in keys:
+            row = db.execute("SELECT office, grid_x, grid_y, forecast_zone, fetched_at FROM points WHERE key = ?", (key,)).fetchone()
+            if row and time.time() - row[4] < POINTS_TTL_S:
+                rows[key] = {'office': row[0], 'grid': (row[1], row[2]), 'forecast_zone': row[3]}
+        return rows
+    finally:
+        db.close()
+
+def _fetch_points(key, timeout=POINTS_TIMEOUT):
+    props = get_json(f"{update_report.NWS_API}/points/{key}", timeout)['properties']
+    zone = (props.get('forecastZone') or '').rsplit('/', 1)[-1] or None
+    return {'office': props['gridId'], 'grid': (props['gridX'], props['gridY']), 'forecast_zone': zone}
+
+def lookup_points(locations, path=CATALOG_PATH, workers=RESOLVE_WORKERS):
+    """NWS office/grid per (lat, lon); only locations missing from the persistent cache hit /points.
+
+    A failed lookup is reported and comes back as None; the rest of the batch
+    is still cached, so a rerun only retries the failures.
+    """
+    keys = [points_key(lat, lon) for lat, lon in locations]
+    found = _cached_points(set(keys), path)
+    missing = sorted(set(keys) - set(found))
+    if missing:
+        fetched, failed = {}, {}
+        with ThreadPoolExecutor(max_workers=min(workers, len(missing)), thread_name_prefix='points') as executor:
+            futures = {executor.submit(_fetch_points, key): key for key in missing}
+            for future in as_completed(futures):
+                try:
+                    fetched[futures[future]] = future.result()
+                except (requests.RequestException, KeyError, ValueError) as e:
+                    failed[futures[future]] = f"{type(e).__name__}: {e}"
+        if failed:
+            print(f"⚠️ {len(failed)}/{len(missing)} /points lookups failed:")
+            for key, error in sorted(failed.items()):
+                print(f"   - {key}: {error}")
+        db = connect(path)
+        try:
+            with db:
+                db.executemany("INSERT OR REPLACE INTO points VALUES (?, ?, ?, ?, ?, ?)",
+                               [(key, p['office'], p['grid'][0], p['grid'][1], p['forecast_zone'], time.time())
+                                for key, p in fetched.items()])
+        finally:
+            db.close()
+        found.update(fetched)
+    return [found.get(key) for key in keys]
+
+# ===== RESOLVE =====
+def resolve_many(locations, k=NEAREST, path=CATALOG_PATH):
+    """Office/grid plus the k nearest stations and rain gauges for each (lat, lon); None where /points failed"""
+    grids = lookup_points(locations, path)
+    stations, gauges = catalog_index('station', path), catalog_index('gauge', path)
+    return [None if grid is None else {
+        'lat': lat, 'lon': lon,
+        'nws_office': grid['office'], 'nws_grid': list(grid['grid']), 'forecast_zone': grid['forecast_zone'],
+        'stations': nearest('station', lat, lon, k, index=stations),
+        'gauges': nearest('gauge', lat, lon, k, index=gauges),
+    } for (lat, lon), grid in zip(locations, grids)]
+
+def resolve(lat, lon, k=NEAREST, path=CATALOG_PATH):
+    site = resolve_many([(lat, lon)], k, path)[0]
+    if site is None:
+        raise ValueError(f"NWS /points lookup failed for {lat}, {lon}")
+    return site
+
+def manifest_entry(site_id, name, resolved):
+    """A fleet manifest entry (see fleet.load_manifest) using the nearest station and gauge"""
+    if not resolved['stations'] or not resolved['gauges']:
+        raise ValueError(f"{site_id}: catalog has no stations/gauges - run `site_resolver.py catalog` for its state")
+    station, gauge = resolved['stations'][0], resolved['gauges'][0]
+    return {
+        'id': site_id,
+        'name': name,
+        'gauge_name': f"USGS {gauge['name']}",
+        'usgs_site': gauge['id'],
+        'lat': resolved['lat'],
+        'lon': resolved['lon'],
+        'nws_office': resolved['nws_office'],
+        'nws_grid': resolved['nws_grid'],
+        'forecast_zone': resolved['forecast_zone'],
+        'nws_station': station['id'],
+    }
+
+def onboard(sites_csv, manifest_path, path=CATALOG_PATH):
+    """Resolve every site in a CSV (id, name, lat, lon) and merge them into the fleet manifest by id.
+
+    Sites that cannot be resolved are listed and left out; rerun once their
+    lookups or catalog states are fixed. Returns the merged entries.
+    """
+    with open(sites_csv, newline='') as f:
+        rows = list(csv.DictReader(f))
+    resolved = resolve_many([(float(row['lat']), float(row['lon'])) for row in rows], path=path)
+    entries, skipped = [], []
+    for row, site in zip(rows, resolved):
+        if site is None:
+            skipped.append(f"{row['id']}: NWS /points lookup failed")
+            continue
+        try:
+            entries.append(manifest_entry(row['id'], row['name'], site))
+        except ValueError as e:
+            skipped.append(str(e))
+    if skipped:
+        print(f"⚠️ {len(skipped)}/{len(rows)} sites skipped:")
+        for reason in skipped:
+            print(f"   - {reason}")
+
+    manifest = {'sites': []}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    by_id = {site['id']: site for site in manifest['sites']}
+    for entry in entries:
+        by_id[entry['id']] = {**by_id.get(entry['id'], {}), **entry}  # Keep hand-set fields (map labels, thresholds)
+    manifest['sites'] = list(by_id.values())
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=4)
+        f.write('\n')
+    return entries
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resolve NWS grid, nearest stations and rain gauges for site locations")
+    parser.add_argument('--catalog', default=CATALOG_PATH)
+    commands = parser.add_subparsers(dest='command', required=True)
+    refresh = commands.add_parser('catalog', help="Refresh the station/gauge catalog for some states")
+    refresh.add_argument('states', nargs='+', help="Two-letter state codes, e.g. NC SC")
+    single = commands.add_parser('resolve', help="Resolve one location")
+    single.add_argument('lat', type=float)
+    single.add_argument('lon', type=float)
+    batch = commands.add_parser('onboard', help="Resolve a CSV of sites (id,name,lat,lon) into the fleet manifest")
+    batch.add_argument('sites_csv')
+    batch.add_argument('--manifest', default='sites.json')
+    args = parser.parse_args()
+
+    if args.command == 'catalog':
+        refresh_catalog([state.upper() for state in args.states], args.catalog)
+    elif args.command == 'resolve':
+        site = resolve(args.lat, args.lon, path=args.catalog)
+        print(f"📍 {args.lat}, {args.lon} → {site['nws_office']} {site['nws_grid'][0]},{site['nws_grid'][1]} "
+              f"(zone {site['forecast_zone']})")
+        for kind in ('stations', 'gauges'):
+            for entry in site[kind]:
+                print(f"   {kind[:-1]:<8} {entry['id']:<16} {entry['distance_km']:>7.2f} km  {entry['name']}")
+    else:
+        started = time.perf_counter()
+        entries = onboard(args.sites_csv, args.manifest, args.catalog)
+        print(f"✅ {len(entries)} sites resolved into {args.manifest} in {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,344 @@
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import zlib
+from datetime import datetime, timezone
+
+import msgspec
+
+import report_schema
+
+# --- CONFIGURATION ---
+ARCHIVE_PATH = "history/snapshots.sqlite"
+KEYFRAME_EVERY = 16    # Full manifest every N snapshots, so any snapshot is at most N-1 small deltas away
+MAX_DELTA_DEPTH = 8    # Longest chain of delta-encoded chunks before one is stored whole again
+HASH_CHARS = 32        # 128-bit content addresses
+
+# Lists whose items are stored (and deduplicated) one by one: a forecast day or
+# alert that carries over between runs is kept once, however many runs include it
+LIST_PATHS = ('forecast_7day', 'active_alerts', 'swppp_compliance.map_labels')
+
+# Fields that change every run without anything material changing; kept per
+# snapshot so it restores exactly, but left out of the material comparison.
+# Point readings (temperature, wind, humidity, evaporation, soil percent) move
+# on every run; what the briefing decides from them - activity statuses and
+# notes, soil and evaporation status, rainfall and risk level - stays material.
+VOLATILE_PATHS = (
+    ('last_updated',),
+    ('pipeline_metrics',),
+    ('http_cache',),
+    ('soil_moisture', 'state'),
+    ('soil_moisture', 'level'),
+    ('soil_moisture', 'percent'),
+    ('data_freshness', '*', 'elapsed_s'),
+    ('data_freshness', '*', 'age_s'),
+    ('current_conditions', 'temperature_f'),
+    ('current_conditions', 'temperature_c'),
+    ('current_conditions', 'wind_speed_mph'),
+    ('current_conditions', 'wind_direction'),
+    ('current_conditions', 'humidity_percent'),
+    ('current_conditions', 'conditions'),
+    ('concrete_ops', 'evap_rate_kg_m2_h'),
+    ('concrete_ops', 'concrete_temp_f'),
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    hash TEXT PRIMARY KEY,
+    base TEXT,
+    depth INTEGER NOT NULL,
+    data BLOB NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS snapshots (
+    site_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    ts REAL NOT NULL,
+    digest TEXT NOT NULL,
+    keyframe INTEGER NOT NULL,
+    manifest BLOB NOT NULL,
+    volatile TEXT NOT NULL,
+    PRIMARY KEY (site_id, seq)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS snapshots_site_ts ON snapshots (site_id, ts);
+"""
+
+_canonical = msgspec.json.Encoder(order='sorted')
+
+def connect(path=ARCHIVE_PATH):
+    """Open (and create if needed) the snapshot archive"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    db = sqlite3.connect(path, timeout=30)
+    db.executescript(_SCHEMA)
+    return db
+
+# ===== CANONICAL FORM =====
+def _address(raw):
+    return hashlib.sha256(raw).hexdigest()[:HASH_CHARS]
+
+def _pack(value):
+    return zlib.compress(_canonical.encode(value), 9)
+
+def _unpack(blob):
+    return msgspec.json.decode(zlib.decompress(blob))
+
+def _volatile_paths(data):
+    """Concrete paths of the volatile fields present in a report dict"""
+    for pattern in VOLATILE_PATHS:
+        paths = [()]
+        for key in pattern:
+            expanded = []
+            for prefix in paths:
+                node = _lookup(data, prefix)
+                if not isinstance(node, dict):
+                    continue
+                expanded.extend(prefix + (name,) for name in (node if key == '*' else [key]) if name in node)
+            paths = expanded
+        yield from paths
+
+def _lookup(data, path):
+    for key in path:
+        data = data[key]
+    return data
+
+def split(report):
+    """(material dict, volatile {dotted path: value}) for a Report; the material part is what gets compared"""
+    data = report_schema.to_builtins(report)
+    volatile = {}
+    for path in list(_volatile_paths(data)):
+        volatile['.'.join(path)] = _lookup(data, path[:-1]).pop(path[-1])
+    return data, volatile
+
+def material_digest(report):
+    """Content hash of everything but the volatile fields"""
+    return _address(_canonical.encode(split(report)[0]))
+
+def _chunk(material):
+    """{path: canonical bytes or [canonical bytes per item]} for a material report dict"""
+    chunks = {}
+    for path in LIST_PATHS:
+        keys = path.split('.')
+        parent = _lookup(material, keys[:-1])
+        if keys[-1] in parent:
+            chunks[path] = [_canonical.encode(item) for item in parent.pop(keys[-1])]
+    for field, value in material.items():
+        chunks[field] = _canonical.encode(value)
+    return chunks
+
+def _assemble(parts):
+    """Inverse of _chunk: {path: value or [values]} back into a report dict"""
+    data = {path: value for path, value in parts.items() if path not in LIST_PATHS}
+    for path in LIST_PATHS:
+        if path in parts:
+            keys = path.split('.')
+            _lookup(data, keys[:-1])[keys[-1]] = parts[path]
+    return data
+
+# ===== CHUNK STORE =====
+def _read_chunk(db, digest, cache):
+    """Canonical bytes for a content address, undoing the delta chain through its bases"""
+    if digest not in cache:
+        base, data = db.execute("SELECT base, data FROM chunks WHERE hash = ?", (digest,)).fetchone()
+        if base is None:
+            cache[digest] = zlib.decompress(data)
+        else:
+            inflate = zlib.decompressobj(zdict=_read_chunk(db, base, cache))
+            cache[digest] = inflate.decompress(data) + inflate.flush()
+    return cache[digest]
+
+def _write_chunk(db, raw, base, cache):
+    """Store one chunk under its content address (once); deltas against `base` when that is smaller"""
+    digest = _address(raw)
+    cache[digest] = raw
+    if db.execute("SELECT 1 FROM chunks WHERE hash = ?", (digest,)).fetchone():
+        return digest
+    row = (digest, None, 0, zlib.compress(raw, 9))
+    depth = base and db.execute("SELECT depth FROM chunks WHERE hash = ?", (base,)).fetchone()
+    if depth and depth[0] < MAX_DELTA_DEPTH:
+        deflate = zlib.compressobj(9, zdict=_read_chunk(db, base, cache))
+        delta = deflate.compress(raw) + deflate.flush()
+        if len(delta) < len(row[3]):
+            row = (digest, base, depth[0] + 1, delta)
+    db.execute("INSERT INTO chunks (hash, base, depth, data) VALUES (?, ?, ?, ?)", row)
+    return digest
+
+# ===== SNAPSHOTS =====
+def _manifest(db, site_id, seq):
+    """Full {path: address or [addresses]} of one snapshot: its keyframe plus at most KEYFRAME_EVERY-1 deltas"""
+    manifest = {}
+    rows = db.execute(
+        "SELECT manifest FROM snapshots WHERE site_id = ? AND seq <= ? AND seq >= "
+        "(SELECT MAX(seq) FROM snapshots WHERE site_id = ? AND seq <= ? AND keyframe) ORDER BY seq",
+        (site_id, seq, site_id, seq)
+    )
+    for (blob,) in rows:
+        for path, address in _unpack(blob).items():
+            if address is None:
+                manifest.pop(path, None)
+            else:
+                manifest[path] = address
+    return manifest
+
+def _latest(db, site_id):
+    return db.execute("SELECT seq, digest, volatile FROM snapshots WHERE site_id = ? ORDER BY seq DESC LIMIT 1",
+                      (site_id,)).fetchone()
+
+def _epoch(last_updated):
+    updated = datetime.fromisoformat(last_updated)
+    if updated.tzinfo is None:
+        updated = updated.astimezone()
+    return updated.timestamp()
+
+def _record(db, site_id, report, cache):
+    material, volatile = split(report)
+    digest = _address(_canonical.encode(material))
+    latest = _latest(db, site_id)
+    if latest and latest[1] == digest:
+        return latest[0], []
+
+    seq = latest[0] + 1 if latest else 0
+    volatile = _write_chunk(db, _canonical.encode(volatile), latest[2] if latest else None, cache)
+    previous = _manifest(db, site_id, latest[0]) if latest else {}
+    manifest = {}
+    for path, raw in _chunk(material).items():
+        bases = previous.get(path)
+        if isinstance(raw, list):
+            bases = bases if isinstance(bases, list) else []
+            manifest[path] = [_write_chunk(db, item, bases[i] if i < len(bases) else None, cache)
+                              for i, item in enumerate(raw)]
+        else:
+            manifest[path] = _write_chunk(db, raw, bases if isinstance(bases, str) else None, cache)
+
+    changed = [path for path in manifest if manifest[path] != previous.get(path)]
+    removed = [path for path in previous if path not in manifest]
+    keyframe = seq % KEYFRAME_EVERY == 0
+    delta = manifest if keyframe else {**{path: manifest[path] for path in changed}, **dict.fromkeys(removed)}
+    db.execute(
+        "INSERT INTO snapshots (site_id, seq, ts, digest, keyframe, manifest, volatile) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (site_id, seq, _epoch(report.last_updated), digest, keyframe, _pack(delta), volatile)
+    )
+    return seq, changed + removed
+
+def record_many(reports, path=ARCHIVE_PATH):
+    """Archive {site_id: Report} in one transaction; {site_id: (seq, changed paths)}.
+
+    A report with no material change from the site's latest snapshot is not
+    stored, and comes back with that snapshot's seq and no changed paths.
+    """
+    db = connect(path)
+    try:
+        with db:
+            cache = {}
+            return {site_id: _record(db, site_id, report, cache) for site_id, report in reports.items()}
+    finally:
+        db.close()
+
+def record(site_id, report, path=ARCHIVE_PATH):
+    """Archive one site's Report; (seq, changed paths), with no paths when nothing material changed"""
+    return record_many({site_id: report}, path)[site_id]
+
+def changed(site_id, report, path=ARCHIVE_PATH):
+    """Whether a Report differs materially from the site's latest snapshot (one hash and one index lookup)"""
+    db = connect(path)
+    try:
+        latest = _latest(db, site_id)
+    finally:
+        db.close()
+    return latest is None or latest[1] != material_digest(report)
+
+def get(site_id, seq=None, path=ARCHIVE_PATH):
+    """The report dict archived as snapshot `seq` (the latest if None), or None if there is no such snapshot"""
+    db = connect(path)
+    try:
+        if seq is None:
+            latest = _latest(db, site_id)
+            if latest is None:
+                return None
+            seq = latest[0]
+        row = db.execute("SELECT volatile FROM snapshots WHERE site_id = ? AND seq = ?", (site_id, seq)).fetchone()
+        if row is None:
+            return None
+        cache = {}
+        parts = {}
+        volatile = msgspec.json.decode(_read_chunk(db, row[0], cache))
+        for field, address in _manifest(db, site_id, seq).items():
+            if isinstance(address, list):
+                parts[field] = [msgspec.json.decode(_read_chunk(db, item, cache)) for item in address]
+            else:
+                parts[field] = msgspec.json.decode(_read_chunk(db, address, cache))
+    finally:
+        db.close()
+
+    data = _assemble(parts)
+    for dotted, value in volatile.items():
+        keys = dotted.split('.')
+        _lookup(data, keys[:-1])[keys[-1]] = value
+    return data
+
+def at(site_id, when, path=ARCHIVE_PATH):
+    """The report that was current at `when` (datetime or epoch seconds), or None before the first snapshot"""
+    when = when.timestamp() if isinstance(when, datetime) else float(when)
+    db = connect(path)
+    try:
+        row = db.execute("SELECT seq FROM snapshots WHERE site_id = ? AND ts <= ? ORDER BY ts DESC LIMIT 1",
+                         (site_id, when)).fetchone()
+    finally:
+        db.close()
+    return get(site_id, row[0], path) if row else None
+
+def snapshots(site_id, path=ARCHIVE_PATH):
+    """[(seq, ts)] for one site, oldest first"""
+    db = connect(path)
+    try:
+        return db.execute("SELECT seq, ts FROM snapshots WHERE site_id = ? ORDER BY seq", (site_id,)).fetchall()
+    finally:
+        db.close()
+
+def stats(path=ARCHIVE_PATH):
+    """Snapshot and chunk counts with their stored sizes"""
+    db = connect(path)
+    try:
+        sites, count, manifest_bytes = db.execute(
+            "SELECT COUNT(DISTINCT site_id), COUNT(*), COALESCE(SUM(LENGTH(manifest)), 0) FROM snapshots"
+        ).fetchone()
+        chunks, deltas, chunk_bytes = db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(base IS NOT NULL), 0), COALESCE(SUM(LENGTH(data)), 0) FROM chunks"
+        ).fetchone()
+    finally:
+        db.close()
+    return {'sites': sites, 'snapshots': count, 'chunks': chunks, 'delta_chunks': deltas,
+            'manifest_bytes': manifest_bytes, 'chunk_bytes': chunk_bytes}
+
+# ===== MAIN EXECUTION =====
+def main():
+    parser = argparse.ArgumentParser(description="Inspect the report snapshot archive")
+    parser.add_argument('--archive', default=ARCHIVE_PATH)
+    parser.add_argument('--site', help="Site id (lists its snapshots)")
+    parser.add_argument('--seq', type=int, help="Print this snapshot of --site as JSON")
+    parser.add_argument('--at', help="Print the snapshot of --site current at this ISO time")
+    args = parser.parse_args()
+
+    if args.site and (args.seq is not None or args.at):
+        if args.at:
+            when = datetime.fromisoformat(args.at)
+            report = at(args.site, when if when.tzinfo else when.astimezone(), args.archive)
+        else:
+            report = get(args.site, args.seq, args.archive)
+        if report is None:
+            raise SystemExit(f"❌ No snapshot of {args.site} there")
+        print(json.dumps(report, indent=4))
+        return
+
+    summary = stats(args.archive)
+    print(f"🗄️ {summary['snapshots']} snapshots of {summary['sites']} sites: "
+          f"{summary['chunks']} chunks ({summary['delta_chunks']} delta-encoded), "
+          f"{(summary['manifest_bytes'] + summary['chunk_bytes']) / 1024:.1f} KB stored")
+    if args.site:
+        for seq, ts in snapshots(args.site, args.archive):
+            print(f"   #{seq:<5} {datetime.fromtimestamp(ts, timezone.utc).isoformat()}")
+
+if __name__ == "__main__":
+    main()
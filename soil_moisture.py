@@ -0,0 +1,126 @@
+import bisect
+import math
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+from evaporation import evaporation_rate
+
+# --- CONFIGURATION ---
+SOIL_PATH = "history/soil_state.sqlite"  # Lives with the history, which the Action carries between runs
+CAPACITY_IN = 2.0          # Water the top ~6 in of soil holds before further rain runs off
+SEED_IN = 0.96             # New-site storage before recent rain (48%, the old dry-weather level)
+PAN_COEFFICIENT = 0.7      # Free-water evaporation -> potential evapotranspiration
+DEFAULT_PE_IN_H = 0.004    # ~0.1 in/day when there is no weather reading to estimate drying from
+RESEED_AFTER_H = 72        # Older state has missed rain the NWIS window no longer covers; start over
+WET_PERCENT = 65
+SATURATED_PERCENT = 85
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS soil_state (
+    site_id TEXT PRIMARY KEY,
+    ts REAL NOT NULL,
+    storage_in REAL NOT NULL,
+    rain_through REAL
+) WITHOUT ROWID;
+"""
+
+def connect(path=SOIL_PATH):
+    """Open (and create if needed) the soil state store"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    db = sqlite3.connect(path, timeout=30)
+    db.executescript(_SCHEMA)
+    return db
+
+def load_states(site_ids, path=SOIL_PATH):
+    """{site_id: state} for the sites that have one"""
+    db = connect(path)
+    try:
+        states = {}
+        for site_id, ts, storage_in, rain_through in db.execute("SELECT site_id, ts, storage_in, rain_through FROM soil_state"):
+            states[site_id] = {'ts': ts, 'storage_in': storage_in, 'rain_through': rain_through}
+        return {site_id: states[site_id] for site_id in site_ids if site_id in states}
+    finally:
+        db.close()
+
+def save_states(states, path=SOIL_PATH):
+    """Persist {site_id: state} in one transaction"""
+    db = connect(path)
+    try:
+        with db:
+            db.executemany(
+                "INSERT OR REPLACE INTO soil_state (site_id, ts, storage_in, rain_through) VALUES (?, ?, ?, ?)",
+                [(site_id, state['ts'], state['storage_in'], state['rain_through']) for site_id, state in states.items()]
+            )
+    finally:
+        db.close()
+
+# ===== BUCKET MODEL =====
+def potential_evaporation(temp_f, humidity, wind_mph):
+    """Drying demand in inches/hour, vectorized; the ACI 305R free-water rate (kg/m²/h = mm/h) scaled to PET"""
+    pe = PAN_COEFFICIENT * evaporation_rate(temp_f, temp_f, humidity, wind_mph) / 25.4
+    return np.where(np.isnan(pe), DEFAULT_PE_IN_H, pe)
+
+def dry(storage_in, pe_in_h, hours):
+    """Storage after `hours` of drying; evapotranspiration falls off linearly as the soil dries"""
+    return storage_in * math.exp(-pe_in_h * max(hours, 0.0) / CAPACITY_IN)
+
+def seed(rainfall, now=None):
+    """Starting state for a site without one (or with a stale one), from the recent rain totals"""
+    samples = rainfall.get('samples') or {'times': []}
+    return {
+        'ts': now or time.time(),
+        'storage_in': min(CAPACITY_IN, SEED_IN + (rainfall.get('72h') or 0.0)),  # No gauge reading: the dry baseline
+        'rain_through': samples['times'][-1] if samples['times'] else None,
+    }
+
+def update(state, rainfall, weather, now=None):
+    """Advance a site's moisture state to `now`.
+
+    `rainfall` is the gauge fetch result; only samples after the state's
+    `rain_through` are applied, drying in between at the rate the current
+    weather gives, so the cost is O(1) per new sample regardless of history.
+    """
+    now = now or time.time()
+    if state is None or now - state['ts'] > RESEED_AFTER_H * 3600:
+        return seed(rainfall, now)
+
+    readings = [np.nan if weather[field] is None else weather[field] for field in ('temp_f', 'humidity', 'wind_speed_mph')]
+    pe = float(potential_evaporation(*readings))
+    storage, clock, rain_through = state['storage_in'], state['ts'], state['rain_through']
+    samples = rainfall.get('samples') or {'times': [], 'inches': []}
+    first = 0 if rain_through is None else bisect.bisect_right(samples['times'], rain_through)
+    for stamp, inches in zip(samples['times'][first:], samples['inches'][first:]):
+        if stamp > clock:
+            storage, clock = dry(storage, pe, (stamp - clock) / 3600), stamp
+        storage = min(CAPACITY_IN, storage + inches)
+        rain_through = stamp
+    storage = dry(storage, pe, (now - clock) / 3600)
+    return {'ts': max(now, clock), 'storage_in': round(storage, 4), 'rain_through': rain_through}
+
+def simulate(storage_in, rain_in, pe_in_h):
+    """Storage at the end of each hour for hourly rain and drying series (the replay's form of update())"""
+    storage = np.empty(len(rain_in))
+    for hour, (rain, pe) in enumerate(zip(np.nan_to_num(rain_in).tolist(), np.asarray(pe_in_h, dtype=np.float64).tolist())):
+        storage_in = dry(min(CAPACITY_IN, storage_in + rain), pe, 1.0)
+        storage[hour] = storage_in
+    return storage
+
+def percent(storage_in):
+    """Storage as percent of capacity, the unit the activity rules compare"""
+    return np.round(np.asarray(storage_in, dtype=np.float64) / CAPACITY_IN * 100, 1)
+
+def describe(state, rain_24h):
+    """The report's soil_moisture block"""
+    level = float(percent(state['storage_in']))
+    return {
+        "level": f"{level:.0f}%",
+        "status": "Saturated" if level > SATURATED_PERCENT else "Wet" if level > WET_PERCENT else "Workable",
+        "last_rain_inches": rain_24h,
+        "percent": level,
+        "state": state,
+    }
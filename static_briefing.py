@@ -0,0 +1,287 @@
+import argparse
+import gzip
+import json
+import os
+from datetime import datetime
+from html import escape
+
+import msgspec
+import numpy as np
+
+import inspection_points
+import report_schema
+from update_report import write_atomic
+
+# --- CONFIGURATION ---
+BRIEFING_DIR = "briefing"
+SECTION_CACHE = "sections.json"  # Rendered fragments by section digest, so unchanged sections are reused
+RENDER_VERSION = 1               # Bump when the markup changes, to re-render every cached section
+MAP_SIZE_PX = (480, 300)
+MAP_ZOOM = 17
+MAX_BLOCKS = 3                   # Hourly work blocks listed per activity, as on the dashboard
+STATUS_COLORS = {'GO': '#1a7f37', 'CAUTION': '#b26b00', 'STOP': '#c62828'}
+
+# Page order, matching app.py
+SECTION_ORDER = ('alerts', 'conditions', 'recommendations', 'evaporation', 'forecast', 'windows', 'map')
+ACTIVITIES = [('concrete_pouring', 'Concrete Pouring', '🧱'), ('grading_excavation', 'Grading/Excavation', '🚜'),
+              ('crane_ops', 'Crane Operations', '🏗️'), ('asphalt_paving', 'Asphalt Paving', '🛣️'),
+              ('painting_coating', 'Painting/Coating', '🎨')]
+WINDOW_COLUMNS = [('concrete_pouring', '🧱 Concrete Pouring'), ('grading', '🚜 Grading Operations'),
+                  ('painting', '🎨 Painting/Coating')]
+
+_STYLE = """
+body{font-family:system-ui,sans-serif;margin:0 auto;max-width:960px;padding:8px 12px;color:#222;line-height:1.35}
+h1{font-size:1.4rem;margin:.4rem 0}h2{font-size:1.15rem;margin:1.2rem 0 .5rem;border-top:1px solid #ddd;padding-top:.8rem}
+small,.muted{color:#666}.grid{display:flex;flex-wrap:wrap;gap:8px}.card{flex:1 1 150px;border:1px solid #ddd;border-radius:6px;padding:8px}
+.metric b{display:block;font-size:1.3rem}.status{font-size:1.5rem;font-weight:bold}
+.alert{padding:8px;border-radius:6px;margin:6px 0;background:#ffaa0020;border-left:4px solid #ffaa00}
+.alert.severe{background:#ff000020;border-left-color:#f00}.warn{background:#fff4d6;padding:6px;border-radius:6px;margin:4px 0}
+table{border-collapse:collapse;width:100%;font-size:.9rem}td,th{border-bottom:1px solid #eee;padding:4px;text-align:left}
+svg{max-width:100%;height:auto}
+""".replace('\n', '')
+
+def _reading(value, unit):
+    return "N/A" if value is None else f"{value}{unit}"
+
+def _metric(label, value, note=None):
+    note = f"<small>{escape(note)}</small>" if note else ""
+    return f'<div class="card metric">{escape(label)}<b>{escape(value)}</b>{note}</div>'
+
+def _table(headers, rows):
+    head = ''.join(f"<th>{escape(str(h))}</th>" for h in headers)
+    body = ''.join('<tr>' + ''.join(f"<td>{escape(str(cell))}</td>" for cell in row) + '</tr>' for row in rows)
+    return f"<table><tr>{head}</tr>{body}</table>"
+
+# ===== SECTIONS =====
+def render_alerts(report):
+    if not report.active_alerts:
+        return ""
+    items = []
+    for alert in report.active_alerts:
+        severe = " severe" if alert.severity in ['Severe', 'Extreme'] else ""
+        items.append(f'<div class="alert{severe}"><strong>{escape(alert.event)}</strong> - {escape(alert.severity)}<br>'
+                     f'{escape(alert.headline or "")}<br><small>{escape(alert.instruction or "")}</small></div>')
+    return "<h2>⚠️ ACTIVE WEATHER ALERTS</h2>" + ''.join(items)
+
+def render_conditions(report):
+    try:
+        generated = datetime.fromisoformat(report.last_updated).strftime('%A, %B %d, %Y at %I:%M %p')
+    except ValueError:
+        generated = "Recently"
+    warnings = [f"{name} ({status.age_s // 60} min old)" for name, status in report.data_freshness.items()
+                if status.stale and status.age_s is not None]
+    missing = [name for name, status in report.data_freshness.items() if status.stale and status.age_s is None]
+    parts = [f'<p class="muted">🕒 Generated: {escape(generated)}</p>']
+    if warnings:
+        parts.append(f'<div class="warn">⏱️ Upstream unavailable - showing last known good data: {escape(", ".join(warnings))}</div>')
+    if missing:
+        parts.append(f'<div class="warn">⏱️ No data (readings shown as N/A): {escape(", ".join(missing))}</div>')
+
+    conditions, soil = report.current_conditions, report.soil_moisture
+    windows = " | ".join(f"{window}: {_reading(inches, ' in')}" for window, inches in report.rainfall_accumulation.items())
+    parts.append("<h2>🌤️ Current Conditions</h2><div class=\"grid\">" + ''.join([
+        _metric("Temperature", _reading(conditions.temperature_f, "°F")),
+        _metric("Wind", _reading(conditions.wind_speed_mph, " mph"), conditions.wind_direction),
+        _metric("Humidity", _reading(conditions.humidity_percent, "%")),
+        _metric("24hr Rainfall", _reading(conditions.precipitation_24h, " in"), windows),
+        _metric("Soil Status", soil.status, f"{soil.level} of field capacity (modelled)"),
+    ]) + "</div>")
+    return ''.join(parts)
+
+def render_recommendations(report):
+    recs = report.activity_recommendations
+    cards = []
+    for field, title, icon in ACTIVITIES:
+        activity = getattr(recs, field)
+        color = STATUS_COLORS.get(activity.status, '#444')
+        notes = ''.join(f"<li>{escape(note)}</li>" for note in activity.notes)
+        cards.append(f'<div class="card" style="border-top:4px solid {color}">{icon} <strong>{escape(title)}</strong>'
+                     f'<div class="status" style="color:{color}">{escape(activity.status)}</div><ul>{notes}</ul></div>')
+    safety = ""
+    if recs.general_safety:
+        safety = '<div class="warn"><strong>⚠️ Safety Alerts:</strong><ul>' + \
+                 ''.join(f"<li>{escape(alert)}</li>" for alert in recs.general_safety) + '</ul></div>'
+    return "<h2>📋 Today's Activity Recommendations</h2><div class=\"grid\">" + ''.join(cards) + "</div>" + safety
+
+def sparkline(values, size=(480, 80), bands=(0.5, 1.0)):
+    """Inline SVG line for an hourly series, with dashed reference lines at `bands`"""
+    width, height = size
+    values = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+    top = max(np.nanmax(values) if not np.isnan(values).all() else 0, *bands) * 1.1
+    x = np.linspace(0, width, len(values)) if len(values) > 1 else np.zeros(len(values))
+    y = height - np.nan_to_num(values) / top * height
+    path = ' '.join(f"{a:.0f},{b:.0f}" for a, b in zip(x, y))
+    lines = ''.join(f'<line x1="0" x2="{width}" y1="{height - band / top * height:.0f}" y2="{height - band / top * height:.0f}" '
+                    f'stroke="#c62828" stroke-dasharray="4"/>' for band in bands)
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {width} {height}" width="{width}" height="{height}">'
+            f'{lines}<polyline fill="none" stroke="#1565c0" stroke-width="2" points="{path}"/></svg>')
+
+def render_evaporation(report):
+    concrete = report.concrete_ops
+    projection = concrete.evap_projection
+    if not projection.start:
+        return ""
+    peak = "" if projection.peak_time is None else f" | peak {projection.peak_kg_m2_h} at {projection.peak_time[11:16]}"
+    return ("<h2>💧 Projected Evaporation (Pour Planning)</h2>"
+            f"<p class=\"muted\">ACI 305R rate over the hourly forecast at {escape(_reading(concrete.concrete_temp_f, '°F'))} concrete | "
+            f"{projection.hours_above_0_5} h above 0.5, {projection.hours_above_1_0} h above 1.0 kg/m²/h{escape(peak)}</p>"
+            + sparkline(projection.evap_kg_m2_h))
+
+def render_forecast(report):
+    quantities = report.forecast_quantities
+    parts = ["<h2>📅 7-Day Forecast &amp; Planning</h2><div class=\"grid\">" + ''.join([
+        _metric("Rain Next 24h", _reading(quantities.rain_in.get('24h'), " in")),
+        _metric("Rain Next 48h", _reading(quantities.rain_in.get('48h'), " in")),
+        _metric("Rain Next 72h", _reading(quantities.rain_in.get('72h'), " in")),
+        _metric("Peak Gust (24h)", _reading(quantities.peak_gust_mph, " mph")),
+    ]) + "</div><p class=\"muted\">NWS gridpoint QPF and wind gust forecast</p>"]
+    if report.forecast_7day:
+        parts.append(_table(['Day', 'High °F', 'Low °F', 'Rain %', 'Wind', 'Conditions'],
+                            [[day.day, day.high, day.low, day.precipitation_prob, day.wind_speed, day.short_forecast]
+                             for day in report.forecast_7day]))
+        details = ''.join(f"<p><strong>{escape(day.day)}</strong> - {escape(day.date)}<br>{escape(day.detailed_forecast)}</p>"
+                          for day in report.forecast_7day)
+        parts.append(f"<details><summary>📖 Detailed Forecast</summary>{details}</details>")
+    return ''.join(parts)
+
+def _block(window):
+    start, end = datetime.fromisoformat(window.best_start), datetime.fromisoformat(window.best_end)
+    return f"{start.strftime('%a %I:%M %p')} – {end.strftime('%I:%M %p')}"
+
+def render_windows(report):
+    columns = []
+    for field, title in WINDOW_COLUMNS:
+        days = report.optimal_work_windows.get(field) or []
+        items = ''.join(f"<li>✅ {escape(day)}</li>" for day in days) or "<li>⚠️ No optimal days forecasted</li>"
+        columns.append(f'<div class="card"><strong>{escape(title)}</strong><ul>{items}</ul></div>')
+    parts = ["<h2>🎯 Optimal Work Windows (Next 7 Days)</h2><div class=\"grid\">" + ''.join(columns) + "</div>"]
+    rows = [[activity.replace('_', ' ').title(), _block(window), window.hours, window.score]
+            for activity, windows in report.hourly_work_windows.items() for window in windows[:MAX_BLOCKS]]
+    if rows:
+        parts.append("<h3>⏱️ Hourly Work Blocks</h3>" + _table(['Activity', 'Best Block', 'Window Hours', 'Score'], rows))
+    return ''.join(parts)
+
+def static_map(lat, lon, clusters, size=MAP_SIZE_PX, zoom=MAP_ZOOM):
+    """Small inline SVG of the clustered inspection markers around the site, with a scale bar.
+
+    Vector markers instead of satellite tiles keep the image to a few KB.
+    """
+    width, height = size
+    south, west, north, east = inspection_points.viewport_bbox(lat, lon, zoom, size, pad=0)
+    x = (np.asarray(clusters['lon'], dtype=np.float64) - west) / (east - west) * width
+    y = (north - np.asarray(clusters['lat'], dtype=np.float64)) / (north - south) * height
+    radius = 5 + 2 * np.sqrt(clusters['count'])
+
+    marks = []
+    for cx, cy, r, priority, count, label in zip(x, y, radius, clusters['priority'], clusters['count'], clusters['label']):
+        color = 'rgb({},{},{})'.format(*inspection_points.PRIORITY_COLORS.get(priority, [255, 165, 0]))
+        text = f'<text x="{cx:.0f}" y="{cy + 4:.0f}" text-anchor="middle" font-size="10">{count}</text>' if count > 1 else ""
+        marks.append(f'<g><title>{escape(str(label))}</title><circle cx="{cx:.0f}" cy="{cy:.0f}" r="{r:.0f}" fill="{color}" '
+                     f'stroke="#fff"/>{text}</g>')
+
+    metres = inspection_points.haversine_m(lat, west, np.array([lat]), np.array([east]))[0]
+    bar_m = 100 if metres > 250 else 50
+    bar_px = bar_m / metres * width
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {width} {height}" width="{width}" height="{height}">'
+            f'<rect width="{width}" height="{height}" fill="#e8eadf"/>'
+            f'<path d="M{width / 2 - 8:.0f},{height / 2:.0f}h16M{width / 2:.0f},{height / 2 - 8:.0f}v16" stroke="#333" stroke-width="2"/>'
+            + ''.join(marks) +
+            f'<path d="M10,{height - 12}h{bar_px:.0f}" stroke="#333" stroke-width="3"/>'
+            f'<text x="10" y="{height - 18}" font-size="11">{bar_m} m</text>'
+            f'<text x="{width - 16}" y="20" font-size="14" text-anchor="middle">N↑</text></svg>')
+
+def render_map(report, store_path=inspection_points.POINTS_PATH):
+    site_id, location = report.site_info.id, report.site_info.location
+    labels = None
+    if not os.path.exists(store_path) or not inspection_points.count(site_id, path=store_path):
+        labels = inspection_points.from_labels(site_id, msgspec.to_builtins(report.swppp_compliance.map_labels))
+    clusters, in_view = inspection_points.viewport(location.lat, location.lon, MAP_ZOOM, site_id=site_id,
+                                                   size=MAP_SIZE_PX, points=labels, path=store_path)
+    order = np.lexsort((-clusters['count'], [-inspection_points.PRIORITY_RANK.get(p, 1) for p in clusters['priority']]))
+    rows = [[clusters['label'][i], clusters['priority'][i], clusters['count'][i],
+             f"{clusters['lat'][i]:.5f}, {clusters['lon'][i]:.5f}"] for i in order]
+    return ("<h2>📍 SWPPP Compliance &amp; Field Maintenance Map</h2>"
+            f"<p class=\"muted\">Risk level {escape(report.swppp_compliance.risk_level)} | "
+            f"{in_view} inspection points in view ({len(rows)} markers)</p>"
+            + static_map(location.lat, location.lon, clusters)
+            + "<details open><summary>📋 Inspection Points Details</summary>"
+            + _table(['Label', 'Priority', 'Count', 'Location'], rows) + "</details>")
+
+RENDERERS = {
+    'alerts': render_alerts,
+    'conditions': render_conditions,
+    'recommendations': render_recommendations,
+    'evaporation': render_evaporation,
+    'forecast': render_forecast,
+    'windows': render_windows,
+    'map': render_map,
+}
+
+# ===== EXPORT =====
+def _load_cache(path):
+    try:
+        with open(path) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if cache.get('render_version') != RENDER_VERSION or cache.get('schema_version') != report_schema.SCHEMA_VERSION:
+        return {}
+    return cache.get('sections', {})
+
+def export(report, out_dir=BRIEFING_DIR, store_path=inspection_points.POINTS_PATH):
+    """Render the report into a self-contained static page (index.html plus a gzip copy).
+
+    Each section's HTML is cached under the digest of the report fields it
+    shows (the map's also under the inspection store version), so a report
+    update re-renders only the sections whose inputs changed. Returns
+    (page size in bytes, gzipped size in bytes, re-rendered section names).
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    cache_path = os.path.join(out_dir, SECTION_CACHE)
+    cached = _load_cache(cache_path)
+
+    digests = report_schema.section_digests(report)
+    if os.path.exists(store_path):
+        digests['map'] += f":{os.stat(store_path).st_mtime_ns}"
+    sections, rendered = {}, []
+    for name in SECTION_ORDER:
+        entry = cached.get(name)
+        if entry is None or entry['digest'] != digests[name]:
+            renderer = RENDERERS[name]
+            entry = {'digest': digests[name], 'html': renderer(report, store_path) if name == 'map' else renderer(report)}
+            rendered.append(name)
+        sections[name] = entry
+
+    title = f"🏗️ {report.site_info.name} - Construction Operations Daily Briefing"
+    page = (f'<!DOCTYPE html><html lang="en"><head><meta charset="utf-8">'
+            f'<meta name="viewport" content="width=device-width,initial-scale=1"><title>{escape(title)}</title>'
+            f'<style>{_STYLE}</style></head><body><h1>🏗️ Construction Operations Daily Briefing</h1>'
+            f'<p><strong>📍 {escape(report.site_info.name)}</strong></p>'
+            + ''.join(f'<section id="{name}">{sections[name]["html"]}</section>' for name in SECTION_ORDER) +
+            f'<p class="muted">📡 Data Sources: {escape(report.site_info.gauge)} | NOAA NWS | '
+            f'Static copy of the live dashboard</p></body></html>').encode()
+    packed = gzip.compress(page, compresslevel=9, mtime=0)  # Fixed mtime: identical pages give identical bytes
+
+    write_atomic(os.path.join(out_dir, 'index.html'), page)
+    write_atomic(os.path.join(out_dir, 'index.html.gz'), packed)
+    if rendered:
+        write_atomic(cache_path, json.dumps({'render_version': RENDER_VERSION, 'schema_version': report_schema.SCHEMA_VERSION,
+                                             'sections': sections}).encode())
+    print(f"🗞️ Static briefing: {len(page) / 1024:.1f} KB ({len(packed) / 1024:.1f} KB gzipped), "
+          f"re-rendered: {', '.join(rendered) or 'nothing'}")
+    return len(page), len(packed), rendered
+
+# ===== MAIN EXECUTION =====
+def main():
+    parser = argparse.ArgumentParser(description="Render a report into the static briefing page")
+    parser.add_argument('report', nargs='?', default='latest_report.json')
+    parser.add_argument('--out-dir', default=BRIEFING_DIR)
+    args = parser.parse_args()
+
+    with open(args.report, 'rb') as f:
+        raw = f.read()
+    decode = report_schema.decode_compact if args.report.endswith(report_schema.COMPACT_SUFFIX) else report_schema.decode_json
+    export(decode(raw), args.out_dir)
+
+if __name__ == "__main__":
+    main()
@@ -1,356 +1,524 @@
-import requests
-import json
+import argparse
+import math
+import os
+import tempfile
 import datetime
 from datetime import datetime as dt, timedelta
+from functools import partial
+
+import numpy as np
+
+import activity_rules
+import report_schema
+import snapshot_archive
+import soil_moisture
+from activity_rules import resolve_thresholds
+from evaporation import HIGH_EVAP, MODERATE_EVAP, evaporation_rate, project_hourly
+from fetch_stage import run_fetch_stage
+from gridpoint import empty_grid, forecast_quantities, parse_gridpoint
+from history_store import append_report, export_trends
+from http_client import cache_stats, get_bytes, get_json
+from pipeline_metrics import MetricsRecorder, export as export_metrics
+from work_windows import empty_hourly, find_hourly_windows
+from rainfall import NWIS_PERIOD, empty_totals, parse_nwis_series, window_totals
 
 # --- CONFIGURATION ---
+NWS_API = "https://api.weather.gov"
+USGS_API = "https://waterservices.usgs.gov"
 USGS_SITE = "02146409"  # Archdale Dr at Little Sugar Creek
 LAT, LON = 35.109028, -80.859390
 NWS_OFFICE = "GSP"  # Greenville-Spartanburg (covers Charlotte area)
 NWS_GRID = (49, 68)  # Grid coordinates for Charlotte area
+NWS_STATION = "KCLT"  # Charlotte Douglas observation station
+SITE_NAME = "6401 South Blvd"
+GAUGE_NAME = "USGS Archdale Dr"
 
-def get_usgs_data():
-    """Fetch 24h rainfall from USGS"""
-    url = f"https://waterservices.usgs.gov/nwis/iv/?format=json&sites={USGS_SITE}&parameterCd=00045&period=P1D"
-    try:
-        response = requests.get(url)
-        data = response.json()
-        
-        if 'value' in data and 'timeSeries' in data['value']:
-            time_series_list = data['value']['timeSeries']
-            if len(time_series_list) > 0:
-                values = time_series_list[0]['values'][0]['value']
-                if len(values) > 0:
-                    latest_val = float(values[-1]['value'])
-                    print(f"✅ USGS rainfall: {latest_val} inches")
-                    return latest_val
-                    
-        print("⚠️ No USGS precipitation data available")
-        return 0.0
-            
-    except Exception as e:
-        print(f"❌ Error fetching USGS data: {e}")
-        return 0.0
-
-def get_current_weather():
-    """Fetch current weather from NOAA for Charlotte area"""
-    url = "https://api.weather.gov/stations/KCLT/observations/latest"
+# Per-source timeouts (seconds); the fetch stage also enforces one overall deadline
+USGS_TIMEOUT = 10
+WEATHER_TIMEOUT = 8
+FORECAST_TIMEOUT = 12
+HOURLY_TIMEOUT = 12
+GRIDPOINT_TIMEOUT = 12
+ALERTS_TIMEOUT = 8
+
+# No reading is None, never 0: a made-up 0°F / 0 mph would drive real GO/STOP calls
+DEFAULT_WEATHER = {
+    'temp_f': None, 'temp_c': None, 'wind_speed_mph': None,
+    'wind_direction': 'N/A', 'wind_direction_deg': None,
+    'humidity': None, 'description': 'N/A'
+}
+
+SITE_MAP_LABELS = [
+    {
+        "lat": 35.108422, 
+        "lon": -80.858450, 
+        "label": "URGENT: Silt Fence Breach", 
+        "priority": "High",
+        "color": [230, 0, 0]
+    },
+    {
+        "lat": 35.109150, 
+        "lon": -80.858280, 
+        "label": "MAINTENANCE: Sediment Removal", 
+        "priority": "Med",
+        "color": [255, 165, 0]
+    },
+    {
+        "lat": 35.109620, 
+        "lon": -80.859850, 
+        "label": "STABILIZE: NW Slope Rills", 
+        "priority": "High",
+        "color": [230, 0, 0]
+    }
+]
+
+# The single-site configuration above, in the same shape as a fleet manifest entry
+DEFAULT_SITE = {
+    'id': 'south-blvd',
+    'name': SITE_NAME,
+    'gauge_name': GAUGE_NAME,
+    'usgs_site': USGS_SITE,
+    'lat': LAT,
+    'lon': LON,
+    'nws_office': NWS_OFFICE,
+    'nws_grid': NWS_GRID,
+    'nws_station': NWS_STATION,
+    'map_labels': SITE_MAP_LABELS
+}
+
+def get_usgs_data(timeout=USGS_TIMEOUT, site=USGS_SITE):
+    """Fetch rolling rainfall totals (1h-72h) from USGS"""
+    return get_usgs_batch([site], timeout=timeout)[site]
+
+def get_usgs_batch(sites, timeout=USGS_TIMEOUT):
+    """Fetch rolling rainfall totals for several USGS gauges in one NWIS request"""
+    url = f"{USGS_API}/nwis/iv/?format=json&sites={','.join(sites)}&parameterCd=00045&period={NWIS_PERIOD}"
+    series = parse_nwis_series(get_bytes(url, timeout))
     
-    try:
-        response = requests.get(url, headers={'User-Agent': 'SWPPP-Dashboard/1.0'})
-        data = response.json()
-        props = data['properties']
-        
-        temp_c = props['temperature']['value']
-        temp_f = (temp_c * 9/5) + 32 if temp_c else None
-        
-        wind_speed_mps = props['windSpeed']['value']
-        wind_speed_mph = wind_speed_mps * 2.237 if wind_speed_mps else 0
-        
-        wind_dir = props['windDirection']['value'] if props['windDirection']['value'] else 0
-        
-        def deg_to_cardinal(deg):
-            if deg is None: return "N/A"
-            dirs = ["N", "NNE", "NE", "ENE", "E", "ESE", "SE", "SSE",
-                   "S", "SSW", "SW", "WSW", "W", "WNW", "NW", "NNW"]
-            ix = round(deg / (360. / len(dirs)))
-            return dirs[ix % len(dirs)]
-        
-        wind_cardinal = deg_to_cardinal(wind_dir)
-        humidity = props['relativeHumidity']['value']
-        
-        print(f"✅ Weather: {temp_f:.1f}°F, Wind: {wind_speed_mph:.1f} mph {wind_cardinal}, Humidity: {humidity}%")
-        
-        return {
-            'temp_f': round(temp_f, 1) if temp_f else 0,
-            'temp_c': round(temp_c, 1) if temp_c else 0,
-            'wind_speed_mph': round(wind_speed_mph, 1),
-            'wind_direction': wind_cardinal,
-            'wind_direction_deg': wind_dir,
-            'humidity': round(humidity) if humidity else 0,
-            'description': props.get('textDescription', 'N/A')
-        }
-        
-    except Exception as e:
-        print(f"❌ Error fetching weather data: {e}")
-        return {
-            'temp_f': 0, 'temp_c': 0, 'wind_speed_mph': 0,
-            'wind_direction': 'N/A', 'wind_direction_deg': 0,
-            'humidity': 0, 'description': 'N/A'
-        }
-
-def get_forecast():
-    """Fetch 7-day forecast from NWS"""
-    url = f"https://api.weather.gov/gridpoints/{NWS_OFFICE}/{NWS_GRID[0]},{NWS_GRID[1]}/forecast"
+    rainfall = {}
+    for site in sites:
+        if site in series and len(series[site][0]) > 0:
+            times, values = series[site]
+            rainfall[site] = window_totals(times, values)
+            # The raw samples ride along for the soil moisture model; they are not part of the report
+            rainfall[site]['samples'] = {'times': times.tolist(), 'inches': values.tolist()}
+            print(f"✅ USGS rainfall ({site}): {rainfall[site]['24h']} inches in 24h")
+        else:
+            print(f"⚠️ No USGS precipitation data available ({site})")
+            rainfall[site] = empty_totals()
+    return rainfall
+
+def _fmt(value, unit):
+    return "N/A" if value is None else f"{value}{unit}"
+
+def deg_to_cardinal(deg):
+    if deg is None: return "N/A"
+    dirs = ["N", "NNE", "NE", "ENE", "E", "ESE", "SE", "SSE",
+           "S", "SSW", "SW", "WSW", "W", "WNW", "NW", "NNW"]
+    ix = round(deg / (360. / len(dirs)))
+    return dirs[ix % len(dirs)]
+
+def parse_observation(props):
+    """NWS station observation properties -> the weather dict the analysis reads"""
+    temp_c = props['temperature']['value']
+    temp_f = (temp_c * 9/5) + 32 if temp_c is not None else None
     
-    try:
-        response = requests.get(url, headers={'User-Agent': 'SWPPP-Dashboard/1.0'})
-        data = response.json()
-        
-        periods = data['properties']['periods'][:14]  # Get 7 days (day + night periods)
-        
-        forecast = []
-        for i in range(0, len(periods), 2):
-            day_period = periods[i]
-            night_period = periods[i+1] if i+1 < len(periods) else day_period
-            
-            forecast.append({
-                'day': day_period['name'],
-                'date': day_period['startTime'][:10],
-                'high': day_period['temperature'],
-                'low': night_period['temperature'],
-                'precipitation_prob': day_period.get('probabilityOfPrecipitation', {}).get('value', 0),
-                'wind_speed': day_period['windSpeed'],
-                'wind_direction': day_period['windDirection'],
-                'short_forecast': day_period['shortForecast'],
-                'detailed_forecast': day_period['detailedForecast']
-            })
-        
-        print(f"✅ Retrieved {len(forecast)} day forecast")
-        return forecast
-        
-    except Exception as e:
-        print(f"❌ Error fetching forecast: {e}")
-        return []
+    wind_speed_mps = props['windSpeed']['value']
+    wind_speed_mph = wind_speed_mps * 2.237 if wind_speed_mps is not None else None
+    
+    wind_dir = props['windDirection']['value']
+    humidity = props['relativeHumidity']['value']
+    
+    return {
+        'temp_f': round(temp_f, 1) if temp_f is not None else None,
+        'temp_c': round(temp_c, 1) if temp_c is not None else None,
+        'wind_speed_mph': round(wind_speed_mph, 1) if wind_speed_mph is not None else None,
+        'wind_direction': deg_to_cardinal(wind_dir),
+        'wind_direction_deg': wind_dir,
+        'humidity': round(humidity) if humidity is not None else None,
+        'description': props.get('textDescription', 'N/A')
+    }
 
-def get_alerts():
-    """Fetch active NWS alerts for the area"""
-    url = f"https://api.weather.gov/alerts/active?point={LAT},{LON}"
+def get_current_weather(timeout=WEATHER_TIMEOUT, station=NWS_STATION):
+    """Fetch current weather from NOAA for Charlotte area"""
+    url = f"{NWS_API}/stations/{station}/observations/latest"
+    data = get_json(url, timeout)
+    weather = parse_observation(data['properties'])
+    print(f"✅ Weather: {_fmt(weather['temp_f'], '°F')}, Wind: {_fmt(weather['wind_speed_mph'], ' mph')} {weather['wind_direction']}, "
+          f"Humidity: {_fmt(weather['humidity'], '%')}")
+    return weather
+
+def get_forecast(timeout=FORECAST_TIMEOUT, office=NWS_OFFICE, grid=NWS_GRID):
+    """Fetch 7-day forecast from NWS"""
+    url = f"{NWS_API}/gridpoints/{office}/{grid[0]},{grid[1]}/forecast"
+    data = get_json(url, timeout)
     
-    try:
-        response = requests.get(url, headers={'User-Agent': 'SWPPP-Dashboard/1.0'})
-        data = response.json()
-        
-        alerts = []
-        for feature in data.get('features', []):
-            props = feature['properties']
-            alerts.append({
-                'event': props['event'],
-                'severity': props['severity'],
-                'urgency': props['urgency'],
-                'headline': props.get('headline', 'Weather Alert'),
-                'description': props.get('description', ''),
-                'instruction': props.get('instruction', ''),
-                'onset': props.get('onset', ''),
-                'expires': props.get('expires', '')
-            })
-        
-        if alerts:
-            print(f"⚠️ {len(alerts)} active weather alerts")
-        else:
-            print("✅ No active weather alerts")
-            
-        return alerts
+    periods = data['properties']['periods'][:14]  # Get 7 days (day + night periods)
+    
+    forecast = []
+    for i in range(0, len(periods), 2):
+        day_period = periods[i]
+        night_period = periods[i+1] if i+1 < len(periods) else day_period
         
-    except Exception as e:
-        print(f"❌ Error fetching alerts: {e}")
-        return []
+        forecast.append({
+            'day': day_period['name'],
+            'date': day_period['startTime'][:10],
+            'high': day_period['temperature'],
+            'low': night_period['temperature'],
+            'precipitation_prob': day_period.get('probabilityOfPrecipitation', {}).get('value', 0),
+            'wind_speed': day_period['windSpeed'],
+            'wind_direction': day_period['windDirection'],
+            'short_forecast': day_period['shortForecast'],
+            'detailed_forecast': day_period['detailedForecast']
+        })
+    
+    print(f"✅ Retrieved {len(forecast)} day forecast")
+    return forecast
 
-def calculate_aci_305r(temp_f, wind_mph, humidity):
-    """Calculate concrete evaporation rate using ACI 305R formula"""
-    try:
-        temp_c = (temp_f - 32) * 5/9
-        rh = humidity / 100.0
-        tc = temp_c
-        ta = temp_c
-        v = wind_mph * 1.60934
-        
-        evap = 5 * ((tc + 18)**2.5 - rh * (ta + 18)**2.5) * (v + 4) * 1e-6
-        evap = max(0, evap)
-        return round(evap, 3)
-        
-    except:
-        return 0.42
+def get_hourly_forecast(timeout=HOURLY_TIMEOUT, office=NWS_OFFICE, grid=NWS_GRID):
+    """Fetch the ~156-hour hourly forecast from NWS as columnar lists"""
+    url = f"{NWS_API}/gridpoints/{office}/{grid[0]},{grid[1]}/forecast/hourly"
+    data = get_json(url, timeout)
+    
+    hourly = empty_hourly()
+    for period in data['properties']['periods']:
+        hourly['start'].append(period['startTime'])
+        hourly['end'].append(period['endTime'])
+        hourly['temp_f'].append(period['temperature'])
+        hourly['pop'].append((period.get('probabilityOfPrecipitation') or {}).get('value') or 0)
+        hourly['humidity'].append((period.get('relativeHumidity') or {}).get('value') or 0)
+        # "10 mph" or "5 to 10 mph" - plan against the top of the range
+        hourly['wind_mph'].append(max((float(n) for n in period['windSpeed'].split() if n.replace('.', '', 1).isdigit()), default=0))
+    
+    print(f"✅ Retrieved {len(hourly['start'])} hour forecast")
+    return hourly
 
-def generate_recommendations(weather, forecast, rain_24h, evap_rate):
-    """Generate construction activity recommendations"""
+def get_gridpoint(timeout=GRIDPOINT_TIMEOUT, office=NWS_OFFICE, grid=NWS_GRID):
+    """Fetch raw NWS gridpoint layers (QPF, PoP, gusts, RH, temperature) as aligned hourly arrays"""
+    url = f"{NWS_API}/gridpoints/{office}/{grid[0]},{grid[1]}"
+    grid_data = parse_gridpoint(get_bytes(url, timeout))
     
-    recommendations = {
-        'concrete_pouring': {'status': 'GO', 'notes': []},
-        'grading_excavation': {'status': 'GO', 'notes': []},
-        'asphalt_paving': {'status': 'GO', 'notes': []},
-        'painting_coating': {'status': 'GO', 'notes': []},
-        'crane_ops': {'status': 'GO', 'notes': []},
-        'general_safety': []
+    quantities = forecast_quantities(grid_data)
+    print(f"✅ Gridpoint forecast: {_fmt(quantities['rain_in']['24h'], ' in')} rain next 24h, "
+          f"gusts to {_fmt(quantities['peak_gust_mph'], ' mph')}")
+    return grid_data
+
+def parse_alert(props):
+    """Report fields of one NWS alert feature's properties"""
+    return {
+        'event': props['event'],
+        'severity': props['severity'],
+        'urgency': props['urgency'],
+        'headline': props.get('headline', 'Weather Alert'),
+        'description': props.get('description', ''),
+        'instruction': props.get('instruction', ''),
+        'onset': props.get('onset', ''),
+        'expires': props.get('expires', '')
     }
+
+def get_alerts(timeout=ALERTS_TIMEOUT, lat=LAT, lon=LON):
+    """Fetch active NWS alerts for the area"""
+    url = f"{NWS_API}/alerts/active?point={lat},{lon}"
+    data = get_json(url, timeout)
     
-    # Concrete Pouring Assessment
-    if rain_24h > 0.25:
-        recommendations['concrete_pouring']['status'] = 'STOP'
-        recommendations['concrete_pouring']['notes'].append('Recent rainfall - soil too wet')
-    elif evap_rate > 1.0:
-        recommendations['concrete_pouring']['status'] = 'CAUTION'
-        recommendations['concrete_pouring']['notes'].append(f'High evaporation ({evap_rate} kg/m²/h) - increase curing')
-    elif weather['temp_f'] < 40:
-        recommendations['concrete_pouring']['status'] = 'CAUTION'
-        recommendations['concrete_pouring']['notes'].append('Cold weather - use heated concrete/protection')
-    elif weather['temp_f'] > 90:
-        recommendations['concrete_pouring']['status'] = 'CAUTION'
-        recommendations['concrete_pouring']['notes'].append('Hot weather - plan for early morning pours')
-    else:
-        recommendations['concrete_pouring']['notes'].append('Optimal conditions for concrete work')
+    alerts = [parse_alert(feature['properties']) for feature in data.get('features', [])]
     
-    # Check upcoming rain in forecast
-    upcoming_rain = False
-    for day in forecast[:3]:  # Next 3 days
-        if day['precipitation_prob'] > 60:
-            upcoming_rain = True
-            recommendations['concrete_pouring']['notes'].append(f"Rain expected {day['day']} ({day['precipitation_prob']}%)")
-    
-    # Grading & Excavation
-    if rain_24h > 0.5:
-        recommendations['grading_excavation']['status'] = 'STOP'
-        recommendations['grading_excavation']['notes'].append('Soil saturated - equipment damage risk')
-    elif rain_24h > 0.25:
-        recommendations['grading_excavation']['status'] = 'CAUTION'
-        recommendations['grading_excavation']['notes'].append('Soil wet - limited operations only')
+    if alerts:
+        print(f"⚠️ {len(alerts)} active weather alerts")
     else:
-        recommendations['grading_excavation']['notes'].append('Ground conditions suitable')
-    
-    # Asphalt Paving
-    if rain_24h > 0.1:
-        recommendations['asphalt_paving']['status'] = 'STOP'
-        recommendations['asphalt_paving']['notes'].append('Surface must be dry')
-    elif weather['temp_f'] < 50:
-        recommendations['asphalt_paving']['status'] = 'STOP'
-        recommendations['asphalt_paving']['notes'].append('Temperature too low for asphalt')
-    elif upcoming_rain:
-        recommendations['asphalt_paving']['status'] = 'CAUTION'
-        recommendations['asphalt_paving']['notes'].append('Rain forecasted - complete quickly')
+        print("✅ No active weather alerts")
+        
+    return alerts
+
+def calculate_aci_305r(temp_f, wind_mph, humidity, concrete_temp_f=None):
+    """Calculate concrete evaporation rate using ACI 305R formula (None if inputs are missing)"""
+    concrete_temp_f = temp_f if concrete_temp_f is None else concrete_temp_f
+    inputs = [temp_f, concrete_temp_f, humidity, wind_mph]
+    if any(value is None for value in inputs):
+        return None
     
-    # Painting/Coating
-    if weather['humidity'] > 85:
-        recommendations['painting_coating']['status'] = 'STOP'
-        recommendations['painting_coating']['notes'].append('Humidity too high')
-    elif weather['temp_f'] < 50 or weather['temp_f'] > 90:
-        recommendations['painting_coating']['status'] = 'CAUTION'
-        recommendations['painting_coating']['notes'].append('Temperature outside optimal range')
-    elif rain_24h > 0:
-        recommendations['painting_coating']['status'] = 'CAUTION'
-        recommendations['painting_coating']['notes'].append('Recent moisture - verify surface dry')
+    evap = float(evaporation_rate(*inputs))
+    return None if math.isnan(evap) else round(evap, 3)
+
+def generate_recommendations(weather, forecast, rain_24h, evap_rate, thresholds=None, quantities=None, soil_percent=None):
+    """Generate construction activity recommendations from the activity rule table.
+
+    `quantities` (forecast_quantities() of the gridpoint data) supplies forecast
+    rain totals and gusts, and `soil_percent` the modelled soil moisture; without
+    them those rules see missing data.
+    """
+    thresholds = thresholds or resolve_thresholds()
+    upcoming = forecast[:3]  # Next 3 days
+    quantities = quantities or forecast_quantities(empty_grid())
     
-    # Crane Operations
-    if weather['wind_speed_mph'] > 20:
-        recommendations['crane_ops']['status'] = 'STOP'
-        recommendations['crane_ops']['notes'].append(f'Wind speed {weather["wind_speed_mph"]} mph exceeds safe limits')
-    elif weather['wind_speed_mph'] > 15:
-        recommendations['crane_ops']['status'] = 'CAUTION'
-        recommendations['crane_ops']['notes'].append('Monitor wind speeds closely')
+    conditions = {
+        'rain_24h': rain_24h,
+        'soil_moisture': soil_percent,
+        'evap_rate': evap_rate,
+        'temp_f': weather['temp_f'],
+        'humidity': weather['humidity'],
+        'wind_mph': weather['wind_speed_mph'],
+        'upcoming_rain_prob': max([day['precipitation_prob'] or 0 for day in upcoming], default=None),  # No forecast: missing
+        'forecast_rain_24h': quantities['rain_in']['24h'],
+        'gust_mph': quantities['peak_gust_mph'],
+    }
+    recommendations = activity_rules.recommend(conditions, thresholds)
     
-    # General Safety Alerts
-    if weather['temp_f'] > 90:
-        recommendations['general_safety'].append('🌡️ Heat Advisory: Ensure hydration stations, frequent breaks')
-    if weather['wind_speed_mph'] > 25:
-        recommendations['general_safety'].append('💨 High Wind: Secure loose materials, caution with tall equipment')
+    # Check upcoming rain in forecast
+    for day in upcoming:
+        if (day['precipitation_prob'] or 0) > thresholds['forecast_rain_prob']:
+            recommendations['concrete_pouring']['notes'].append(f"Rain expected {day['day']} ({day['precipitation_prob']}%)")
     
     return recommendations
 
-def find_optimal_work_windows(forecast):
+def find_optimal_work_windows(forecast, thresholds=None):
     """Identify best days for different activities over next week"""
-    
-    windows = {
-        'concrete_pouring': [],
-        'grading': [],
-        'painting': []
+    fields = {
+        'precipitation_prob': np.array([day['precipitation_prob'] or 0 for day in forecast], dtype=np.float64),
+        'high': np.array([day['high'] for day in forecast], dtype=np.float64),
     }
+    days = [day['day'] for day in forecast]
     
-    for day in forecast:
-        # Concrete windows (dry, moderate temps)
-        if day['precipitation_prob'] < 30 and 45 <= day['high'] <= 85:
-            windows['concrete_pouring'].append(day['day'])
-        
-        # Grading windows (dry)
-        if day['precipitation_prob'] < 20:
-            windows['grading'].append(day['day'])
-        
-        # Painting windows (dry, moderate humidity assumed)
-        if day['precipitation_prob'] < 20 and 50 <= day['high'] <= 85:
-            windows['painting'].append(day['day'])
-    
+    windows = {}
+    for activity in activity_rules.WINDOW_RULES:
+        mask = activity_rules.window_mask(fields, activity, thresholds)
+        windows[activity] = [day for day, ok in zip(days, mask) if ok]
     return windows
 
-# ===== MAIN EXECUTION =====
-print("🔄 Generating Construction Operations Briefing...")
-print("="*60)
-
-rain_24h = get_usgs_data()
-weather = get_current_weather()
-forecast = get_forecast()
-alerts = get_alerts()
-evap_rate = calculate_aci_305r(weather['temp_f'], weather['wind_speed_mph'], weather['humidity'])
-recommendations = generate_recommendations(weather, forecast, rain_24h, evap_rate)
-work_windows = find_optimal_work_windows(forecast)
-
-# Build comprehensive report
-report_data = {
-    "site_info": {
-        "name": "6401 South Blvd",
-        "gauge": "USGS Archdale Dr",
-        "location": {"lat": LAT, "lon": LON}
-    },
-    "current_conditions": {
-        "temperature_f": weather['temp_f'],
-        "temperature_c": weather['temp_c'],
-        "wind_speed_mph": weather['wind_speed_mph'],
-        "wind_direction": weather['wind_direction'],
-        "humidity_percent": weather['humidity'],
-        "conditions": weather['description'],
-        "precipitation_24h": rain_24h
-    },
-    "forecast_7day": forecast,
-    "active_alerts": alerts,
-    "soil_moisture": {
-        "level": "85%" if rain_24h > 0.5 else "65%" if rain_24h > 0.25 else "48%",
-        "status": "Saturated" if rain_24h > 0.5 else "Wet" if rain_24h > 0.25 else "Workable",
-        "last_rain_inches": rain_24h
-    },
-    "concrete_ops": {
-        "pour_status": recommendations['concrete_pouring']['status'],
-        "evap_rate_kg_m2_h": evap_rate,
-        "evap_status": "HIGH" if evap_rate > 1.0 else "MODERATE" if evap_rate > 0.5 else "LOW",
-        "notes": recommendations['concrete_pouring']['notes']
-    },
-    "activity_recommendations": recommendations,
-    "optimal_work_windows": work_windows,
-    "swppp_compliance": {
-        "risk_level": "HIGH" if rain_24h > 0.5 else "MODERATE" if rain_24h > 0.25 else "LOW",
-        "map_labels": [
-            {
-                "lat": 35.108422, 
-                "lon": -80.858450, 
-                "label": "URGENT: Silt Fence Breach", 
-                "priority": "High",
-                "color": [230, 0, 0]
-            },
-            {
-                "lat": 35.109150, 
-                "lon": -80.858280, 
-                "label": "MAINTENANCE: Sediment Removal", 
-                "priority": "Med",
-                "color": [255, 165, 0]
-            },
-            {
-                "lat": 35.109620, 
-                "lon": -80.859850, 
-                "label": "STABILIZE: NW Slope Rills", 
-                "priority": "High",
-                "color": [230, 0, 0]
-            }
-        ]
-    },
-    "last_updated": dt.now().isoformat()
+# ===== REPORT ASSEMBLY =====
+# Analysis steps and the fetch sources each one reads. A step whose sources are
+# unchanged can be carried over from the previous run (see analyze()).
+ANALYSIS_SOURCES = {
+    'evaporation': ('weather', 'forecast_hourly'),
+    'soil_moisture': ('usgs', 'weather'),
+    'recommendations': ('weather', 'forecast', 'usgs', 'gridpoint'),
+    'work_windows': ('forecast', 'forecast_hourly'),
 }
 
-print(f"\n📊 Report Summary:")
-print(f"   - Current: {weather['temp_f']}°F, {weather['description']}")
-print(f"   - Wind: {weather['wind_speed_mph']} mph {weather['wind_direction']}")
-print(f"   - 24hr Rain: {rain_24h} inches")
-print(f"   - Active Alerts: {len(alerts)}")
-print(f"   - Concrete Status: {recommendations['concrete_pouring']['status']}")
-print(f"   - Best concrete days: {', '.join(work_windows['concrete_pouring'][:3]) or 'None in next 7 days'}")
+def analyze(site, inputs, metrics, previous=None, changed=None):
+    """Run the per-site analysis steps over `inputs` (keyed by fetch source name).
+
+    With `previous` (an earlier analyze() result) and `changed` (source names
+    whose data changed since), only the steps reading a changed source rerun.
+    """
+    analysis = dict(previous or {})
+    thresholds = resolve_thresholds(site.get('thresholds'))
+    concrete_temp_f = site.get('concrete_temp_f')  # Placed-concrete temperature, e.g. from batch tickets
+    weather, forecast, hourly = inputs['weather'], inputs['forecast'], inputs['forecast_hourly']
+
+    def due(step):
+        return previous is None or changed is None or any(source in changed for source in ANALYSIS_SOURCES[step])
+
+    if due('evaporation'):
+        with metrics.stage('evaporation'):
+            analysis['evap_rate'] = calculate_aci_305r(weather['temp_f'], weather['wind_speed_mph'], weather['humidity'], concrete_temp_f)
+            analysis['evap_projection'] = project_hourly(hourly, concrete_temp_f)
+    if due('soil_moisture'):
+        with metrics.stage('soil_moisture'):
+            # The previous run's state (in watch mode) or the persisted one; each update only applies new samples
+            state = analysis.get('soil_state') or inputs.get('soil_state')
+            analysis['soil_state'] = soil_moisture.update(state, inputs['usgs'], weather)
+    if due('recommendations'):
+        with metrics.stage('recommendations'):
+            analysis['forecast_quantities'] = forecast_quantities(inputs['gridpoint'])
+            analysis['recommendations'] = generate_recommendations(weather, forecast, inputs['usgs']['24h'], analysis['evap_rate'],
+                                                                   thresholds, analysis['forecast_quantities'],
+                                                                   float(soil_moisture.percent(analysis['soil_state']['storage_in'])))
+    if due('work_windows'):
+        with metrics.stage('work_windows'):
+            analysis['work_windows'] = find_optimal_work_windows(forecast, thresholds)
+            analysis['hourly_windows'] = find_hourly_windows(hourly, thresholds)
+    return analysis
+
+def assemble_report(site, inputs, analysis, freshness, metrics):
+    """Lay out the briefing report from fetched inputs and analysis results"""
+    weather, rainfall = inputs['weather'], inputs['usgs']
+    rain_24h = rainfall['24h']
+    concrete_temp_f = site.get('concrete_temp_f')
+    evap_rate = analysis['evap_rate']
+    recommendations = analysis['recommendations']
+    
+    return {
+        "site_info": {
+            "id": site['id'],
+            "name": site['name'],
+            "gauge": site['gauge_name'],
+            "location": {"lat": site['lat'], "lon": site['lon']}
+        },
+        "current_conditions": {
+            "temperature_f": weather['temp_f'],
+            "temperature_c": weather['temp_c'],
+            "wind_speed_mph": weather['wind_speed_mph'],
+            "wind_direction": weather['wind_direction'],
+            "humidity_percent": weather['humidity'],
+            "conditions": weather['description'],
+            "precipitation_24h": rain_24h
+        },
+        "rainfall_accumulation": {window: total for window, total in rainfall.items() if window != 'samples'},
+        "forecast_7day": inputs['forecast'],
+        "forecast_quantities": analysis['forecast_quantities'],
+        "active_alerts": inputs['alerts'],
+        "soil_moisture": soil_moisture.describe(analysis['soil_state'], rain_24h),
+        "concrete_ops": {
+            "pour_status": recommendations['concrete_pouring']['status'],
+            "evap_rate_kg_m2_h": evap_rate,
+            "evap_status": ("UNKNOWN" if evap_rate is None else "HIGH" if evap_rate > HIGH_EVAP
+                            else "MODERATE" if evap_rate > MODERATE_EVAP else "LOW"),
+            "concrete_temp_f": weather['temp_f'] if concrete_temp_f is None else concrete_temp_f,
+            "evap_projection": analysis['evap_projection'],
+            "notes": recommendations['concrete_pouring']['notes']
+        },
+        "activity_recommendations": recommendations,
+        "optimal_work_windows": analysis['work_windows'],
+        "hourly_work_windows": analysis['hourly_windows'],
+        "swppp_compliance": {
+            "risk_level": ("UNKNOWN" if rain_24h is None else "HIGH" if rain_24h > 0.5
+                           else "MODERATE" if rain_24h > 0.25 else "LOW"),
+            "map_labels": site.get('map_labels', [])
+        },
+        "data_freshness": freshness,
+        "pipeline_metrics": metrics.snapshot(),
+        "last_updated": dt.now().isoformat()
+    }
+
+def build_report(site, weather, forecast, rainfall, alerts, freshness, hourly=None, metrics=None, gridpoint=None,
+                 soil_state=None):
+    """Run the per-site analysis and assemble the briefing report.
+
+    Analysis stages are timed on `metrics` (a fresh recorder if not given),
+    and the recorder's snapshot becomes the report's pipeline_metrics block.
+    `soil_state` is the site's persisted soil moisture state; the updated one
+    is the report's soil_moisture.state.
+    """
+    metrics = metrics or MetricsRecorder(site['id'])
+    inputs = {'usgs': rainfall, 'weather': weather, 'forecast': forecast,
+              'forecast_hourly': hourly or empty_hourly(), 'alerts': alerts,
+              'gridpoint': empty_grid() if gridpoint is None else gridpoint, 'soil_state': soil_state}
+    return assemble_report(site, inputs, analyze(site, inputs, metrics), freshness, metrics)
+
+def write_report(path, report_data):
+    """Validate a report against the schema and write it as JSON plus the compact form.
+
+    Both files are replaced atomically: readers (app.py) see the old file or
+    the new one, never half of one. Returns the typed Report.
+    """
+    report = report_schema.from_builtins(report_data)
+    write_atomic(path, report_schema.encode_json(report))
+    write_atomic(report_schema.compact_path(path), report_schema.encode_compact(report))
+    return report
+
+def write_atomic(path, payload):
+    directory = os.path.dirname(path) or '.'
+    fd, tmp = tempfile.mkstemp(prefix='.report-', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+        os.chmod(tmp, 0o644)  # mkstemp creates 0600; the dashboard may run as another user
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
 
-with open('latest_report.json', 'w') as f:
-    json.dump(report_data, f, indent=4)
+def print_summary(report_data):
+    """Print the console summary for one site's briefing"""
+    conditions = report_data['current_conditions']
+    recommendations = report_data['activity_recommendations']
+    work_windows = report_data['optimal_work_windows']
+    
+    print(f"\n📊 Report Summary: {report_data['site_info']['name']}")
+    print(f"   - Current: {_fmt(conditions['temperature_f'], '°F')}, {conditions['conditions']}")
+    print(f"   - Wind: {_fmt(conditions['wind_speed_mph'], ' mph')} {conditions['wind_direction']}")
+    print(f"   - 24hr Rain: {_fmt(conditions['precipitation_24h'], ' inches')} | Soil: {report_data['soil_moisture']['level']} "
+          f"({report_data['soil_moisture']['status']})")
+    quantities = report_data['forecast_quantities']
+    print(f"   - Forecast Rain: {_fmt(quantities['rain_in']['24h'], ' in')} next 24h, {_fmt(quantities['rain_in']['72h'], ' in')} next 72h"
+          f" | Peak Gust: {_fmt(quantities['peak_gust_mph'], ' mph')}")
+    print(f"   - Active Alerts: {len(report_data['active_alerts'])}")
+    if 'http_cache' in report_data:
+        stats = report_data['http_cache']
+        print(f"   - HTTP Cache: {stats['hits']} hits, {stats['revalidated']} revalidated, {stats['misses']} misses")
+    stale = [name if status.get('age_s') is None else f"{name} (last good, {status['age_s'] // 60} min old)"
+             for name, status in report_data['data_freshness'].items() if status['stale']]
+    if stale:
+        print(f"   - Stale Sources: {', '.join(stale)}")
+    if 'pipeline_metrics' in report_data:
+        stages = report_data['pipeline_metrics']['stages']
+        slowest = max(stages, key=lambda stage: stage['latency_ms'] or 0, default=None)
+        if slowest:
+            print(f"   - Slowest Stage: {slowest['stage']} ({slowest['latency_ms']:.0f} ms)")
+    print(f"   - Concrete Status: {recommendations['concrete_pouring']['status']}")
+    print(f"   - Best concrete days: {', '.join(work_windows['concrete_pouring'][:3]) or 'None in next 7 days'}")
+    pours = report_data['hourly_work_windows']['concrete_pouring']
+    if pours:
+        print(f"   - Next pour block: {pours[0]['best_start']} → {pours[0]['best_end']} (score {pours[0]['score']})")
+
+# ===== FETCH STAGE =====
+def site_fetch_sources(site):
+    """Fetch sources for a single site, in the shape run_fetch_stage expects"""
+    return {
+        'usgs': {'fetch': partial(get_usgs_data, site=site['usgs_site']), 'default': empty_totals(), 'timeout': USGS_TIMEOUT},
+        'weather': {'fetch': partial(get_current_weather, station=site['nws_station']), 'default': DEFAULT_WEATHER, 'timeout': WEATHER_TIMEOUT},
+        'forecast': {'fetch': partial(get_forecast, office=site['nws_office'], grid=site['nws_grid']), 'default': [], 'timeout': FORECAST_TIMEOUT},
+        'forecast_hourly': {'fetch': partial(get_hourly_forecast, office=site['nws_office'], grid=site['nws_grid']), 'default': empty_hourly(), 'timeout': HOURLY_TIMEOUT},
+        'gridpoint': {'fetch': partial(get_gridpoint, office=site['nws_office'], grid=site['nws_grid']), 'default': empty_grid(), 'timeout': GRIDPOINT_TIMEOUT},
+        'alerts': {'fetch': partial(get_alerts, lat=site['lat'], lon=site['lon']), 'default': [], 'timeout': ALERTS_TIMEOUT},
+    }
+
+# ===== MAIN EXECUTION =====
+def main():
+    """Fetch all sources, build the briefing and write latest_report.json"""
+    parser = argparse.ArgumentParser(description="Generate the construction operations briefing")
+    parser.add_argument('--fleet', metavar='MANIFEST', help="Site manifest (JSON); writes one report per site")
+    parser.add_argument('--out-dir', default='reports', help="Output directory for fleet reports")
+    parser.add_argument('--watch', action='store_true', help="Keep running, refreshing each source on its own cadence")
+    args = parser.parse_args()
+    
+    if args.watch:
+        from watch import watch
+        watch(DEFAULT_SITE)
+        return
+    if args.fleet:
+        from fleet import run_fleet
+        run_fleet(args.fleet, args.out_dir)
+        return
+    
+    print("🔄 Generating Construction Operations Briefing...")
+    print("="*60)
+    
+    metrics = MetricsRecorder(DEFAULT_SITE['id'])
+    fetched, freshness = run_fetch_stage(site_fetch_sources(DEFAULT_SITE), metrics=metrics)
+    soil_state = soil_moisture.load_states([DEFAULT_SITE['id']]).get(DEFAULT_SITE['id'])
+    report_data = build_report(DEFAULT_SITE, fetched['weather'], fetched['forecast'],
+                               fetched['usgs'], fetched['alerts'], freshness,
+                               hourly=fetched['forecast_hourly'], metrics=metrics, gridpoint=fetched['gridpoint'],
+                               soil_state=soil_state)
+    report_data['http_cache'] = cache_stats()
+    print_summary(report_data)
+    
+    # The report is already serialized by now, so the write stage only reaches the metrics exports
+    with metrics.stage('report_write'):
+        report = write_report('latest_report.json', report_data)
+        append_report(DEFAULT_SITE['id'], report_data)
+        export_trends(DEFAULT_SITE['id'])
+        soil_moisture.save_states({DEFAULT_SITE['id']: report_data['soil_moisture']['state']})
+    with metrics.stage('snapshot_archive'):
+        seq, changed = snapshot_archive.record(DEFAULT_SITE['id'], report)
+    with metrics.stage('static_briefing'):
+        from static_briefing import export as export_briefing
+        export_briefing(report)
+    export_metrics([metrics])
+
+    if changed:
+        print(f"🗄️ Archived snapshot #{seq} (changed: {', '.join(changed) if seq else 'first snapshot'})")
+    else:
+        print(f"⏸️ No material change since snapshot #{seq}")
+    # The Action commits only when something material changed
+    if os.environ.get('GITHUB_OUTPUT'):
+        with open(os.environ['GITHUB_OUTPUT'], 'a') as f:
+            f.write(f"material={'true' if changed else 'false'}\n")
+    
+    print("\n✅ Comprehensive operations briefing written to latest_report.json")
+    print("="*60)
 
-print("\n✅ Comprehensive operations briefing written to latest_report.json")
-print("="*60)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+import asyncio
+import copy
+import hashlib
+import json
+import random
+import time
+
+import snapshot_archive
+import soil_moisture
+import static_briefing
+from fetch_stage import run_fetch_stage
+from history_store import append_report
+from http_client import cache_stats
+from pipeline_metrics import MetricsRecorder, export as export_metrics
+from update_report import analyze, assemble_report, site_fetch_sources, write_report
+
+# --- CONFIGURATION ---
+# Refresh cadence per fetch source: (interval seconds, +/- jitter seconds).
+# Jitter keeps the pollers from lining up on the same second every cycle.
+CADENCES = {
+    'alerts': (60, 10),
+    'weather': (450, 150),   # Station observations: every 5-10 minutes
+    'usgs': (900, 90),
+    'forecast': (3600, 300),
+    'forecast_hourly': (3600, 300),
+    'gridpoint': (3600, 300),
+}
+WRITE_DEBOUNCE_S = 2.0  # Sources that land together are folded into one report write
+WRITE_RETRY_S = 30.0    # Pause before retrying a failed report write
+
+def _digest(value):
+    # Gridpoint data is NumPy arrays; hash their full values, not their truncated repr
+    default = lambda o: o.tolist() if hasattr(o, 'tolist') else str(o)
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=default).encode()).hexdigest()
+
+class Watcher:
+    """Keeps one site's report current, refreshing each source on its own cadence.
+
+    Only the analysis steps that read a changed source are recomputed, and the
+    report is rewritten only when data or source freshness actually changed.
+    """
+
+    def __init__(self, site, report_path, cadences=None):
+        self.site = site
+        self.report_path = report_path
+        self.cadences = {**CADENCES, **(cadences or {})}
+        self.sources = site_fetch_sources(site)
+        self.inputs = {name: copy.deepcopy(source['default']) for name, source in self.sources.items()}
+        self.inputs['soil_state'] = soil_moisture.load_states([site['id']]).get(site['id'])
+        self.freshness = {name: {'stale': True, 'reason': 'pending', 'elapsed_s': None} for name in self.sources}
+        self.loaded = set()       # Sources that have returned real data at least once
+        self.changed = set()      # Sources whose data changed since the last write
+        self.analysis = None
+        self.metrics = MetricsRecorder(site['id'])
+        self.writes = 0
+        self._digests = {}
+        self._dirty = None
+
+    async def refresh(self, name):
+        """Fetch one source and fold it into the current inputs"""
+        source = self.sources[name]
+        recorder = MetricsRecorder(self.site['id'])
+        fetched, freshness = await asyncio.to_thread(run_fetch_stage, {name: source}, source['timeout'], recorder)
+        self.metrics.add(recorder.stages())
+
+        status = freshness[name]
+        if status['stale'] and name in self.loaded:
+            # A failed poll keeps the last good data; only the freshness flag changes
+            status = {**status, 'reason': f"{status['reason']} (keeping previous)"}
+        else:
+            if not status['stale']:
+                self.loaded.add(name)
+            digest = _digest(fetched[name])
+            if digest != self._digests.get(name):
+                self._digests[name] = digest
+                self.inputs[name] = fetched[name]
+                self.changed.add(name)
+
+        if name in self.changed or status['stale'] != self.freshness[name]['stale']:
+            self._dirty.set()
+        self.freshness[name] = status
+
+    async def poll(self, name):
+        interval, jitter = self.cadences[name]
+        while True:
+            await asyncio.sleep(max(1.0, interval + random.uniform(-jitter, jitter)))
+            await self.refresh(name)
+
+    def _take(self):
+        """Hand the pending changes to a write; the pollers keep filling fresh ones meanwhile"""
+        changed, self.changed = self.changed, set()
+        metrics, self.metrics = self.metrics, MetricsRecorder(self.site['id'])
+        return changed, metrics, dict(self.inputs), copy.deepcopy(self.freshness)
+
+    def write(self, changed, metrics, inputs, freshness):
+        """Recompute the affected analysis steps and atomically rewrite the report.
+
+        Runs off the event loop: it only reads the snapshot taken by `_take`.
+        """
+        analysis = analyze(self.site, inputs, metrics, self.analysis, changed)
+        report_data = assemble_report(self.site, inputs, analysis, freshness, metrics)
+        report_data['http_cache'] = cache_stats()
+        with metrics.stage('report_write'):
+            report = write_report(self.report_path, report_data)
+            append_report(self.site['id'], report_data)
+            soil_moisture.save_states({self.site['id']: report_data['soil_moisture']['state']})
+        with metrics.stage('snapshot_archive'):
+            seq, archived = snapshot_archive.record(self.site['id'], report)
+        with metrics.stage('static_briefing'):
+            static_briefing.export(report)
+        export_metrics([metrics])
+        self.analysis = analysis
+        self.writes += 1
+
+        stale = [name for name, status in freshness.items() if status['stale']]
+        print(f"📝 {time.strftime('%H:%M:%S')} report updated "
+              f"(changed: {', '.join(sorted(changed)) or 'freshness only'}; "
+              f"{f'archived #{seq}' if archived else 'nothing material'}"
+              f"{'; stale: ' + ', '.join(stale) if stale else ''})")
+
+    async def flush(self):
+        """Write the pending changes off the event loop; a failed write is logged and left pending"""
+        changed, metrics, inputs, freshness = self._take()
+        try:
+            await asyncio.to_thread(self.write, changed, metrics, inputs, freshness)
+            return True
+        except Exception as e:
+            # Keep the daemon polling; the changes stay pending for the next write
+            print(f"⚠️ {time.strftime('%H:%M:%S')} report write failed: {type(e).__name__}: {e}")
+            self.changed |= changed
+            self._dirty.set()
+            return False
+
+    async def writer(self):
+        while True:
+            await self._dirty.wait()
+            await asyncio.sleep(WRITE_DEBOUNCE_S)
+            self._dirty.clear()
+            if not await self.flush():
+                await asyncio.sleep(WRITE_RETRY_S)
+
+    async def run(self, duration=None):
+        """Poll until cancelled (or for `duration` seconds)"""
+        self._dirty = asyncio.Event()
+        # One full round first, so the first report is never built from defaults
+        await asyncio.gather(*(self.refresh(name) for name in self.sources))
+        self._dirty.clear()
+        await self.flush()  # If this fails, the writer retries it
+
+        tasks = [asyncio.create_task(self.poll(name)) for name in self.sources]
+        tasks.append(asyncio.create_task(self.writer()))
+        try:
+            await asyncio.wait_for(asyncio.gather(*tasks), duration)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+def watch(site, report_path='latest_report.json', cadences=None, duration=None):
+    """Run the watch daemon in the foreground until Ctrl-C"""
+    cadences = {**CADENCES, **(cadences or {})}
+    print(f"👀 Watching {site['name']}: " + ", ".join(
+        f"{name} ~{interval / 60:g} min" if interval >= 60 else f"{name} ~{interval:g} s"
+        for name, (interval, _) in cadences.items()))
+    watcher = Watcher(site, report_path, cadences)
+    try:
+        asyncio.run(watcher.run(duration))
+    except KeyboardInterrupt:
+        print(f"\n🛑 Stopped after {watcher.writes} report writes")
+    return watcher
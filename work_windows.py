@@ -0,0 +1,72 @@
+from datetime import datetime
+
+import numpy as np
+
+from activity_rules import HOURLY_WINDOW_RULES, THRESHOLDS, match
+
+# --- CONFIGURATION ---
+MAX_WINDOWS = 8  # Per activity, earliest first
+
+HOURLY_FIELDS = ('temp_f', 'pop', 'wind_mph', 'humidity')
+
+def empty_hourly():
+    """Hourly forecast with no hours, in the columnar shape get_hourly_forecast returns"""
+    return {'start': [], 'end': [], **{field: [] for field in HOURLY_FIELDS}}
+
+def hourly_arrays(hourly):
+    """Columnar hourly forecast -> float arrays plus epoch start times"""
+    fields = {field: np.asarray(hourly[field], dtype=np.float64) for field in HOURLY_FIELDS}
+    times = np.array([datetime.fromisoformat(stamp).timestamp() for stamp in hourly['start']], dtype=np.float64)
+    return times, fields
+
+def runs(mask, contiguous):
+    """(starts, stops) of every run of True hours, in one linear scan.
+
+    `contiguous[i]` is False where hour i does not directly follow hour i-1,
+    which ends any run there.
+    """
+    joins_prev = np.concatenate(([False], mask[:-1])) & contiguous
+    joins_next = np.concatenate((mask[1:] & contiguous[1:], [False]))
+    return np.flatnonzero(mask & ~joins_prev), np.flatnonzero(mask & ~joins_next) + 1
+
+def best_block(scores, start, stop, hours):
+    """Start index of the highest-scoring `hours`-long block inside [start, stop), via a sliding-window sum"""
+    csum = np.concatenate(([0.0], np.cumsum(scores[start:stop])))
+    sums = csum[hours:] - csum[:-hours]
+    return start + int(np.argmax(sums))
+
+def find_hourly_windows(hourly, thresholds=None):
+    """Contiguous feasible intervals per activity over the NWS hourly forecast.
+
+    Each hour is tested against HOURLY_WINDOW_RULES in one vectorized pass,
+    then runs of feasible hours at least `min_hours` long are found with a
+    run-length scan. Hours must be back to back; a gap in the forecast ends a
+    run. The score is 0-100 average dryness (1 - PoP) across the window.
+    Everything is linear in the forecast length.
+    """
+    thresholds = thresholds or THRESHOLDS
+    windows = {activity: [] for activity in HOURLY_WINDOW_RULES}
+    if not hourly['start']:
+        return windows
+
+    times, fields = hourly_arrays(hourly)
+    contiguous = np.concatenate(([True], np.diff(times) == 3600.0))
+    dryness = 1.0 - np.clip(np.nan_to_num(fields['pop']), 0, 100) / 100.0
+
+    for activity, spec in HOURLY_WINDOW_RULES.items():
+        feasible = match(spec['when'], fields, thresholds)
+        min_hours = int(thresholds[spec['min_hours']])
+        starts, stops = runs(feasible, contiguous)
+        keep = (stops - starts) >= min_hours
+
+        for start, stop in zip(starts[keep][:MAX_WINDOWS], stops[keep][:MAX_WINDOWS]):
+            block = best_block(dryness, start, stop, min_hours)
+            windows[activity].append({
+                'start': hourly['start'][start],
+                'end': hourly['end'][stop - 1],
+                'hours': int(stop - start),
+                'score': round(float(dryness[start:stop].mean()) * 100, 1),
+                'best_start': hourly['start'][block],
+                'best_end': hourly['end'][block + min_hours - 1],
+            })
+    return windows